@@ -6,17 +6,34 @@
 # Output:           None
 # *****************************************************************************
 
+import datetime
+import sys
+
+
 class Account:
-    """Class definition for Account objects"""
+    """Class definition for Account objects -
+    Fields live in __slots__ rather than a per-instance __dict__, and values
+    that repeat across a vault (site, URL, date) are interned and shared.
+    Fields changed since the last upload are tracked as bits in an int, so
+    only those fields need to be sent to the database. The version is the
+    one the database document had when this copy was read or written, and
+    a write only succeeds if the document still has it"""
+
+    __slots__ = ("__id", "__site", "__url", "__uname", "__pwd", "__tlc", "__changed", "__ver")
+
+    TYPE = "Account"
+    FIELDS = ("site", "url", "uname", "pwd", "tlc")
+    NEW = -1    # Every bit set - nothing has been uploaded yet
 
     def __init__(self, site, url, uname, pwd, tlc):
         self.__id = f"{site}: {uname}"
-        self.__acc_type = "Account"
-        self.__site = site.lower().capitalize()
-        self.__url = url
+        self.__site = Account.intern(site.lower().capitalize())
+        self.__url = Account.intern(url)
         self.__uname = uname
         self.__pwd = pwd
-        self.__tlc = tlc
+        self.__tlc = Account.intern(tlc)
+        self.__changed = Account.NEW
+        self.__ver = 0
 
     def __str__(self):
         return self.__id
@@ -24,6 +41,12 @@ class Account:
     def __repr__(self):
         return self.__id
 
+    @staticmethod
+    def intern(value):
+        """This method returns the shared copy of a string value"""
+
+        return sys.intern(value) if isinstance(value, str) else value
+
     def get_account_id(self):
         return self.__id
 
@@ -38,9 +61,56 @@ class Account:
 
     def set_account_pwd(self, pwd):
         self.__pwd = pwd
+        self.mark_changed("pwd")
+
+        # A new password starts its age over
+        self.set_account_ttc(str(datetime.date.today()))
+
+    def get_account_tlc(self):
+        return self.__tlc
 
     def set_account_ttc(self, ttc):
-        self.__tlc = ttc
+        self.__tlc = Account.intern(ttc)
+        self.mark_changed("tlc")
+
+    def refresh(self, account_dictionary):
+        """This method overwrites the fields with a newer copy from the database"""
+
+        self.__site = Account.intern(account_dictionary["site"].lower().capitalize())
+        self.__url = Account.intern(account_dictionary["url"])
+        self.__pwd = account_dictionary["pwd"]
+        self.__tlc = Account.intern(account_dictionary["tlc"])
+        self.__ver = account_dictionary.get("ver", 0)
+        self.mark_clean()
+
+    def get_version(self):
+        return self.__ver
+
+    def set_version(self, ver):
+        self.__ver = ver
+
+    def mark_changed(self, field):
+        self.__changed |= 1 << self.FIELDS.index(field)
+
+    def mark_clean(self):
+        """This method records that the database now matches this account"""
+
+        self.__changed = 0
+
+    def is_new(self):
+        return self.__changed == Account.NEW
+
+    def get_changes(self):
+        """This method returns the fields changed since the last upload - every field
+        (the full document) if the account has never been uploaded"""
+
+        account_dictionary = self.to_dict()
+
+        if self.is_new():
+            return account_dictionary
+
+        return {field: account_dictionary[field] for bit, field in enumerate(self.FIELDS)
+                if self.__changed & (1 << bit)}
 
     def get_key(self):
         return self.__id
@@ -53,7 +123,7 @@ class Account:
 
         return {
             "_id": self.get_account_id(),
-            "type": "Account",
+            "type": self.TYPE,
             "site": self.get_account_name(),
             "url": self.get_account_url(),
             "uname": self.get_account_uname(),
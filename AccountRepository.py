@@ -0,0 +1,274 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the account repository - owns every
+#                   account and account list and keeps hash indexes over them
+# Input:            Accounts and account lists
+# Output:           Accounts and account lists
+# Notes:            Both UIs go through this class for lookups so that each
+#                   one is a dictionary hit instead of a scan
+# *****************************************************************************
+
+import itertools
+import threading
+from types import MappingProxyType
+from AccountsList import AccountsList
+from Database import Database
+
+
+class Snapshot:
+    """Class definition for one published state of the repository -
+    The list tuple and list index are never changed once published. The
+    account indexes are shared between snapshots and only ever gain entries,
+    which a single dictionary assignment does atomically"""
+
+    __slots__ = ("accounts", "account_lists", "lists_by_key", "by_id", "by_site_uname")
+
+    def __init__(self, accounts, account_lists, lists_by_key, by_id, by_site_uname):
+        self.accounts = accounts
+        self.account_lists = account_lists
+        self.lists_by_key = lists_by_key
+        self.by_id = by_id
+        self.by_site_uname = by_site_uname
+
+
+class AccountRepository:
+    """Class definition for the account repository -
+    Indexes accounts by _id and by (site, username), and lists by their key.
+    Readers take the current snapshot without locking; writers build a new one
+    under a lock and publish it with a single assignment (copy-on-write), so a
+    reader never sees a half-made change. The revision goes up with every
+    change to the model, made here or uploaded through Database, so anything
+    derived from the model can be cached until it moves, and listeners are
+    told about each change so indexes built over the model stay current"""
+
+    def __init__(self, accounts, account_lists):
+        self.__write_lock = threading.RLock()
+        self.__revisions = itertools.count(1)
+        self.__revision = 0
+        self.__listeners = []
+        self.__set_data(accounts, account_lists)
+
+        Database.add_listener(self.__changed)
+
+    def __set_data(self, accounts, account_lists):
+        """This method takes ownership of the accounts and lists and rebuilds the indexes"""
+
+        account_lists = tuple(account_lists)
+        snapshot = Snapshot(accounts, account_lists,
+                            MappingProxyType({account_list.get_key(): account_list for account_list in account_lists}),
+                            {}, {})
+        self.__lazy = not isinstance(accounts, list)
+        self.__fully_indexed = False
+
+        # A plain list is already in memory, so index it now rather than on first miss
+        if not self.__lazy:
+            self.__index_all(snapshot)
+
+        self.__snapshot = snapshot
+
+    @staticmethod
+    def load(lazy=True):
+        """This method builds a repository from the database"""
+
+        return AccountRepository(*AccountsList.fetch_data(lazy))
+
+    def get_revision(self):
+        return self.__revision
+
+    def add_listener(self, listener):
+        """This method registers a callable that is told about every change to the model, as
+        listener(kind, obj) - kind is 'account' or 'list' for an added or changed object,
+        'list_removed' for a removed list, and 'reload' (obj None) when everything was replaced"""
+
+        self.__listeners.append(listener)
+
+    def __changed(self, kind, obj=None):
+        """This method moves the revision on and tells the listeners - next() on a counter
+        is atomic, so no increment is lost to another thread"""
+
+        self.__revision = next(self.__revisions)
+
+        for listener in self.__listeners:
+            listener(kind, obj)
+
+    def snapshot(self):
+        """This method returns the current state - use one snapshot for a whole request"""
+
+        return self.__snapshot
+
+    def __publish(self, account_lists):
+        """This method publishes a new snapshot with a different set of lists"""
+
+        current = self.__snapshot
+        account_lists = tuple(account_lists)
+        self.__snapshot = Snapshot(current.accounts, account_lists,
+                                   MappingProxyType({account_list.get_key(): account_list
+                                                     for account_list in account_lists}),
+                                   current.by_id, current.by_site_uname)
+
+    @staticmethod
+    def __site_uname_key(site, uname):
+        return site.casefold(), uname.casefold()
+
+    def __index(self, account, snapshot=None):
+        """This method adds an account to the account indexes"""
+
+        snapshot = snapshot or self.__snapshot
+        snapshot.by_id[account.get_key()] = account
+        snapshot.by_site_uname[self.__site_uname_key(account.get_account_name(),
+                                                     account.get_account_uname())] = account
+
+    def __index_all(self, snapshot=None):
+        """This method indexes every account - only needed once, the first time
+        a (site, username) lookup misses before all accounts were seen"""
+
+        snapshot = snapshot or self.__snapshot
+        for account in snapshot.accounts:
+            self.__index(account, snapshot)
+
+        self.__fully_indexed = True
+
+    # Account lists
+
+    def get_lists(self):
+        return self.__snapshot.account_lists
+
+    def get_list_names(self):
+        return [account_list.get_list_name() for account_list in self.__snapshot.account_lists]
+
+    def get_list(self, name):
+        """This method takes a list name, in any case, and returns the list object or None"""
+
+        return self.__snapshot.lists_by_key.get(name.lower())
+
+    def add_list(self, account_list):
+        """This method adds a list unless one with the same name exists, returning whether it was added -
+        the check and the add happen under one lock so concurrent requests can not both add a name"""
+
+        with self.__write_lock:
+            if account_list.get_key() in self.__snapshot.lists_by_key:
+                return False
+
+            self.__publish(self.__snapshot.account_lists + (account_list,))
+
+        self.__changed("list", account_list)
+        return True
+
+    def remove_list(self, account_list):
+        with self.__write_lock:
+            self.__publish(existing for existing in self.__snapshot.account_lists
+                           if existing.get_key() != account_list.get_key())
+
+        self.__changed("list_removed", account_list)
+
+    # Accounts
+
+    def get_accounts(self):
+        return self.__snapshot.accounts
+
+    def get_account(self, account_id):
+        """This method takes an account id and returns the account object or None"""
+
+        account = self.__snapshot.by_id.get(account_id)
+
+        # Not seen yet, so fetch it (or reuse the copy the database already loaded)
+        if account is None and not self.__fully_indexed:
+            for loaded in Database.load_accounts([account_id]):
+                self.__index(loaded)
+                account = loaded
+
+        return account
+
+    def find_account(self, site, uname):
+        """This method takes a site and username, in any case, and returns the account object or None"""
+
+        key = self.__site_uname_key(site, uname)
+        account = self.__snapshot.by_site_uname.get(key)
+
+        if account is None and not self.__fully_indexed:
+            # Ids are built from the site and username, so try the id index first
+            account = self.get_account(f"{site.lower().capitalize()}: {uname}")
+
+            if account is None or self.__site_uname_key(account.get_account_name(),
+                                                        account.get_account_uname()) != key:
+                self.__index_all()
+                account = self.__snapshot.by_site_uname.get(key)
+
+        return account
+
+    def add_account(self, account):
+        with self.__write_lock:
+            self.__snapshot.accounts.append(account)
+            self.__index(account)
+
+        self.__changed("account", account)
+
+    # Changes made elsewhere, applied by ChangeFeed or after a write conflict
+
+    def reload(self):
+        """This method replaces everything with a fresh copy from the database"""
+
+        Database.clear_cache()
+        accounts, account_lists = AccountsList.fetch_data(self.__lazy)
+
+        with self.__write_lock:
+            self.__set_data(accounts, account_lists)
+
+        self.__changed("reload")
+
+    def apply_account(self, account, was_loaded):
+        """This method takes an account refreshed from the database - accounts that were
+        never loaded before are new to this process and are added"""
+
+        with self.__write_lock:
+            if not was_loaded:
+                self.__snapshot.accounts.append(account)
+
+            self.__index(account)
+
+        self.__changed("account", account)
+
+    def apply_list(self, list_dictionary):
+        """This method takes a list document from the database, adding the list if it is new,
+        and deferring a reload of its members either way"""
+
+        account_list = self.get_list(list_dictionary["name"])
+
+        def loader(list_id=list_dictionary["_id"]):
+            return Database.load_list_accounts(list_id)
+
+        if account_list is None:
+            account_list = AccountsList(list_dictionary["name"], list_dictionary["sec_factor"])
+            account_list.defer(loader)
+            account_list.set_version(list_dictionary.get("ver", 0))
+            account_list.mark_clean()
+            self.add_list(account_list)
+        else:
+            account_list.reload(loader, list_dictionary.get("ver", 0))
+            self.__changed("list", account_list)
+
+    def drop_list(self, list_id):
+        """This method removes a list deleted elsewhere, if this process still has it"""
+
+        account_list = self.get_list(list_id)
+
+        if account_list is not None:
+            self.remove_list(account_list)
+
+    def apply_conflict(self, error):
+        """This method takes a ConflictError and replaces the accounts and lists whose changes
+        were not saved with their stored copies, so the next edit starts from the latest version"""
+
+        for account, was_loaded in Database.refresh_accounts(error.account_ids):
+            self.apply_account(account, was_loaded)
+
+        found = set()
+        for list_dictionary in Database.find_list_documents(error.list_ids):
+            found.add(list_dictionary["_id"])
+            self.apply_list(list_dictionary)
+
+        # Lists that were deleted elsewhere
+        for list_id in error.list_ids:
+            if list_id not in found:
+                self.drop_list(list_id)
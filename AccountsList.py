@@ -6,20 +6,31 @@
 # Output:           Various
 # *****************************************************************************
 
+import threading
 from Database import Database
 
 
 class AccountsList:
     """Class definition for Account List objects -
-    These are containers for accounts of a similar type"""
-    __accounts = []
+    These are containers for accounts of a similar type. Accounts are kept in
+    insertion order in a dictionary keyed by account id, so membership checks
+    and removals do not scan the list. Members added and removed since the
+    last upload are tracked so only those changes need to be sent, along
+    with the version of the database document they were based on"""
+    __accounts = {}
     __name = ""
 
     def __init__(self, name, sec_factor, *args):
         self._id = name
         self.__name = self._id
         self.__sec_factor = sec_factor
-        self.__accounts = list(args)
+        self.__accounts = {acc.get_key(): acc for acc in args}
+        self.__loader = None
+        self.__load_lock = threading.RLock()
+        self.__is_new = True
+        self.__ver = 0
+        self.__added = {}
+        self.__removed = set()
 
     def __str__(self):
         return f"{self.get_list_name()}"
@@ -28,33 +39,147 @@ class AccountsList:
         return f"{self.get_list_name()}"
 
     def __iter__(self):
-        return iter(self.__accounts)
+        # Iterate over a snapshot so the list can be changed mid-loop
+        self.__hydrate()
+        return iter(tuple(self.__accounts.values()))
+
+    def __len__(self):
+        self.__hydrate()
+        return len(self.__accounts)
 
     def __contains__(self, item):
-        return item in self.__accounts
+        """This method checks membership by account id - takes an account object or an id"""
+
+        self.__hydrate()
+        return (item if isinstance(item, str) else item.get_key()) in self.__accounts
+
+    def __combine(self, other, symbol, sec, accounts):
+        """This method builds the list produced by a set operation"""
+
+        new = AccountsList(f"{self.get_list_name()}" + symbol + f"{other.get_list_name()}", sec)
+        new.__accounts = accounts
+
+        return new
 
     def __add__(self, other):
-        """This method adds '+' functionality for account lists"""
+        """This method adds '+' functionality for account lists - duplicate accounts are rejected"""
 
-        sec = max(self.get_sec_factor(), other.get_sec_factor())
-        new = AccountsList(f"{self.get_list_name()}" + "/" + f"{other.get_list_name()}", sec)
+        return self | other
 
-        for account in self.__accounts:
-            if account not in new:
-                new.add_account(account)
+    def __or__(self, other):
+        """This method returns the union of two lists, keeping this list's order first"""
 
-        for account in other.__accounts:
-            if account not in new:
-                new.add_account(account)
+        self.__hydrate()
+        other.__hydrate()
 
-        return new
+        accounts = dict(self.__accounts)
+        accounts.update(other.__accounts)
+
+        return self.__combine(other, "/", max(self.get_sec_factor(), other.get_sec_factor()), accounts)
+
+    def __and__(self, other):
+        """This method returns the accounts found in both lists"""
+
+        self.__hydrate()
+        other.__hydrate()
+
+        accounts = {key: acc for key, acc in self.__accounts.items() if key in other.__accounts}
+
+        return self.__combine(other, "&", max(self.get_sec_factor(), other.get_sec_factor()), accounts)
+
+    def __sub__(self, other):
+        """This method returns the accounts in this list that are not in the other list"""
+
+        self.__hydrate()
+        other.__hydrate()
+
+        accounts = {key: acc for key, acc in self.__accounts.items() if key not in other.__accounts}
+
+        return self.__combine(other, "-", self.get_sec_factor(), accounts)
+
+    def defer(self, loader):
+        """This method postpones loading the list's accounts until they are first needed -
+        loader is called once, with no arguments, and returns the accounts"""
+
+        self.__loader = loader
+
+    def is_loaded(self):
+        return self.__loader is None
+
+    def reload(self, loader, ver=None):
+        """This method drops the loaded accounts and defers loading them again through loader -
+        ver is the version of the database document they will be read from"""
+
+        with self.__load_lock:
+            self.__loader = loader
+            self.__accounts = {}
+            if ver is not None:
+                self.__ver = ver
+
+        self.mark_clean()
+
+    def __hydrate(self):
+        """This method loads deferred accounts ahead of any existing ones"""
+
+        if self.__loader is None:
+            return
+
+        # Another thread may be loading the same list, so check again under the lock. The
+        # loader is only cleared once the accounts are in place, so no reader sees an empty list
+        with self.__load_lock:
+            if self.__loader is not None:
+                accounts = {acc.get_key(): acc for acc in self.__loader()}
+                accounts.update(self.__accounts)
+                self.__accounts = accounts
+                self.__loader = None
 
     def add_account(self, *args):
-        for acc in args:
-            self.__accounts.append(acc)
+        # Deferred accounts are not needed to add one - __hydrate puts them first later
+        with self.__load_lock:
+            for acc in args:
+                self.__accounts[acc.get_key()] = acc
+                self.__removed.discard(acc.get_key())
+                self.__added[acc.get_key()] = None
 
     def remove(self, account):
-        self.__accounts.remove(account)
+        with self.__load_lock:
+            self.__hydrate()
+            if account.get_key() not in self.__accounts:
+                raise ValueError(f"{account} is not in list '{self.get_list_name()}'")
+
+            del self.__accounts[account.get_key()]
+            self.__added.pop(account.get_key(), None)
+            self.__removed.add(account.get_key())
+
+    def mark_clean(self):
+        """This method records that the database now matches this list"""
+
+        self.__is_new = False
+        self.__added = {}
+        self.__removed = set()
+
+    def is_new(self):
+        return self.__is_new
+
+    def get_version(self):
+        return self.__ver
+
+    def set_version(self, ver):
+        self.__ver = ver
+
+    def get_changes(self):
+        """This method returns the membership changes since the last upload as
+        (added ids, removed ids) - every member counts as added if the list has
+        never been uploaded"""
+
+        if self.__is_new:
+            return self.get_account_ids(), []
+
+        return list(self.__added), list(self.__removed)
+
+    def get_account_ids(self):
+        self.__hydrate()
+        return list(self.__accounts)
 
     def get_list_id(self):
         return self.__name
@@ -75,13 +200,13 @@ class AccountsList:
             "_id": self.get_list_id(),
             "name": self.get_list_name(),
             "sec_factor": self.get_sec_factor(),
-            "accounts": [account.get_key() for account in self.__accounts]
+            "accounts": self.get_account_ids()
         }
 
     @staticmethod
-    def fetch_data():
+    def fetch_data(lazy=False):
         # Retrieve data from database
-        return Database.get_data()
+        return Database.get_data(lazy)
 
     @staticmethod
     def upload(new_list):
@@ -0,0 +1,46 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for asyncio access to the database
+# Input:            Various
+# Output:           Various
+# Notes:            Both storage backends use blocking drivers, so each call
+#                   is run on a worker thread and awaited - the event loop
+#                   keeps serving other requests while a query is in flight.
+#                   Database already guards its shared state with locks, so
+#                   calls from several threads at once are safe
+# *****************************************************************************
+
+import asyncio
+import itertools
+from Database import Database
+
+
+class AsyncDatabase:
+    """Class definition for the async database facade -
+    run() awaits any blocking call on a worker thread, and iterate() streams a
+    blocking iterable a chunk at a time"""
+
+    @staticmethod
+    async def run(function, *args, **kwargs):
+        """This method runs any blocking call on a worker thread and returns its result -
+        for model calls that may read from the database, like loading a list's accounts"""
+
+        return await asyncio.to_thread(function, *args, **kwargs)
+
+    @staticmethod
+    async def iterate(iterable, chunk_size=None):
+        """This method yields the items of a blocking iterable, like a database cursor, reading
+        them one chunk at a time on a worker thread - so a page can be streamed as it is read
+        without the event loop ever waiting on the database"""
+
+        iterator = iter(iterable)
+        chunk_size = chunk_size or Database.BATCH_SIZE
+
+        while True:
+            chunk = await AsyncDatabase.run(lambda: list(itertools.islice(iterator, chunk_size)))
+            if not chunk:
+                return
+
+            for item in chunk:
+                yield item
@@ -0,0 +1,138 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the offline breached password checker
+# Input:            Passwords
+# Output:           Whether each one appears in the breach corpus
+# Notes:            The corpus is a file of raw 20-byte SHA-1 digests sorted
+#                   in ascending order (build_breach_corpus.py makes one from
+#                   a hash list). It is memory-mapped rather than read, and a
+#                   check is a binary search over its records, so even a
+#                   multi-gigabyte corpus costs a few page faults per lookup
+#                   and only the pages touched are ever loaded. The path is
+#                   read from PASSMAN_BREACH_CORPUS - without it, nothing is
+#                   checked
+# *****************************************************************************
+
+import hashlib
+import mmap
+import os
+import threading
+from Database import Database
+
+
+class BreachChecker:
+    """Class definition for the breach checker -
+    Looks passwords up in a sorted, memory-mapped corpus of SHA-1 digests"""
+
+    RECORD_SIZE = 20
+    SCAN_BATCH_SIZE = 10000
+
+    __default = None
+    __default_lock = threading.Lock()
+    __default_loaded = False
+
+    def __init__(self, path):
+        with open(path, "rb") as corpus:
+            size = os.fstat(corpus.fileno()).st_size
+            self.__map = mmap.mmap(corpus.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        if size % BreachChecker.RECORD_SIZE:
+            print(f"Breach corpus '{path}' ends with a partial record, which is ignored")
+
+        self.__count = size // BreachChecker.RECORD_SIZE
+
+    @staticmethod
+    def default():
+        """This method returns the checker for the corpus at PASSMAN_BREACH_CORPUS, opened on
+        first use and shared after that, or None if there is no usable corpus"""
+
+        if not BreachChecker.__default_loaded:
+            with BreachChecker.__default_lock:
+                if not BreachChecker.__default_loaded:
+                    path = os.environ.get("PASSMAN_BREACH_CORPUS")
+
+                    if path:
+                        try:
+                            BreachChecker.__default = BreachChecker(path)
+                        except (OSError, ValueError) as error:
+                            print(f"Could not open breach corpus '{path}': {error}")
+
+                    BreachChecker.__default_loaded = True
+
+        return BreachChecker.__default
+
+    @staticmethod
+    def digest(pwd):
+        return hashlib.sha1(pwd.encode("utf-8")).digest()
+
+    def __record(self, index):
+        start = index * BreachChecker.RECORD_SIZE
+        return self.__map[start:start + BreachChecker.RECORD_SIZE]
+
+    def __search(self, digest, low=0):
+        """This method returns the index of the first record not below digest, from low on"""
+
+        high = self.__count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__record(middle) < digest:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def contains(self, digest):
+        """This method checks whether a SHA-1 digest is in the corpus"""
+
+        index = self.__search(digest)
+        return index < self.__count and self.__record(index) == digest
+
+    def is_breached(self, pwd):
+        """This method checks whether a password is in the corpus"""
+
+        return self.contains(self.digest(pwd))
+
+    def find_breached(self, passwords):
+        """This method takes a dictionary of key -> password and returns the keys whose passwords
+        are in the corpus - the digests are looked up in sorted order, so each search starts where
+        the last one ended"""
+
+        by_digest = {}
+        for key, pwd in passwords.items():
+            by_digest.setdefault(self.digest(pwd), []).append(key)
+
+        breached = []
+        low = 0
+        for digest in sorted(by_digest):
+            low = self.__search(digest, low)
+            if low == self.__count:
+                break
+
+            if self.__record(low) == digest:
+                breached += by_digest[digest]
+
+        return breached
+
+    def scan_vault(self):
+        """This method returns the ids of every account whose password is in the corpus, reading
+        the passwords one batch at a time"""
+
+        breached = []
+        batch = {}
+        for doc in Database.find_accounts(fields=["pwd"], with_pwd=True):
+            batch[doc["_id"]] = doc.get("pwd") or ""
+
+            if len(batch) == BreachChecker.SCAN_BATCH_SIZE:
+                breached += self.find_breached(batch)
+                batch = {}
+
+        return sorted(breached + self.find_breached(batch))
+
+    def close(self):
+        if isinstance(self.__map, mmap.mmap):
+            self.__map.close()
+
+    def __len__(self):
+        return self.__count
@@ -0,0 +1,128 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the change feed - keeps a long-running
+#                   process's AccountRepository in step with the database
+# Input:            Change log entries from Database
+# Output:           Updates to an AccountRepository
+# Notes:            Every write is recorded in the change log under a
+#                   monotonically increasing revision, so catching up is one
+#                   indexed range query for entries newer than the last one
+#                   seen, followed by a re-read of just the changed documents.
+#                   Revisions are reserved before their entries are written,
+#                   so a later one can show up first - a poll stops at the
+#                   first missing revision and waits for it, for up to
+#                   GAP_TIMEOUT seconds in case its writer died
+# *****************************************************************************
+
+import os
+import threading
+import time
+from Database import Database
+
+
+class ChangeFeed:
+    """Class definition for the change feed -
+    Polls the change log and applies per-document changes to a repository"""
+
+    GAP_TIMEOUT = float(os.environ.get("PASSMAN_CHANGE_GAP_TIMEOUT", 30.0))
+
+    def __init__(self, repository, revision=None, interval=2.0):
+        self.__repository = repository
+        self.__revision = Database.get_revision() if revision is None else revision
+        self.__interval = interval
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+        self.__gap = None       # (first missing revision, when it was first seen missing)
+
+    def get_revision(self):
+        return self.__revision
+
+    def __skip_gap(self, missing, found):
+        """This method decides whether to read past missing revisions - only once they have been
+        missing for GAP_TIMEOUT seconds, as until then their entries may still be on the way"""
+
+        if self.__gap is None or self.__gap[0] != missing:
+            self.__gap = (missing, time.monotonic())
+
+        if time.monotonic() - self.__gap[1] < ChangeFeed.GAP_TIMEOUT:
+            return False
+
+        print(f"Change feed gave up waiting for revisions {missing} to {found - 1}")
+        self.__gap = None
+
+        return True
+
+    def poll(self):
+        """This method applies every change made by other processes since the last poll and
+        returns the number of documents refreshed"""
+
+        with self.__lock:
+            revision = self.__revision
+            account_ids = {}
+            list_ops = {}
+            reset = False
+
+            # Collapse the entries so each document is re-read at most once. A reset makes
+            # everything before it moot, so it is never waited on
+            for change in Database.find_changes(revision):
+                if change["rev"] != revision + 1 and change["op"] != "reset" and \
+                        not self.__skip_gap(revision + 1, change["rev"]):
+                    break
+
+                revision = change["rev"]
+
+                if change["own"]:
+                    continue
+
+                if change["op"] == "reset":
+                    reset = True
+                elif change["coll"] == "accounts":
+                    account_ids[change["doc_id"]] = None
+                elif change["coll"] == "lists":
+                    list_ops[change["doc_id"]] = change["op"]
+
+            if reset:
+                self.__repository.reload()
+                self.__revision = revision
+                return -1
+
+            for account, was_loaded in Database.refresh_accounts(account_ids):
+                self.__repository.apply_account(account, was_loaded)
+
+            updated = [list_id for list_id, op in list_ops.items() if op == "update"]
+            for list_dictionary in Database.find_list_documents(updated):
+                self.__repository.apply_list(list_dictionary)
+
+            for list_id, op in list_ops.items():
+                if op == "delete":
+                    self.__repository.drop_list(list_id)
+
+            # Only move on once everything was applied, so a failed poll is retried
+            self.__revision = revision
+
+            return len(account_ids) + len(list_ops)
+
+    def __run(self):
+        while not self.__stop.wait(self.__interval):
+            try:
+                self.poll()
+            except Exception as error:
+                # Keep polling
+                print(f"Change feed poll failed: {error}")
+
+    def start(self):
+        """This method starts polling in a background thread"""
+
+        if self.__thread is None:
+            self.__stop.clear()
+            self.__thread = threading.Thread(target=self.__run, name="ChangeFeed", daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
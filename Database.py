@@ -1,37 +1,121 @@
 # *****************************************************************************
 # Author:           Mike Winebarger
 # Date:             February 14, 2023,
-# Description:      Class definition and methods for MongoDB database
+# Description:      Class definition and methods for the database - storage
+#                   is handled by a pluggable backend (MongoDB or SQLite)
 # Input:            Various
 # Output:           Various
 # *****************************************************************************
 
+import atexit
+import contextlib
+import os
+import threading
 import urllib.parse
-import pymongo
+import uuid
+
+
+class ConflictError(Exception):
+    """Class definition for write conflicts -
+    Raised when documents were changed by someone else since they were read,
+    so the writes to them were not applied"""
+
+    def __init__(self, account_ids=(), list_ids=()):
+        self.account_ids = list(account_ids)
+        self.list_ids = list(list_ids)
+        super().__init__("Changed elsewhere since it was loaded, so these changes were not saved: " +
+                         ", ".join(self.account_ids + self.list_ids))
+
+
+class WriteBatch:
+    """Class definition for one thread's write batch -
+    Holds the uploads made in a Database.write_batch() block until it closes.
+    After that, conflicts is a ConflictError for the batch's writes that lost
+    to another writer, or None"""
+
+    def __init__(self):
+        self.accounts = {}
+        self.lists = {}
+        self.deletes = set()
+        self.depth = 0
+        self.conflicts = None
 
 
 class Database:
-    """Class definition for main database class"""
+    """Class definition for main database class -
+    Storage is delegated to a backend chosen by the PASSMAN_STORAGE
+    environment variable ('mongo' or 'sqlite'), or set with configure().
+    Uploads send only what changed since the last upload, and are queued
+    and written behind in bulk - repeated writes to the same _id are merged
+    into one update, and the queue is flushed once it holds
+    FLUSH_SIZE documents, FLUSH_INTERVAL seconds after the first queued
+    write, before any read, and at exit. Writes are optimistic - each one
+    only applies if the document still has the version it was read at, and
+    writes that lost to another writer are kept until take_conflicts() is
+    called (or raised as a ConflictError straight away when writing through,
+    or set on the write batch they were made in)"""
+
+    BATCH_SIZE = int(os.environ.get("PASSMAN_BATCH_SIZE", 500))
+    WRITE_BEHIND = os.environ.get("PASSMAN_WRITE_BEHIND", "1") != "0"
+    FLUSH_SIZE = int(os.environ.get("PASSMAN_FLUSH_SIZE", 100))
+    FLUSH_INTERVAL = float(os.environ.get("PASSMAN_FLUSH_INTERVAL", 1.0))
+    PAGE_SIZE = int(os.environ.get("PASSMAN_PAGE_SIZE", 100))
+
+    __backend = None
+    __account_cache = {}
+
+    # Tags this process's entries in the change log, so it can skip its own writes
+    __origin = uuid.uuid4().hex
+    __written_revision = 0
+
+    # Write-behind queue
+    __pending_accounts = {}
+    __pending_lists = {}
+    __pending_deletes = set()
+    __pending_lock = threading.RLock()
+    __flush_lock = threading.Lock()
+    __flush_timer = None
+    __local = threading.local()     # The write batch open in each thread
+    __listeners = []
+    __conflicts = {"accounts": {}, "lists": {}}
+
+    @classmethod
+    def configure(cls, backend):
+        """This method sets the storage backend used for all database calls"""
+
+        cls.__backend = backend
+
+    @classmethod
+    def __create_backend(cls):
+        """This method builds the storage backend named in the environment"""
+
+        storage = os.environ.get("PASSMAN_STORAGE", "mongo").lower()
+
+        if storage == "sqlite":
+            from SQLiteStorage import SQLiteStorage
 
-    __client = None
-    __db = None
-    __accounts = None
-    __account_lists = None
+            return SQLiteStorage(os.environ.get("PASSMAN_SQLITE_PATH", "passman.db"))
+
+        if storage == "mongo":
+            from MongoStorage import MongoStorage
+
+            # Set connection string
+            mongo_uri = os.environ.get(
+                "PASSMAN_MONGO_URI",
+                "mongodb+srv://dbuser:" + urllib.parse.quote("gMxP@CpLuRz9yjj") +
+                "@cluster0.ranxsrq.mongodb.net/?retryWrites=true/"
+            )
+
+            return MongoStorage(mongo_uri)
+
+        raise ValueError(f"Unknown storage backend '{storage}'")
 
     @classmethod
     def __connect(cls):
         """This method handles connecting to the database"""
 
-        # Set connection string
-        mongo_uri = "mongodb+srv://dbuser:" + urllib.parse.quote("gMxP@CpLuRz9yjj") + \
-                    "@cluster0.ranxsrq.mongodb.net/?retryWrites=true/"
-
-        # Set client and link database and collections
-        if cls.__client is None:
-            cls.__client = pymongo.MongoClient(mongo_uri)
-            cls.__db = cls.__client.LoginAccounts
-            cls.__accounts = cls.__db.Accounts
-            cls.__account_lists = cls.__db.AccountLists
+        if cls.__backend is None:
+            cls.__backend = cls.__create_backend()
 
     @classmethod
     def reset_data(cls):
@@ -100,74 +184,67 @@ class Database:
         # Add all accounts to a list
         all_accounts = [red1, red2, fb, bank1, bank2]
 
-        # Clear data for clean collections
-        cls.__db.Accounts.drop()
-        cls.__db.AccountLists.drop()
-
-        # Reassign variables
-        cls.__accounts = cls.__db.Accounts
-        cls.__account_lists = cls.__db.AccountLists
-
-        # Populate all accounts to collection
-        cls.__accounts.insert_many(all_accounts)
-
-        # Create account lists, populate them and add them to account_lists
-        cls.__account_lists.insert_one({
-            "_id": "All",
-            "name": "All",
-            "sec_factor": 10,
-            "accounts": [account["_id"] for account in all_accounts]
-        })
-
-        cls.__account_lists.insert_one({
-            "_id": "Social",
-            "name": "Social",
-            "sec_factor": 6,
-            "accounts": [account["_id"] for account in [red1, red2, fb]]
-        })
-
-        cls.__account_lists.insert_one({
-            "_id": "Financial",
-            "sec_factor": 10,
-            "name": "Financial",
-            "accounts": [account["_id"] for account in [bank1, bank2]]
-        })
+        # Create account lists and populate them
+        all_lists = [
+            {
+                "_id": "All",
+                "name": "All",
+                "sec_factor": 10,
+                "accounts": [account["_id"] for account in all_accounts]
+            },
+            {
+                "_id": "Social",
+                "name": "Social",
+                "sec_factor": 6,
+                "accounts": [account["_id"] for account in [red1, red2, fb]]
+            },
+            {
+                "_id": "Financial",
+                "sec_factor": 10,
+                "name": "Financial",
+                "accounts": [account["_id"] for account in [bank1, bank2]]
+            }
+        ]
+
+        # Drop queued writes, then clear data and repopulate collections
+        with cls.__pending_lock:
+            cls.__pending_accounts, cls.__pending_lists, cls.__pending_deletes = {}, {}, set()
+
+        cls.__backend.reset(all_accounts, all_lists)
+        cls.__account_cache = {}
 
     @classmethod
-    def get_data(cls):
-        """This method retrieves data from the database"""
+    def get_data(cls, lazy=False):
+        """This method retrieves data from the database - in lazy mode only the list names
+        and security levels are read up front, and accounts are paged in on first use"""
 
-        from Account import Account
-        from TwoFactorAccount import TFA
         from AccountsList import AccountsList
+        from LazyAccounts import LazyAccounts
 
-        account_objects = []    # All accounts?
         list_objects = []       # All lists?
 
         # Connect to database
         cls.__connect()
+        cls.flush()
+
+        if lazy:
+            # Accounts are only read when the collection is first iterated
+            account_objects = LazyAccounts(cls.iter_accounts)
+
+            for list_dictionary in cls.__backend.find_lists(["_id", "name", "sec_factor", "ver"]):
+                account_list = AccountsList(
+                    list_dictionary["name"],
+                    list_dictionary["sec_factor"]
+                )
+                account_list.defer(lambda list_id=list_dictionary["_id"]: cls.load_list_accounts(list_id))
+                account_list.set_version(list_dictionary.get("ver", 0))
+                account_list.mark_clean()
+                list_objects.append(account_list)
+
+            return account_objects, list_objects
 
         # Convert account collection to Account/TFA objects
-        accounts = cls.__accounts.find()
-        for account_dictionary in accounts:
-            if account_dictionary["type"] == "Account":
-                account_objects.append(Account(
-                    account_dictionary["site"],
-                    account_dictionary["url"],
-                    account_dictionary["uname"],
-                    account_dictionary["pwd"],
-                    account_dictionary["tlc"]
-                ))
-            elif account_dictionary["type"] == "TFA":
-                account_objects.append(TFA(
-                    account_dictionary["site"],
-                    account_dictionary["url"],
-                    account_dictionary["uname"],
-                    account_dictionary["pwd"],
-                    account_dictionary["tlc"],
-                    account_dictionary["typ"],
-                    account_dictionary["info"]
-                ))
+        account_objects = list(cls.iter_accounts())   # All accounts?
 
         # Build account map
         account_map = {}
@@ -175,7 +252,7 @@ class Database:
             account_map[account.get_key()] = account
 
         # Convert lists to AccountList objects
-        all_lists = cls.__account_lists.find()
+        all_lists = cls.__backend.find_lists()
 
         for list_dictionary in all_lists:
             account_list = AccountsList(
@@ -184,6 +261,8 @@ class Database:
             )
             for account_key in list_dictionary["accounts"]:
                 account_list.add_account(account_map[account_key])
+            account_list.set_version(list_dictionary.get("ver", 0))
+            account_list.mark_clean()
 
             # Append each list to list of lists
             list_objects.append(account_list)
@@ -193,26 +272,661 @@ class Database:
 
         return account_objects, list_objects
 
+    @classmethod
+    def __hydrate(cls, account_dictionary):
+        """This method returns the cached object for an account document, building it if needed"""
+
+        account = cls.__account_cache.get(account_dictionary["_id"])
+
+        if account is None:
+            account = cls.build_account(account_dictionary)
+            if account is not None:
+                account.set_version(account_dictionary.get("ver", 0))
+                account.mark_clean()
+                cls.__account_cache[account_dictionary["_id"]] = account
+
+        return account
+
+    @classmethod
+    def iter_accounts(cls):
+        """This method pages through every account in the database, yielding Account/TFA objects"""
+
+        cls.__connect()
+        cls.flush()
+
+        for account_dictionary in cls.__backend.find_accounts(batch_size=cls.BATCH_SIZE):
+            account = cls.__hydrate(account_dictionary)
+            if account is not None:
+                yield account
+
+    @classmethod
+    def load_accounts(cls, account_ids):
+        """This method returns the accounts with the given ids, in order - accounts that are
+        not cached yet are fetched together, one batch per round trip"""
+
+        cls.__connect()
+        cls.flush()
+
+        # Fetch whatever is missing from the cache
+        missing = [account_id for account_id in account_ids if account_id not in cls.__account_cache]
+        for start in range(0, len(missing), cls.BATCH_SIZE):
+            batch = missing[start:start + cls.BATCH_SIZE]
+            for account_dictionary in cls.__backend.find_accounts({"_id": {"$in": batch}},
+                                                                  batch_size=cls.BATCH_SIZE):
+                cls.__hydrate(account_dictionary)
+
+        return [cls.__account_cache[account_id] for account_id in account_ids
+                if account_id in cls.__account_cache]
+
+    @classmethod
+    def load_list_accounts(cls, list_id):
+        """This method returns the accounts that belong to a list, paging through the
+        member ids and loading their accounts one batch at a time"""
+
+        cls.__connect()
+        cls.flush()
+
+        accounts = []
+        batch = []
+        for account_id in cls.__backend.find_list_members(list_id, batch_size=cls.BATCH_SIZE):
+            batch.append(account_id)
+            if len(batch) == cls.BATCH_SIZE:
+                accounts += cls.load_accounts(batch)
+                batch = []
+
+        return accounts + cls.load_accounts(batch)
+
+    @classmethod
+    def clear_cache(cls):
+        """This method forgets every loaded account, so the next load reads fresh copies"""
+
+        cls.__account_cache = {}
+
+    @classmethod
+    def get_revision(cls):
+        """This method returns the latest change log revision"""
+
+        cls.__connect()
+        cls.flush()
+
+        return cls.__backend.get_revision()
+
+    @classmethod
+    def find_changes(cls, since):
+        """This method yields the change log entries after a revision, skipping those written
+        by this process - entries are read in batches through an indexed range query"""
+
+        cls.__connect()
+        cls.flush()
+
+        for change in cls.__backend.find_changes(since, batch_size=cls.BATCH_SIZE):
+            change["own"] = change["origin"] == cls.__origin
+            yield change
+
+    @classmethod
+    def find_list_documents(cls, list_ids):
+        """This method returns the name, security level and version documents of the given lists"""
+
+        if not list_ids:
+            return []
+
+        cls.__connect()
+        cls.flush()
+
+        return list(cls.__backend.find_lists(["_id", "name", "sec_factor", "ver"], list_ids))
+
+    @classmethod
+    def refresh_accounts(cls, account_ids):
+        """This method re-reads the given accounts, updating loaded objects in place -
+        returns (account, was_loaded) pairs"""
+
+        cls.__connect()
+        cls.flush()
+
+        refreshed = []
+        account_ids = list(account_ids)
+        for start in range(0, len(account_ids), cls.BATCH_SIZE):
+            for account_dictionary in cls.__backend.find_accounts(
+                    {"_id": {"$in": account_ids[start:start + cls.BATCH_SIZE]}}, batch_size=cls.BATCH_SIZE):
+                account = cls.__account_cache.get(account_dictionary["_id"])
+
+                if account is not None:
+                    account.refresh(account_dictionary)
+                    refreshed.append((account, True))
+                else:
+                    account = cls.__hydrate(account_dictionary)
+                    if account is not None:
+                        refreshed.append((account, False))
+
+        return refreshed
+
+    @classmethod
+    def __fields(cls, fields, with_pwd):
+        """This method returns the projection for a query - passwords are left out unless requested"""
+
+        if fields is None:
+            fields = ["_id", "type", "site", "url", "uname", "tlc", "typ", "info"]
+
+        return [field for field in fields if field != "pwd"] + (["pwd"] if with_pwd else [])
+
+    @classmethod
+    def find_accounts(cls, query=None, fields=None, with_pwd=False):
+        """This method yields account documents matching a query, using the server-side
+        indexes on site, uname, type and tlc - documents are not turned into objects, and
+        fields limits what is read"""
+
+        cls.__connect()
+        cls.flush()
+
+        yield from cls.__backend.find_accounts(query, cls.__fields(fields, with_pwd), batch_size=cls.BATCH_SIZE)
+
+    @classmethod
+    def find_accounts_by_site(cls, site, fields=None, with_pwd=False):
+        """This method yields the documents of every account for a site"""
+
+        yield from cls.find_accounts({"site": site.lower().capitalize()}, fields, with_pwd)
+
+    @classmethod
+    def find_accounts_changed_before(cls, date, fields=None, with_pwd=False):
+        """This method yields the documents of every account whose password was last changed
+        before a date (datetime.date or 'YYYY-MM-DD')"""
+
+        yield from cls.find_accounts({"tlc": {"$lt": str(date)}}, fields, with_pwd)
+
+    @classmethod
+    def find_accounts_by_list(cls, list_id, fields=None, with_pwd=False):
+        """This method yields the documents of every account in a list, in list order,
+        one batch of member ids at a time"""
+
+        cls.__connect()
+        cls.flush()
+
+        batch = []
+        for account_id in cls.__backend.find_list_members(list_id, batch_size=cls.BATCH_SIZE):
+            batch.append(account_id)
+            if len(batch) == cls.BATCH_SIZE:
+                yield from cls.__in_order(batch, fields, with_pwd)
+                batch = []
+
+        yield from cls.__in_order(batch, fields, with_pwd)
+
+    @classmethod
+    def find_list_member_ids(cls, list_id):
+        """This method yields the member ids of a list, in list order, without reading their accounts"""
+
+        cls.__connect()
+        cls.flush()
+
+        yield from cls.__backend.find_list_members(list_id, batch_size=cls.BATCH_SIZE)
+
+    @classmethod
+    def find_accounts_page(cls, after=None, limit=None, query=None, fields=None, with_pwd=False):
+        """This method returns one page of account documents in _id order, starting after the
+        cursor after, and the cursor of the next page (None on the last page) - pages are
+        found through the _id index, so every page costs the same however deep it is"""
+
+        cls.__connect()
+        cls.flush()
+
+        limit = limit or cls.PAGE_SIZE
+
+        # Read one extra document to tell whether there is another page
+        docs = cls.__backend.find_account_page(after, limit + 1, query, cls.__fields(fields, with_pwd))
+
+        return docs[:limit], docs[limit - 1]["_id"] if len(docs) > limit else None
+
+    @classmethod
+    def find_list_page(cls, list_id, after=None, limit=None, fields=None, with_pwd=False):
+        """This method returns one page of a list's account documents in list order, starting
+        after the cursor after, and the cursor of the next page (None on the last page)"""
+
+        cls.__connect()
+        cls.flush()
+
+        limit = limit or cls.PAGE_SIZE
+        members = cls.__backend.find_list_member_page(list_id, after, limit + 1)
+        page = members[:limit]
+
+        return cls.__in_order([account_id for position, account_id in page], fields, with_pwd), \
+            page[-1][0] if len(members) > limit else None
+
+    @classmethod
+    def __in_order(cls, account_ids, fields, with_pwd):
+        """This method fetches the documents for a batch of ids and returns them in id order"""
+
+        if not account_ids:
+            return []
+
+        docs = {doc["_id"]: doc for doc in cls.__backend.find_accounts(
+            {"_id": {"$in": account_ids}}, cls.__fields(fields, with_pwd), batch_size=cls.BATCH_SIZE)}
+
+        return [docs[account_id] for account_id in account_ids if account_id in docs]
+
+    @classmethod
+    def build_account(cls, account_dictionary):
+        """This method converts an account document to an Account/TFA object"""
+
+        from Account import Account
+        from TwoFactorAccount import TFA
+
+        if account_dictionary["type"] == "Account":
+            return Account(
+                account_dictionary["site"],
+                account_dictionary["url"],
+                account_dictionary["uname"],
+                account_dictionary["pwd"],
+                account_dictionary["tlc"]
+            )
+        elif account_dictionary["type"] == "TFA":
+            return TFA(
+                account_dictionary["site"],
+                account_dictionary["url"],
+                account_dictionary["uname"],
+                account_dictionary["pwd"],
+                account_dictionary["tlc"],
+                account_dictionary["typ"],
+                account_dictionary["info"]
+            )
+
+        return None
+
+    @classmethod
+    def __queued(cls):
+        """This method handles a newly queued write - flushing now if the queue is full,
+        otherwise making sure a timed flush is scheduled"""
+
+        with cls.__pending_lock:
+            size = len(cls.__pending_accounts) + len(cls.__pending_lists) + len(cls.__pending_deletes)
+
+            if size < cls.FLUSH_SIZE:
+                cls.__schedule_flush()
+                return
+
+        cls.flush()
+
+    @classmethod
+    def __schedule_flush(cls):
+        """This method starts the flush timer if it is not already running - call with the
+        pending lock held"""
+
+        if cls.__flush_timer is None:
+            cls.__flush_timer = threading.Timer(cls.FLUSH_INTERVAL, cls.__timed_flush)
+            cls.__flush_timer.daemon = True
+            cls.__flush_timer.start()
+
+    @classmethod
+    def __timed_flush(cls):
+        """This method flushes from the timer thread, where nobody would see an error - a
+        failed write is reported and tried again after another interval"""
+
+        try:
+            cls.flush()
+        except Exception as error:
+            print(f"Could not write queued changes, trying again in {cls.FLUSH_INTERVAL}s: {error}")
+
+            with cls.__pending_lock:
+                cls.__schedule_flush()
+
+    @classmethod
+    def flush(cls):
+        """This method writes every queued upload and removal to the database in bulk - uploads
+        held in an open write batch are not queued yet, and wait for the batch to close"""
+
+        cls.__flush()
+
+    @classmethod
+    def __flush(cls, batch=None):
+        """This method writes the queue, with a closing write batch's uploads added on top, in one
+        bulk write - if the write fails the updates go back in the queue, under any made since,
+        and the error is raised"""
+
+        with cls.__flush_lock:
+            # Take the queue, leaving an empty one for writes made during the flush
+            with cls.__pending_lock:
+                if cls.__flush_timer is not None:
+                    cls.__flush_timer.cancel()
+                    cls.__flush_timer = None
+
+                if batch is not None:
+                    cls.__enqueue(batch)
+
+                accounts, cls.__pending_accounts = cls.__pending_accounts, {}
+                account_lists, cls.__pending_lists = cls.__pending_lists, {}
+                deletes, cls.__pending_deletes = cls.__pending_deletes, set()
+
+            if not accounts and not account_lists and not deletes:
+                return
+
+            try:
+                error = cls.__bulk_write(
+                    list(accounts.values()),
+                    [dict(update, add=list(update["add"]), pull=list(update["pull"]))
+                     for update in account_lists.values()],
+                    list(deletes)
+                )
+            except Exception:
+                cls.__requeue(accounts, account_lists, deletes)
+                raise
+
+            if error is None:
+                return
+
+            # The batch's own conflicts go back to it - nobody is waiting on the rest of the
+            # queue, so its conflicts are kept for take_conflicts()
+            batch_accounts = batch.accounts if batch is not None else {}
+            batch_lists = batch.lists if batch is not None else {}
+
+            own_accounts = [account_id for account_id in error.account_ids if account_id in batch_accounts]
+            own_lists = [list_id for list_id in error.list_ids if list_id in batch_lists]
+            if own_accounts or own_lists:
+                batch.conflicts = ConflictError(own_accounts, own_lists)
+
+            with cls.__pending_lock:
+                cls.__conflicts["accounts"].update(
+                    dict.fromkeys(account_id for account_id in error.account_ids if account_id not in batch_accounts))
+                cls.__conflicts["lists"].update(
+                    dict.fromkeys(list_id for list_id in error.list_ids if list_id not in batch_lists))
+
+    @classmethod
+    def __enqueue(cls, batch):
+        """This method adds a write batch's updates to the queue - they are newer than anything
+        queued, so they are merged on top. Call with the pending lock held"""
+
+        for account_id, update in batch.accounts.items():
+            cls.__pending_accounts[account_id] = \
+                cls.__merge_account_update(cls.__pending_accounts.get(account_id), update)
+
+        # Removals first, as a list removed and created again in the batch is written fresh
+        for list_id in batch.deletes:
+            cls.__pending_lists.pop(list_id, None)
+            cls.__pending_deletes.add(list_id)
+
+        for list_id, update in batch.lists.items():
+            pending = cls.__pending_lists.get(list_id)
+            if pending is not None:
+                update = dict(update, ver=pending["ver"])
+
+            if not update["replace"]:
+                cls.__pending_deletes.discard(list_id)
+            cls.__pending_lists[list_id] = cls.__merge_list_update(pending, update)
+
+    @classmethod
+    def __requeue(cls, accounts, account_lists, deletes):
+        """This method puts updates taken by a failed flush back in the queue - they are older
+        than anything queued since, so newer updates are merged on top of them. The objects
+        were given the versions these updates will write, so they still match once they do"""
+
+        with cls.__pending_lock:
+            for account_id, update in accounts.items():
+                newer = cls.__pending_accounts.get(account_id)
+                cls.__pending_accounts[account_id] = \
+                    update if newer is None else cls.__merge_account_update(update, newer)
+
+            for list_id, update in account_lists.items():
+                newer = cls.__pending_lists.get(list_id)
+
+                # A list removed since the flush began stays removed (or written fresh)
+                if list_id in cls.__pending_deletes:
+                    continue
+
+                if newer is None:
+                    cls.__pending_lists[list_id] = update
+                elif newer["replace"]:
+                    cls.__pending_lists[list_id] = dict(newer, ver=update["ver"])
+                else:
+                    cls.__pending_lists[list_id] = cls.__merge_list_update(update, newer)
+
+            # A removal stays queued unless the list has been written to since
+            for list_id in deletes:
+                newer = cls.__pending_lists.get(list_id)
+                if newer is None or newer["replace"]:
+                    cls.__pending_deletes.add(list_id)
+
+            if cls.__pending_accounts or cls.__pending_lists or cls.__pending_deletes:
+                cls.__schedule_flush()
+
+    @classmethod
+    def add_listener(cls, listener):
+        """This method registers a callable that is told about every upload and removal made
+        by this process, as listener(kind, obj) with kind 'account', 'list' or 'list_removed'"""
+
+        cls.__listeners.append(listener)
+
+    @classmethod
+    def __notify(cls, kind, obj):
+        for listener in cls.__listeners:
+            listener(kind, obj)
+
+    @classmethod
+    def __current_batch(cls):
+        """This method returns the write batch open in this thread, or None"""
+
+        return getattr(cls.__local, "batch", None)
+
+    @classmethod
+    @contextlib.contextmanager
+    def write_batch(cls):
+        """This method returns a context manager that holds back this thread's uploads until it
+        closes, so every upload made inside it reaches the database in one bulk write - even when
+        write-behind is off. Other threads are not held back, and reads made meanwhile do not see
+        the batch. It yields the WriteBatch, whose conflicts are set once it closes - a nested
+        block shares the outer one's batch, which is written when the outer block closes. A
+        block that raises writes nothing - see __discard()"""
+
+        batch = cls.__current_batch()
+        if batch is None:
+            batch = cls.__local.batch = WriteBatch()
+
+        batch.depth += 1
+        succeeded = False
+        try:
+            yield batch
+            succeeded = True
+        finally:
+            batch.depth -= 1
+            if not batch.depth:
+                cls.__local.batch = None
+
+                if succeeded:
+                    cls.__flush(batch)
+                else:
+                    cls.__discard(batch)
+
+    @classmethod
+    def __discard(cls, batch):
+        """This method drops the uploads of a write batch whose block raised, so no part of it is
+        written - its objects were already changed in memory, so their ids are reported through
+        take_conflicts() to be reloaded, like any other write that was not saved"""
+
+        with cls.__pending_lock:
+            cls.__conflicts["accounts"].update(dict.fromkeys(batch.accounts))
+            cls.__conflicts["lists"].update(dict.fromkeys(list(batch.lists) + list(batch.deletes)))
+
+    @classmethod
+    def __bulk_write(cls, account_updates, list_updates, deleted_list_ids):
+        """This method sends updates to the backend, remembers the revision they were logged at
+        and returns a ConflictError for the updates that were not applied, or None"""
+
+        cls.__connect()
+        revision, conflicts = cls.__backend.bulk_write(account_updates, list_updates, deleted_list_ids,
+                                                       cls.__origin)
+        cls.__written_revision = max(cls.__written_revision, revision)
+
+        if not conflicts:
+            return None
+
+        return ConflictError([doc_id for coll, doc_id in conflicts if coll == "accounts"],
+                             [doc_id for coll, doc_id in conflicts if coll == "lists"])
+
+    @classmethod
+    def take_conflicts(cls):
+        """This method returns a ConflictError for every write-behind write that lost to another
+        writer since the last call, or None - the objects involved should be refreshed. A write
+        batch's conflicts are kept on the batch instead"""
+
+        with cls.__pending_lock:
+            conflicts, cls.__conflicts = cls.__conflicts, {"accounts": {}, "lists": {}}
+
+        if not conflicts["accounts"] and not conflicts["lists"]:
+            return None
+
+        return ConflictError(conflicts["accounts"], conflicts["lists"])
+
+    @classmethod
+    def get_written_revision(cls):
+        """This method returns the revision of the latest write made by this process"""
+
+        return cls.__written_revision
+
+    @staticmethod
+    def __merge_account_update(pending, update):
+        """This method folds a newer account update into a queued one"""
+
+        if pending is None:
+            return update
+
+        pending["set"].update(update["set"])
+        pending["upsert"] = pending["upsert"] or update["upsert"]
+
+        return pending
+
+    @staticmethod
+    def __merge_list_update(pending, update):
+        """This method folds a newer list update into a queued one - the queued copy
+        keeps 'add' as an ordered dict and 'pull' as a set while it is merged"""
+
+        if pending is None or update["replace"]:
+            return dict(update, add=dict.fromkeys(update["add"]), pull=set(update["pull"]))
+
+        pending["set"].update(update["set"])
+        for account_id in update["add"]:
+            pending["pull"].discard(account_id)
+            pending["add"][account_id] = None
+        for account_id in update["pull"]:
+            pending["add"].pop(account_id, None)
+            pending["pull"].add(account_id)
+
+        return pending
+
     @classmethod
     def upload_new_list(cls, new_list):
         """This method uploads updated AccountList data to database"""
 
         cls.__connect()
 
-        # If list does not exist, add to database, else update existing list
-        cls.__account_lists.update_one({"_id": new_list.get_list_id()}, {"$set": new_list.to_dict()}, upsert=True)
+        # New lists are written whole, existing ones only send membership changes
+        added, removed = new_list.get_changes()
+        update = {
+            "_id": new_list.get_list_id(),
+            "ver": new_list.get_version(),
+            "set": {"name": new_list.get_list_name(),
+                    "sec_factor": new_list.get_sec_factor()} if new_list.is_new() else {},
+            "add": added,
+            "pull": removed,
+            "replace": new_list.is_new()
+        }
+        cls.__notify("list", new_list)
+
+        # Written through, the list is only marked clean once the write has gone through
+        batch = cls.__current_batch()
+        if not cls.WRITE_BEHIND and batch is None:
+            error = cls.__bulk_write([], [update], [])
+            if error is not None:
+                raise error
+
+            new_list.mark_clean()
+            new_list.set_version(update["ver"] + 1)
+            return
+
+        # Queued, the changes live on in the queue - a failed flush puts them back
+        new_list.mark_clean()
+
+        # Queue the update, merging it with any earlier one - a merged update keeps the version
+        # the first one was based on. A queued removal is kept for a new list, as removals are
+        # written first, and dropped otherwise
+        with cls.__pending_lock:
+            pending_lists = cls.__pending_lists if batch is None else batch.lists
+            pending_deletes = cls.__pending_deletes if batch is None else batch.deletes
+
+            pending = pending_lists.get(update["_id"])
+            if pending is None:
+                new_list.set_version(update["ver"] + 1)
+            else:
+                update["ver"] = pending["ver"]
+
+            if not update["replace"]:
+                pending_deletes.discard(update["_id"])
+            pending_lists[update["_id"]] = cls.__merge_list_update(pending, update)
+
+        if batch is None:
+            cls.__queued()
 
     @classmethod
     def upload_new_account(cls, new_account):
         """This method uploads updated Account data to database"""
 
         cls.__connect()
+        cls.__account_cache[new_account.get_key()] = new_account
+
+        # If account does not exist, add to database, else send only the changed fields
+        update = {
+            "_id": new_account.get_key(),
+            "ver": new_account.get_version(),
+            "set": new_account.get_changes(),
+            "upsert": new_account.is_new()
+        }
+
+        if not update["set"]:
+            return
 
-        # If account does not exist, add to database, else update existing account
-        cls.__accounts.update_one({"_id": new_account.get_key()}, {"$set": new_account.to_dict()}, upsert=True)
+        cls.__notify("account", new_account)
+
+        # Written through, the account is only marked clean once the write has gone through
+        batch = cls.__current_batch()
+        if not cls.WRITE_BEHIND and batch is None:
+            error = cls.__bulk_write([update], [], [])
+            if error is not None:
+                raise error
+
+            new_account.mark_clean()
+            new_account.set_version(update["ver"] + 1)
+            return
+
+        # Queued, the changes live on in the queue - a failed flush puts them back
+        new_account.mark_clean()
+
+        # Queue the update, merging it with any earlier one
+        with cls.__pending_lock:
+            pending_accounts = cls.__pending_accounts if batch is None else batch.accounts
+
+            pending = pending_accounts.get(update["_id"])
+            if pending is None:
+                new_account.set_version(update["ver"] + 1)
+
+            pending_accounts[update["_id"]] = cls.__merge_account_update(pending, update)
+
+        if batch is None:
+            cls.__queued()
 
     @classmethod
     def remove_list(cls, acc_list):
-        """This method removes a list from the database"""
+        """This method removes a list from the database - removals are not version checked"""
+
+        cls.__connect()
+        cls.__notify("list_removed", acc_list)
+
+        batch = cls.__current_batch()
+        if not cls.WRITE_BEHIND and batch is None:
+            cls.__bulk_write([], [], [acc_list.get_list_id()])
+            return
+
+        # Queue the removal, dropping any queued write of the list
+        with cls.__pending_lock:
+            (cls.__pending_lists if batch is None else batch.lists).pop(acc_list.get_list_id(), None)
+            (cls.__pending_deletes if batch is None else batch.deletes).add(acc_list.get_list_id())
+
+        if batch is None:
+            cls.__queued()
 
-        cls.__account_lists.delete_one({"_id": acc_list.get_list_id()})
+# Write anything still queued when the interpreter exits
+atexit.register(Database.flush)
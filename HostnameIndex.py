@@ -0,0 +1,187 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the URL-to-account autofill index
+# Input:            Page URLs
+# Output:           Account ids
+# Notes:            Account URLs are normalized to hostnames and stored in a
+#                   trie keyed by reversed labels (com -> reddit -> old), so
+#                   a page's own host, its parent domains and everything else
+#                   under its registrable domain are all on one short path.
+#                   The registrable domain is found with a small built-in
+#                   rule (two labels, or three under a country code second
+#                   level like co.uk) rather than the full public suffix list
+# *****************************************************************************
+
+import ipaddress
+import urllib.parse
+from Database import Database
+from RepositoryIndex import RepositoryIndex
+
+
+class HostnameIndex(RepositoryIndex):
+    """Class definition for the reversed-label hostname trie -
+    Built from the database and kept current by listening to a repository"""
+
+    SECOND_LEVEL_LABELS = {"ac", "co", "com", "edu", "gov", "net", "org"}
+
+    class Node:
+        """Class definition for one label of the trie"""
+
+        __slots__ = ("children", "accounts")
+
+        def __init__(self):
+            self.children = {}
+            self.accounts = {}      # Insertion-ordered set of account ids
+
+    def __init__(self, repository=None, background=False):
+        self.__root = HostnameIndex.Node()
+        self.__hosts = {}       # Account id -> its hostname
+
+        super().__init__(repository, background)
+
+    @staticmethod
+    def normalize(url):
+        """This method returns the hostname of a URL or bare host - lower case, without
+        scheme, port, path, trailing dot or a leading 'www.' label, and IDNA encoded"""
+
+        url = (url or "").strip()
+        if "//" not in url:
+            url = "//" + url
+
+        try:
+            host = urllib.parse.urlsplit(url).hostname or ""
+        except ValueError:
+            return ""
+
+        host = host.rstrip(".")
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+
+        labels = host.split(".")
+        if labels[0] == "www" and len(labels) > 2:
+            labels = labels[1:]
+
+        return ".".join(labels)
+
+    @staticmethod
+    def __registrable_depth(labels):
+        """This method returns how many labels, from the right, make up the registrable
+        domain of a host - an IP address only matches itself"""
+
+        try:
+            ipaddress.ip_address(".".join(labels))
+            return len(labels)
+        except ValueError:
+            pass
+
+        if len(labels) >= 2 and len(labels[-1]) == 2 and labels[-2] in HostnameIndex.SECOND_LEVEL_LABELS:
+            return 3
+
+        return 2
+
+    def _read(self):
+        """This method indexes every account in the database, reading only the URLs"""
+
+        root = HostnameIndex.Node()
+        hosts = {}
+        for doc in Database.find_accounts(fields=["url"]):
+            host = self.normalize(doc.get("url"))
+            if host:
+                hosts[doc["_id"]] = host
+                self.__insert(root, host, doc["_id"])
+
+        return root, hosts
+
+    def _install(self, state):
+        self.__root, self.__hosts = state
+
+    def _apply(self, kind, obj):
+        if kind == "account":
+            self.update(obj)
+
+    @staticmethod
+    def __insert(root, host, account_id):
+        node = root
+        for label in reversed(host.split(".")):
+            node = node.children.setdefault(label, HostnameIndex.Node())
+
+        node.accounts[account_id] = None
+
+    def update(self, account):
+        """This method indexes a new or changed account"""
+
+        host = self.normalize(account.get_account_url())
+
+        with self._lock:
+            self.__remove(account.get_key())
+
+            if host:
+                self.__hosts[account.get_key()] = host
+                self.__insert(self.__root, host, account.get_key())
+
+    def __remove(self, account_id):
+        host = self.__hosts.pop(account_id, None)
+        if host is None:
+            return
+
+        # Drop the id, then prune the labels left with nothing under them
+        path = [self.__root]
+        for label in reversed(host.split(".")):
+            path.append(path[-1].children[label])
+
+        path[-1].accounts.pop(account_id, None)
+        for label, parent, node in zip(host.split("."), reversed(path[:-1]), reversed(path[1:])):
+            if node.accounts or node.children:
+                break
+            del parent.children[label]
+
+    def lookup(self, url, limit=None):
+        """This method returns the ids of the accounts for a page - those for its own host first,
+        then for its parent domains (nearest first), then for any other host under the same
+        registrable domain"""
+
+        host = self.normalize(url)
+        if not host:
+            return []
+
+        labels = host.split(".")
+        depth = self.__registrable_depth(labels)
+        if len(labels) < depth:
+            return []
+
+        matches = {}
+        index = self._built()
+
+        with self._lock:
+            # Walk as far down the page's own labels as the trie goes
+            path = []
+            node = index.__root
+            for label in reversed(labels):
+                node = node.children.get(label)
+                if node is None:
+                    break
+                path.append(node)
+
+            if len(path) < depth:
+                return []
+
+            # Own host, then parents up to the registrable domain
+            for node in reversed(path[depth - 1:]):
+                matches.update(node.accounts)
+
+            # Then everything else under the registrable domain
+            stack = [path[depth - 1]]
+            while stack:
+                node = stack.pop()
+                matches.update(node.accounts)
+                stack.extend(node.children.values())
+
+        matches = list(matches)
+
+        return matches if limit is None else matches[:limit]
+
+    def __len__(self):
+        return len(self.__hosts)
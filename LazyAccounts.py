@@ -0,0 +1,56 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for a lazily loaded collection of all
+#                   accounts
+# Input:            A loader that yields Account objects
+# Output:           Account objects
+# *****************************************************************************
+
+class LazyAccounts:
+    """Class definition for the lazily loaded collection of all accounts -
+    Nothing is read from the database until the first iteration, which pages
+    accounts in through the loader and keeps them for every later pass"""
+
+    def __init__(self, loader):
+        self.__loader = loader
+        self.__accounts = None
+        self.__added = {}
+
+    def __str__(self):
+        return f"{list(self)}"
+
+    def __repr__(self):
+        return f"{list(self)}"
+
+    def __iter__(self):
+        # Already loaded, so iterate over a copy in case accounts are appended mid-loop
+        if self.__accounts is not None:
+            yield from list(self.__accounts)
+            return
+
+        loaded = []
+        for account in self.__loader():
+            # Accounts appended before loading finished are yielded at the end instead
+            if account.get_key() not in self.__added:
+                loaded.append(account)
+                yield account
+
+        added = list(self.__added.values())
+        yield from added
+
+        # Only keep the results of a complete pass
+        self.__accounts = loaded + added
+        self.__added = {}
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def is_loaded(self):
+        return self.__accounts is not None
+
+    def append(self, account):
+        if self.__accounts is None:
+            self.__added[account.get_key()] = account
+        else:
+            self.__accounts.append(account)
@@ -0,0 +1,280 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      MongoDB implementation of the storage interface
+# Input:            Account and list documents (dictionaries)
+# Output:           Account and list documents (dictionaries)
+# Notes:            List membership lives in its own ListMembers collection,
+#                   one small document per (list, account) pair, instead of an
+#                   array inside the list document - so no list can reach the
+#                   16 MB document limit and members can be read in pages.
+#                   Member positions come from a next_pos counter on the list
+#                   document, reserved a block at a time with $inc, so they
+#                   only ever grow and two writers never interleave.
+#                   Every write also appends to a Changes log whose _id is a
+#                   revision number taken from the Counters collection.
+#                   Writes are conditional on the document version; each bulk
+#                   write also stamps the documents it changes with a unique
+#                   'writer' token, so when fewer documents matched than were
+#                   sent, the ones that lost to another writer can be told apart
+# *****************************************************************************
+
+import uuid
+import pymongo
+import pymongo.errors
+from StorageBackend import StorageBackend
+
+
+class MongoStorage(StorageBackend):
+    """Class definition for MongoDB storage"""
+
+    def __init__(self, mongo_uri):
+        # Set client and link database and collections
+        self.__client = pymongo.MongoClient(mongo_uri)
+        self.__db = self.__client.LoginAccounts
+        self.__accounts = self.__db.Accounts
+        self.__account_lists = self.__db.AccountLists
+        self.__list_members = self.__db.ListMembers
+        self.__changes = self.__db.Changes
+        self.__counters = self.__db.Counters
+
+        self.__create_indexes()
+        self.__migrate_embedded_members()
+        self.__migrate_positions()
+
+    def __create_indexes(self):
+        """This method creates the account and membership indexes if they do not exist yet"""
+
+        for field in ("site", "uname", "type", "tlc"):
+            self.__accounts.create_index(field)
+
+        self.__list_members.create_index([("list_id", pymongo.ASCENDING), ("account_id", pymongo.ASCENDING)],
+                                         unique=True)
+        self.__list_members.create_index([("list_id", pymongo.ASCENDING), ("pos", pymongo.ASCENDING)])
+
+    def __migrate_embedded_members(self):
+        """This method moves member arrays left in list documents by older versions
+        into the membership collection"""
+
+        for account_list in self.__account_lists.find({"accounts": {"$exists": True}}, ["accounts"]):
+            requests = self.__member_requests(account_list["_id"], account_list["accounts"])
+            if requests:
+                self.__list_members.bulk_write(requests, ordered=False)
+
+            self.__account_lists.update_one({"_id": account_list["_id"]}, {"$unset": {"accounts": ""}})
+
+    def __migrate_positions(self):
+        """This method starts the position counter of lists written by older versions after
+        their last member, so members added later sort after the existing ones"""
+
+        for account_list in self.__account_lists.find({"next_pos": {"$exists": False}}, ["_id"]):
+            last = self.__list_members.find_one({"list_id": account_list["_id"]}, ["pos"],
+                                                sort=[("pos", pymongo.DESCENDING)])
+
+            # Only if no other process has done it meanwhile
+            self.__account_lists.update_one({"_id": account_list["_id"], "next_pos": {"$exists": False}},
+                                            {"$set": {"next_pos": 0 if last is None else last["pos"] + 1}})
+
+    def __member_requests(self, list_id, account_ids):
+        """This method builds upserts that append members to a list, in order, skipping
+        existing ones - positions are a block reserved from the list's counter, so later
+        additions sort last whichever writer makes them"""
+
+        if not account_ids:
+            return []
+
+        counter = self.__account_lists.find_one_and_update({"_id": list_id},
+                                                           {"$inc": {"next_pos": len(account_ids)}},
+                                                           {"next_pos": 1},
+                                                           return_document=pymongo.ReturnDocument.AFTER)
+        start = counter["next_pos"] - len(account_ids)
+
+        return [pymongo.UpdateOne({"list_id": list_id, "account_id": account_id},
+                                  {"$setOnInsert": {"pos": start + offset}}, upsert=True)
+                for offset, account_id in enumerate(account_ids)]
+
+    def reset(self, accounts, account_lists):
+        # Clear data for clean collections
+        self.__db.Accounts.drop()
+        self.__db.AccountLists.drop()
+        self.__db.ListMembers.drop()
+
+        # Reassign variables
+        self.__accounts = self.__db.Accounts
+        self.__account_lists = self.__db.AccountLists
+        self.__list_members = self.__db.ListMembers
+        self.__create_indexes()
+
+        # Populate collections
+        self.__accounts.insert_many(accounts)
+        self.__account_lists.insert_many([dict({field: value for field, value in account_list.items()
+                                                if field != "accounts"}, next_pos=len(account_list["accounts"]))
+                                          for account_list in account_lists])
+        for account_list in account_lists:
+            if account_list["accounts"]:
+                self.__list_members.insert_many([{"list_id": account_list["_id"], "account_id": account_id,
+                                                  "pos": pos}
+                                                 for pos, account_id in enumerate(account_list["accounts"])])
+
+        # Followers must reload everything
+        self.__db.Changes.drop()
+        self.__log_changes([("all", None, "reset")], None)
+
+    def find_accounts(self, query=None, projection=None, batch_size=500):
+        return self.__accounts.find(query or {}, projection, batch_size=batch_size)
+
+    def find_account_page(self, after=None, limit=100, query=None, projection=None):
+        query = dict(query or {})
+        if after is not None:
+            # Merge with any condition already on _id
+            condition = query.get("_id", {})
+            query["_id"] = dict(condition if isinstance(condition, dict) else {"$eq": condition}, **{"$gt": after})
+
+        return list(self.__accounts.find(query, projection).sort("_id", pymongo.ASCENDING).limit(limit))
+
+    def find_lists(self, projection=None, list_ids=None):
+        query = {} if list_ids is None else {"_id": {"$in": list(list_ids)}}
+
+        for account_list in self.__account_lists.find(query, projection):
+            if projection is None or "accounts" in projection:
+                account_list["accounts"] = list(self.find_list_members(account_list["_id"]))
+
+            yield account_list
+
+    def find_list_members(self, list_id, batch_size=500):
+        members = self.__list_members.find({"list_id": list_id}, {"_id": 0, "account_id": 1},
+                                           batch_size=batch_size).sort("pos", pymongo.ASCENDING)
+
+        return (member["account_id"] for member in members)
+
+    def find_list_member_page(self, list_id, after=None, limit=100):
+        query = {"list_id": list_id}
+        if after is not None:
+            query["pos"] = {"$gt": after}
+
+        members = self.__list_members.find(query, {"_id": 0, "account_id": 1, "pos": 1}) \
+            .sort("pos", pymongo.ASCENDING).limit(limit)
+
+        return [(member["pos"], member["account_id"]) for member in members]
+
+    @staticmethod
+    def __version_filter(update):
+        """This method returns the filter matching the document an update was based on -
+        documents written before versions were added count as version 0"""
+
+        return {"_id": update["_id"], "ver": update["ver"] if update["ver"] else {"$in": [None, 0]}}
+
+    @staticmethod
+    def __versioned(update, writer):
+        """This method returns the fields an update sets, with the new version and writer token"""
+
+        return dict(update["set"], ver=update["ver"] + 1, writer=writer)
+
+    def __member_changes(self, update):
+        """This method converts the membership part of a list update to write requests"""
+
+        member_requests = [pymongo.DeleteMany({"list_id": update["_id"]})] if update["replace"] else []
+        member_requests += self.__member_requests(update["_id"], update["add"])
+        if update["pull"]:
+            member_requests.append(pymongo.DeleteMany({"list_id": update["_id"],
+                                                       "account_id": {"$in": update["pull"]}}))
+
+        return member_requests
+
+    @staticmethod
+    def __conditional_write(collection, updates, requests, writer):
+        """This method sends conditional updates in one round trip and returns the ids of
+        those that were applied - only if some did not match are the documents read back"""
+
+        if not requests:
+            return set()
+
+        ids = [update["_id"] for update in updates]
+
+        try:
+            result = collection.bulk_write(requests, ordered=False).bulk_api_result
+        except pymongo.errors.BulkWriteError as error:
+            # An upsert whose version did not match collides with the existing _id
+            result = error.details
+            if any(write_error["code"] != 11000 for write_error in result["writeErrors"]):
+                raise
+
+        if result["nMatched"] + result["nUpserted"] == len(requests):
+            return set(ids)
+
+        return {doc["_id"] for doc in collection.find({"_id": {"$in": ids}, "writer": writer}, ["_id"])}
+
+    def __log_changes(self, changes, origin):
+        """This method reserves a block of revisions and appends the changes to the log - another
+        writer can reserve a later block and write it first, which ChangeFeed waits out"""
+
+        if not changes:
+            return self.get_revision()
+
+        counter = self.__counters.find_one_and_update({"_id": "changes"}, {"$inc": {"rev": len(changes)}},
+                                                      upsert=True, return_document=pymongo.ReturnDocument.AFTER)
+        first = counter["rev"] - len(changes) + 1
+
+        self.__changes.insert_many([{"_id": first + offset, "coll": coll, "doc_id": doc_id, "op": op,
+                                     "origin": origin}
+                                    for offset, (coll, doc_id, op) in enumerate(changes)], ordered=False)
+
+        return counter["rev"]
+
+    def get_revision(self):
+        counter = self.__counters.find_one({"_id": "changes"})
+
+        return 0 if counter is None else counter["rev"]
+
+    def find_changes(self, since, batch_size=500):
+        for change in self.__changes.find({"_id": {"$gt": since}}, batch_size=batch_size).sort("_id"):
+            change["rev"] = change.pop("_id")
+            yield change
+
+    def bulk_write(self, account_updates, list_updates, deleted_list_ids, origin=None):
+        writer = uuid.uuid4().hex
+
+        # If account does not exist, add to database, else set only the changed fields
+        account_updates = [update for update in account_updates if update["set"]]
+        written_accounts = self.__conditional_write(
+            self.__accounts, account_updates,
+            [pymongo.UpdateOne(self.__version_filter(update), {"$set": self.__versioned(update, writer)},
+                               upsert=update["upsert"])
+             for update in account_updates],
+            writer
+        )
+
+        # Deleted lists go first, so a list removed and then created again is written fresh
+        if deleted_list_ids:
+            self.__account_lists.bulk_write([pymongo.DeleteOne({"_id": list_id}) for list_id in deleted_list_ids],
+                                            ordered=False)
+
+        # Every list update bumps the list document's version, even if only members changed
+        written_lists = self.__conditional_write(
+            self.__account_lists, list_updates,
+            [pymongo.UpdateOne(self.__version_filter(update), {"$set": self.__versioned(update, writer)},
+                               upsert=update["replace"])
+             for update in list_updates],
+            writer
+        )
+
+        # Members only change for lists whose version check passed
+        member_requests = [pymongo.DeleteMany({"list_id": list_id}) for list_id in deleted_list_ids]
+        for update in list_updates:
+            if update["_id"] in written_lists:
+                member_requests += self.__member_changes(update)
+
+        # Ordered, as a replaced or re-created list must drop its old members before the
+        # new ones are inserted
+        if member_requests:
+            self.__list_members.bulk_write(member_requests, ordered=True)
+
+        conflicts = [("accounts", update["_id"]) for update in account_updates
+                     if update["_id"] not in written_accounts] + \
+                    [("lists", update["_id"]) for update in list_updates if update["_id"] not in written_lists]
+
+        revision = self.__log_changes([("accounts", account_id, "update") for account_id in written_accounts] +
+                                      [("lists", list_id, "delete") for list_id in deleted_list_ids] +
+                                      [("lists", list_id, "update") for list_id in written_lists], origin)
+
+        return revision, conflicts
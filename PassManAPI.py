@@ -0,0 +1,332 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the JSON API (version 1) served
+#                   alongside the HTML WebUI
+# Input:            JSON request bodies
+# Output:           JSON responses
+# Notes:            Every mutating endpoint takes a batch of items and makes
+#                   all of its uploads inside one Database.write_batch(), so a
+#                   call of any size costs one bulk database write. Each item
+#                   gets its own result - one bad item does not fail the rest
+# *****************************************************************************
+
+import datetime
+from flask import Blueprint, jsonify, request
+from Account import Account
+from AccountsList import AccountsList
+from BreachChecker import BreachChecker
+from Database import Database
+from TwoFactorAccount import TFA
+
+
+class API:
+    """Class definition for the JSON API -
+    Mounted under /api/v1 on the WebUI's app, sharing its repository"""
+
+    __blueprint = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+    __repository = None
+
+    @staticmethod
+    def attach(app, repository):
+        """This method serves the API from an app, over the given repository"""
+
+        API.__repository = repository
+
+        if API.__blueprint.name not in app.blueprints:
+            app.register_blueprint(API.__blueprint)
+
+    @staticmethod
+    def __error(message, status=400):
+        return jsonify(error=message), status
+
+    @staticmethod
+    def __items(key):
+        """This method returns the list of items under key in the request body, or None"""
+
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get(key), list):
+            return None
+
+        return body[key]
+
+    @staticmethod
+    def __results(results, error):
+        """This method marks the items whose writes lost to another writer (error, the
+        batch's ConflictError or None), reloads what they touched, and returns the per-item results"""
+
+        if error is not None:
+            API.__repository.apply_conflict(error)
+
+            conflicted = set(error.account_ids) | set(error.list_ids)
+            for result in results:
+                if result.get("ok") and conflicted & set(result.pop("touched", ())):
+                    result["ok"] = False
+                    result["error"] = "Changed elsewhere since it was loaded, not saved"
+
+        for result in results:
+            result.pop("touched", None)
+
+        return jsonify(results=results)
+
+    # Reads
+
+    @staticmethod
+    @__blueprint.route("/lists", methods=["GET"])
+    def get_lists():
+        """This method returns the name and security level of every list"""
+
+        return jsonify(lists=[{"name": account_list.get_list_name(), "sec_factor": account_list.get_sec_factor()}
+                              for account_list in API.__repository.get_lists()])
+
+    @staticmethod
+    @__blueprint.route("/lists/<name>", methods=["GET"])
+    def get_list(name):
+        """This method returns a list with the ids of its accounts"""
+
+        account_list = API.__repository.get_list(name)
+        if account_list is None:
+            return API.__error(f"There is no list named '{name}'", 404)
+
+        return jsonify(name=account_list.get_list_name(), sec_factor=account_list.get_sec_factor(),
+                       accounts=account_list.get_account_ids())
+
+    @staticmethod
+    @__blueprint.route("/accounts", methods=["GET"])
+    def get_accounts():
+        """This method returns accounts, optionally only those for ?site= or in ?list="""
+
+        if "list" in request.args:
+            account_list = API.__repository.get_list(request.args["list"])
+            if account_list is None:
+                return API.__error(f"There is no list named '{request.args['list']}'", 404)
+
+            docs = Database.find_accounts_by_list(account_list.get_list_id())
+        elif "site" in request.args:
+            docs = Database.find_accounts_by_site(request.args["site"])
+        else:
+            docs = Database.find_accounts()
+
+        accounts = []
+        for doc in docs:
+            doc["id"] = doc.pop("_id")
+            accounts.append(doc)
+
+        return jsonify(accounts=accounts)
+
+    # Batches
+
+    @staticmethod
+    @__blueprint.route("/lists", methods=["POST"])
+    def create_lists():
+        """This method creates lists - body: {"lists": [{"name", "sec_factor"}, ...]}"""
+
+        items = API.__items("lists")
+        if items is None:
+            return API.__error("Expected a JSON body with a 'lists' array")
+
+        results = []
+        with Database.write_batch() as batch:
+            for item in items:
+                try:
+                    name = str(item["name"]).lower().capitalize()
+                    sec = int(item["sec_factor"])
+                except (KeyError, TypeError, ValueError):
+                    results.append({"ok": False, "error": "Each list needs a name and a whole number sec_factor"})
+                    continue
+
+                if not 1 <= sec <= 10:
+                    results.append({"name": name, "ok": False, "error": "sec_factor must be from 1 to 10"})
+                    continue
+
+                new_list = AccountsList(name, sec)
+                if not API.__repository.add_list(new_list):
+                    results.append({"name": name, "ok": False, "error": f"List '{name}' already exists"})
+                    continue
+
+                AccountsList.upload(new_list)
+                results.append({"name": name, "ok": True, "touched": [new_list.get_list_id()]})
+
+        return API.__results(results, batch.conflicts)
+
+    @staticmethod
+    @__blueprint.route("/lists", methods=["DELETE"])
+    def delete_lists():
+        """This method deletes lists - body: {"lists": [name, ...]}"""
+
+        items = API.__items("lists")
+        if items is None:
+            return API.__error("Expected a JSON body with a 'lists' array")
+
+        results = []
+        with Database.write_batch() as batch:
+            for name in items:
+                account_list = API.__repository.get_list(str(name))
+                if account_list is None:
+                    results.append({"name": name, "ok": False, "error": f"There is no list named '{name}'"})
+                    continue
+
+                API.__repository.remove_list(account_list)
+                AccountsList.remove_list(account_list)
+                results.append({"name": account_list.get_list_name(), "ok": True})
+
+        return API.__results(results, batch.conflicts)
+
+    @staticmethod
+    @__blueprint.route("/accounts", methods=["POST"])
+    def create_accounts():
+        """This method creates accounts and adds them to lists - body: {"accounts": [{"site", "url",
+        "uname", "pwd", "lists": [name, ...], and "typ" and "info" for two-factor accounts}, ...]}"""
+
+        items = API.__items("accounts")
+        if items is None:
+            return API.__error("Expected a JSON body with an 'accounts' array")
+
+        tlc = str(datetime.date.today())
+        checker = BreachChecker.default()
+        results = []
+        changed_lists = {}
+
+        with Database.write_batch() as batch:
+            for item in items:
+                try:
+                    site = str(item["site"]).lower().capitalize()
+                    url = str(item["url"]).lower()
+                    uname = str(item["uname"])
+                    pwd = str(item["pwd"])
+                    lists = [API.__repository.get_list(str(name)) for name in item.get("lists", [])]
+                except (KeyError, TypeError, AttributeError):
+                    results.append({"ok": False, "error": "Each account needs a site, url, uname and pwd"})
+                    continue
+
+                if not site or not uname or not pwd:
+                    results.append({"ok": False, "error": "Site, username and password can not be empty"})
+                    continue
+
+                if None in lists:
+                    results.append({"id": f"{site}: {uname}", "ok": False, "error": "Unknown list"})
+                    continue
+
+                if API.__repository.find_account(site, uname) is not None:
+                    results.append({"id": f"{site}: {uname}", "ok": False,
+                                    "error": f"'{site}: {uname}' combination already exists"})
+                    continue
+
+                if checker is not None and checker.is_breached(pwd):
+                    results.append({"id": f"{site}: {uname}", "ok": False,
+                                    "error": "Password appears in a known data breach"})
+                    continue
+
+                if "typ" in item or "info" in item:
+                    account = TFA(site, url, uname, pwd, tlc, str(item.get("typ", "")), str(item.get("info", "")))
+                else:
+                    account = Account(site, url, uname, pwd, tlc)
+
+                Account.upload(account)
+                API.__repository.add_account(account)
+
+                for account_list in lists:
+                    account_list.add_account(account)
+                    changed_lists[account_list.get_key()] = account_list
+
+                results.append({"id": account.get_key(), "ok": True,
+                                "touched": [account.get_key()] + [lst.get_list_id() for lst in lists]})
+
+            # Each list is uploaded once, with all of its new members
+            for account_list in changed_lists.values():
+                AccountsList.upload(account_list)
+
+        return API.__results(results, batch.conflicts)
+
+    @staticmethod
+    @__blueprint.route("/passwords", methods=["POST"])
+    def update_passwords():
+        """This method changes passwords - body: {"passwords": [{"id", "pwd"}, ...]}"""
+
+        items = API.__items("passwords")
+        if items is None:
+            return API.__error("Expected a JSON body with a 'passwords' array")
+
+        checker = BreachChecker.default()
+        results = []
+        with Database.write_batch() as batch:
+            for item in items:
+                try:
+                    account_id = str(item["id"])
+                    pwd = str(item["pwd"])
+                except (KeyError, TypeError):
+                    results.append({"ok": False, "error": "Each item needs an id and a pwd"})
+                    continue
+
+                account = API.__repository.get_account(account_id)
+                if account is None or not pwd:
+                    results.append({"id": account_id, "ok": False,
+                                    "error": "Password can not be empty" if account else
+                                    f"There is no account named '{account_id}'"})
+                    continue
+
+                if checker is not None and checker.is_breached(pwd):
+                    results.append({"id": account_id, "ok": False,
+                                    "error": "Password appears in a known data breach"})
+                    continue
+
+                account.set_account_pwd(pwd)
+                Account.upload(account)
+                results.append({"id": account_id, "ok": True, "touched": [account_id]})
+
+        return API.__results(results, batch.conflicts)
+
+    @staticmethod
+    @__blueprint.route("/moves", methods=["POST"])
+    def move_accounts():
+        """This method moves accounts between lists - body: {"moves": [{"id", "from", "to"}, ...]},
+        where a move without 'from' only adds and a move without 'to' only removes"""
+
+        items = API.__items("moves")
+        if items is None:
+            return API.__error("Expected a JSON body with a 'moves' array")
+
+        results = []
+        changed_lists = {}
+
+        with Database.write_batch() as batch:
+            for item in items:
+                try:
+                    account_id = str(item["id"])
+                    source = API.__repository.get_list(str(item["from"])) if item.get("from") else None
+                    target = API.__repository.get_list(str(item["to"])) if item.get("to") else None
+                except (KeyError, TypeError, AttributeError):
+                    results.append({"ok": False, "error": "Each move needs an id and a from or to list"})
+                    continue
+
+                account = API.__repository.get_account(account_id)
+                if account is None:
+                    results.append({"id": account_id, "ok": False, "error": f"There is no account named '{account_id}'"})
+                    continue
+
+                if (item.get("from") and source is None) or (item.get("to") and target is None) or \
+                        (source is None and target is None):
+                    results.append({"id": account_id, "ok": False, "error": "Unknown list"})
+                    continue
+
+                if source is not None:
+                    if account not in source:
+                        results.append({"id": account_id, "ok": False,
+                                        "error": f"{account_id} is not in list '{source.get_list_name()}'"})
+                        continue
+
+                    source.remove(account)
+                    changed_lists[source.get_key()] = source
+
+                if target is not None:
+                    target.add_account(account)
+                    changed_lists[target.get_key()] = target
+
+                results.append({"id": account_id, "ok": True,
+                                "touched": [lst.get_list_id() for lst in (source, target) if lst is not None]})
+
+            # Each list is uploaded once, with all of its membership changes
+            for account_list in changed_lists.values():
+                AccountsList.upload(account_list)
+
+        return API.__results(results, batch.conflicts)
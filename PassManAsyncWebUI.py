@@ -0,0 +1,314 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Async UI class for the web implementation of PassMan
+# Input:            Various
+# Output:           Various
+# Notes:            Same routes and templates as PassManWebUI, but on Quart
+#                   (the asyncio version of the Flask API) so it runs on an
+#                   ASGI server and one process can keep many requests in
+#                   flight. The pages are built by WebPages, shared with
+#                   PassManWebUI, on a worker thread through AsyncDatabase,
+#                   so nothing that may wait on the database runs on the
+#                   event loop
+# *****************************************************************************
+
+import os
+from quart import Quart, render_template, stream_template, request, redirect, url_for, jsonify
+from AsyncDatabase import AsyncDatabase
+from WebPages import Page, WebPages
+from Database import ConflictError
+
+
+class AsyncWebUI:
+    """Class definition for the async web UI -
+    View the output on localhost:8000/"""
+
+    __app = Quart(__name__)
+    __pages = None
+
+    def __init__(self):
+        self.__app.secret_key = self.generate_key()
+
+    @staticmethod
+    def generate_key():
+        """This method generates a cryptographically random session key"""
+
+        return os.urandom(6)
+
+    @staticmethod
+    async def __render(page):
+        """This method renders a shared page - a streamed one is sent as it is rendered, its
+        iterator read one chunk at a time on a worker thread"""
+
+        if page.stream is not None:
+            page.context[page.stream] = AsyncDatabase.iterate(page.context[page.stream])
+            return await stream_template(page.template, **page.context)
+
+        return await render_template(page.template, **page.context), page.status
+
+    @staticmethod
+    async def __page(build, *args):
+        """This method builds a shared page on a worker thread and renders it"""
+
+        return await AsyncWebUI.__render(await AsyncDatabase.run(build, *args))
+
+    @staticmethod
+    @__app.before_serving
+    async def start_sync():
+        """This method loads the model and starts syncing with the database - with
+        PASSMAN_SHARED_STATE set to a file path, every worker process using that path sees
+        each other's changes before its next request"""
+
+        AsyncWebUI.__pages = await AsyncDatabase.run(WebPages)
+
+    @staticmethod
+    @__app.after_serving
+    async def stop_sync():
+        """This method stops syncing and writes any queued changes once the server stops"""
+
+        await AsyncDatabase.run(AsyncWebUI.__pages.stop)
+
+    @staticmethod
+    @__app.before_request
+    async def catch_up():
+        """This method brings the model up to date before a request if another worker
+        has published a newer revision"""
+
+        if AsyncWebUI.__pages.needs_catch_up():
+            await AsyncDatabase.run(AsyncWebUI.__pages.catch_up)
+
+    @staticmethod
+    @__app.after_request
+    async def publish_changes(response):
+        """This method writes this request's changes, reports any that lost to another
+        writer, and publishes their revision to the other workers"""
+
+        error = await AsyncDatabase.run(AsyncWebUI.__pages.publish_changes)
+        if error is not None:
+            return await AsyncWebUI.__app.make_response(await AsyncWebUI.show_conflict(error))
+
+        return response
+
+    @staticmethod
+    @__app.errorhandler(ConflictError)
+    async def show_conflict(error):
+        """This method reloads whatever was changed elsewhere and tells the user their
+        change was not saved"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.conflict, error)
+
+    @staticmethod
+    @__app.route("/")
+    @__app.route("/home")
+    @__app.route("/index")
+    @__app.route("/default")
+    @__app.route("/index.html")
+    @__app.route("/default.html")
+    async def redirect_to_menu():
+        """This method redirects common homepage URLs to /menu"""
+
+        return redirect(url_for("homepage"))
+
+    @staticmethod
+    @__app.route("/menu")
+    async def homepage():
+        """This method defines the homepage and its menu options"""
+
+        return await AsyncWebUI.__render(WebPages.menu())
+
+    @staticmethod
+    @__app.route("/print-lists")
+    async def print_lists():
+        """This method displays a list of all account lists"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.lists_page, "print_lists.html")
+
+    @staticmethod
+    @__app.route("/select-list-to-print")
+    async def select_list_to_print():
+        """This method directs the user to a data acquisition form"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.lists_page, "print_list_form.html")
+
+    @staticmethod
+    @__app.route("/print-account-list")
+    async def print_account_list():
+        """This method displays all accounts saved in a particular account list"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.print_account_list, request.args)
+
+    @staticmethod
+    @__app.route("/print-all-accounts")
+    async def print_all_accounts():
+        """This method displays all saved accounts"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.print_all_accounts, request.args)
+
+    @staticmethod
+    @__app.route("/get-info-for-create-list")
+    async def get_info_for_create_list():
+        """This method directs the user to a data acquisition form"""
+
+        return await AsyncWebUI.__render(Page("create_list_form.html"))
+
+    @staticmethod
+    @__app.route("/create-list")
+    async def create_list():
+        """This method allows the user to create a new account list"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.create_list, request.args)
+
+    @staticmethod
+    @__app.route("/select-list-to-delete")
+    async def select_list_to_delete():
+        """This method directs the user to a data acquisition form"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.lists_page, "delete_list_form.html")
+
+    @staticmethod
+    @__app.route("/delete-list")
+    async def delete_list():
+        """This method allows a user to delete an account list"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.delete_list, request.args)
+
+    @staticmethod
+    @__app.route("/select-list-for-account-removal")
+    async def select_list_for_account_removal():
+        """This method directs the user to a data acquisition form"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.lists_page, "select_list_form.html")
+
+    @staticmethod
+    @__app.route("/select-account-to-remove")
+    async def select_account_to_remove():
+        """This method directs the user to a data acquisition form"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.select_account_to_remove, request.args)
+
+    @staticmethod
+    @__app.route("/select-lists-to-join")
+    async def select_lists_to_join():
+        """This method directs the user to a data acquisition form"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.lists_page, "join_lists_form.html")
+
+    @staticmethod
+    @__app.route("/join-lists")
+    async def join_lists():
+        """This method joins two selected lists"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.join_lists, request.args)
+
+    @staticmethod
+    @__app.route("/remove-account")
+    async def remove_account():
+        """This method removes a selected account from a selected list"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.remove_account, request.args)
+
+    @staticmethod
+    @__app.route("/get-data-for-update")
+    async def get_data_for_update():
+        """This method directs the user to a data acquisition form"""
+
+        # Accounts are found through /search as the user types
+        return await AsyncWebUI.__render(Page("update_password_form.html"))
+
+    @staticmethod
+    @__app.route("/search")
+    async def search():
+        """This method returns the ids of the accounts matching ?q= as JSON, for type-ahead -
+        lookups are in memory and take microseconds, so they run on the event loop"""
+
+        return jsonify(AsyncWebUI.__pages.search(request.args))
+
+    @staticmethod
+    @__app.route("/autofill")
+    async def autofill():
+        """This method returns the ids of the accounts for the page at ?url= as JSON, for a
+        browser helper - answered from memory, so it runs on the event loop"""
+
+        return jsonify(AsyncWebUI.__pages.autofill(request.args))
+
+    @staticmethod
+    @__app.route("/stale-accounts")
+    async def stale_accounts():
+        """This method displays the accounts whose passwords are older than ?days=, by list"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.stale_accounts, request.args)
+
+    @staticmethod
+    @__app.route("/rotation-due")
+    async def rotation_due():
+        """This method displays the accounts whose passwords are due or overdue for a change"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.rotation_due)
+
+    @staticmethod
+    @__app.route("/select-accounts-to-rotate")
+    async def select_accounts_to_rotate():
+        """This method directs the user to a data acquisition form"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.select_accounts_to_rotate)
+
+    @staticmethod
+    @__app.route("/rotate-passwords", methods=["POST"])
+    async def rotate_passwords():
+        """This method gives new random passwords to a list's accounts, or to every account past
+        an age, and reports any that failed"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.rotate_passwords, await request.form)
+
+    @staticmethod
+    @__app.route("/breach-report")
+    async def breach_report():
+        """This method lists the accounts whose passwords are in the breach corpus"""
+
+        return await AsyncWebUI.__page(WebPages.breach_report)
+
+    @staticmethod
+    @__app.route("/reuse-report")
+    async def reuse_report():
+        """This method lists the groups of accounts that share a password"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.reuse_report)
+
+    @staticmethod
+    @__app.route("/strength-report")
+    async def strength_report():
+        """This method lists the weakest saved passwords first, up to ?limit="""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.strength_report, request.args)
+
+    @staticmethod
+    @__app.route("/update-password", methods=["POST"])
+    async def update_password():
+        """This method updates the password for a selected account"""
+
+        return await AsyncWebUI.__page(AsyncWebUI.__pages.update_password, await request.form)
+
+    @staticmethod
+    def start():
+        """This method returns the Quart app - the model is loaded when the server starts"""
+
+        return AsyncWebUI.__app
+
+    @staticmethod
+    def run():
+        """This method runs the UI"""
+
+        AsyncWebUI.start().run(port=8000)
+
+
+def create_app():
+    """Entry point for ASGI servers, for example
+    hypercorn 'PassManAsyncWebUI:create_app()' or uvicorn --factory PassManAsyncWebUI:create_app"""
+
+    return AsyncWebUI().start()
+
+
+if __name__ == "__main__":
+    app = AsyncWebUI()
+    app.run()
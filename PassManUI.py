@@ -12,14 +12,28 @@ import datetime
 from TwoFactorAccount import TFA
 from Account import Account
 from AccountsList import AccountsList
+from AccountRepository import AccountRepository
+from Database import Database, ConflictError
+from SearchIndex import SearchIndex
+from PasswordAgeIndex import PasswordAgeIndex
+from PasswordGenerator import PasswordGenerator
+from RotationJob import RotationJob
+from BreachChecker import BreachChecker
+from ReuseIndex import ReuseIndex
+from StrengthEstimator import StrengthEstimator
 import input_validation as validate
 
 
 class PassManUI:
     """Main UI class"""
 
-    __accounts = None
-    __account_lists = []
+    SEARCH_LIMIT = 10
+
+    __repository = None
+    __search_index = None
+    __age_index = None
+    __reuse_index = None
+    __strength_estimator = None
 
     @staticmethod
     def print_menu():
@@ -35,36 +49,59 @@ class PassManUI:
         print("7) Remove Account From a List")
         print("8) Change Password for an Account")
         print("9) Join Two Account Lists")
+        print("10) Stale Password Report")
+        print("11) Rotate Passwords in Bulk")
+        print("12) Breached Password Report")
+        print("13) Password Reuse Report")
+        print("14) Password Strength Report")
         print("0) Exit")
 
     @staticmethod
     def find_account(acc_list):
-        """This method takes an account list and finds and returns an account using site and username"""
+        """This method takes an account list and finds and returns an account by searching its
+        site, username and URL - each search narrows the matches until one is chosen"""
 
-        # Display available accounts
-        choices = [f"{acc.get_account_name()}: {acc.get_account_uname()}" for acc in acc_list] + ["Back"]
-        print(choices)
+        # Searching all accounts needs no membership check
+        def accept(account_id):
+            return acc_list is PassManUI.__repository.get_accounts() or account_id in acc_list
 
-        # Validate user choice
-        account = validate.select_item(choices=choices, prompt="Which account (Site: Username): ").lower()
+        query = input("\nSearch by site, username or URL (blank to go back): ").strip()
 
-        if account == "Back":
-            return None
-        else:
-            for acc in acc_list:
-                if account == f"{acc.get_account_name().lower()}: {acc.get_account_uname().lower()}":
-                    return acc
+        while query:
+            matches = PassManUI.__search_index.search(query, PassManUI.SEARCH_LIMIT, accept)
+
+            if not matches:
+                print("No accounts match")
+            for number, account_id in enumerate(matches, 1):
+                print(f"{number}) {account_id}")
+
+            # A number picks a match, anything else is a new search
+            choice = input("\nChoose a number, or search again (blank to go back): ").strip()
+            if choice.isdigit() and 1 <= int(choice) <= len(matches):
+                return PassManUI.__repository.get_account(matches[int(choice) - 1])
+
+            query = choice
 
-            return None
+        return None
+
+    @staticmethod
+    def warn_if_reused(pwd, account_id=None):
+        """This method warns the user when a password is already used by other accounts"""
+
+        users = PassManUI.__reuse_index.users_of(pwd, exclude=account_id)
+
+        if users:
+            print(f"WARNING: This password is already used by {len(users)} other account(s): {', '.join(users)}")
 
     @staticmethod
     def change_passwd():
         """This method allows the user to change the password for a selected account"""
 
-        account = PassManUI.find_account(PassManUI.__accounts)
+        account = PassManUI.find_account(PassManUI.__repository.get_accounts())
 
         if account is not None:
             pwd = validate.password()
+            PassManUI.warn_if_reused(pwd, account.get_key())
 
             account.set_account_pwd(pwd)
             Account.upload(account)
@@ -77,28 +114,27 @@ class PassManUI:
         """This method allows a user to remove an account from a list"""
 
         # Display available lists
-        print(list(item.get_list_name() for item in PassManUI.__account_lists) + ["Back"])
+        print(PassManUI.__repository.get_list_names() + ["Back"])
 
         # Validate user choice
-        lst = validate.select_item(choices=[item.get_list_name() for item in PassManUI.__account_lists] + ["Back"],
+        lst = validate.select_item(choices=PassManUI.__repository.get_list_names() + ["Back"],
                                    prompt="Choose a list to remove an account from: ").lower().capitalize()
 
         if lst != "Back":
+            acc_list = PassManUI.__repository.get_list(lst)
 
-            # For each list in the list of account lists
-            for acc_list in PassManUI.__account_lists:
-                if acc_list.get_list_name().lower() == lst.lower():
+            if acc_list is not None:
 
-                    # Returns 'None' or a valid account
-                    account = PassManUI.find_account(acc_list)
+                # Returns 'None' or a valid account
+                account = PassManUI.find_account(acc_list)
 
-                    if account is not None and account in acc_list:
-                        # Remove account from list
-                        acc_list.remove(account)
-                        AccountsList.upload(acc_list)
+                if account is not None and account in acc_list:
+                    # Remove account from list
+                    acc_list.remove(account)
+                    AccountsList.upload(acc_list)
 
-                        print(f"\n{account} removed from {acc_list}")
-                        input("\nPress <Enter> to continue: ")
+                    print(f"\n{account} removed from {acc_list}")
+                    input("\nPress <Enter> to continue: ")
 
     @staticmethod
     def add_new_account():
@@ -106,28 +142,28 @@ class PassManUI:
         to not run a check for duplicates as multiple logins may be used for the same site"""
 
         # Display available lists
-        print(list(item.get_list_name() for item in PassManUI.__account_lists) + ["Back"])
+        print(PassManUI.__repository.get_list_names() + ["Back"])
 
         # Validate user choice
-        name = validate.select_item(choices=[item.get_list_name() for item in PassManUI.__account_lists] + ["Back"],
+        name = validate.select_item(choices=PassManUI.__repository.get_list_names() + ["Back"],
                                     prompt="Choose a list to add new account to: ").lower().capitalize()
 
         # Add new account to chosen list
         if name != "Back":
-            for chosen_list in PassManUI.__account_lists:
-                if chosen_list.get_list_name().lower() == name.lower():
-                    account = PassManUI.create_account()
+            chosen_list = PassManUI.__repository.get_list(name)
 
-                    if account is not None:
-                        chosen_list.add_account(account)
-                        PassManUI.__accounts.append(account)
+            if chosen_list is not None:
+                account = PassManUI.create_account()
 
-                        # Update database
-                        AccountsList.upload(chosen_list)
-                        AccountsList.upload(PassManUI.__accounts)
+                if account is not None:
+                    chosen_list.add_account(account)
+                    PassManUI.__repository.add_account(account)
 
-                        print(f"\nNew account for {account.get_account_name()} was added to list '{name}'")
-                        input("\nPress <Enter> to continue: ")
+                    # Update database - the account itself was uploaded when it was created
+                    AccountsList.upload(chosen_list)
+
+                    print(f"\nNew account for {account.get_account_name()} was added to list '{name}'")
+                    input("\nPress <Enter> to continue: ")
 
     @staticmethod
     def create_account():
@@ -141,6 +177,14 @@ class PassManUI:
         url = validate.input_string(prompt="Enter the URL of the site: ", error=f"URL {error_str}").lower()
         uname = validate.input_string(prompt="Enter the username: ", error=f"Username {error_str}")
         pwd = validate.input_string(prompt="Enter the password: ", error=f"Password {error_str}")
+
+        # New passwords get the same breach check as changed ones
+        checker = BreachChecker.default()
+        while checker is not None and checker.is_breached(pwd):
+            print("\nThat password appears in a known data breach - choose another")
+            pwd = validate.input_string(prompt="Enter the password: ", error=f"Password {error_str}")
+
+        PassManUI.warn_if_reused(pwd)
         tlc = str(datetime.date.today())
 
         # Check for two-factor account
@@ -151,12 +195,11 @@ class PassManUI:
             info = validate.input_string(prompt="Enter the information needed to authenticate "
                                                 "(pin #, biometric, etc.): ")
 
-            # Check for duplicate lists
-            for account in PassManUI.__accounts:
-                if site == account.get_account_name() and uname == account.get_account_uname():
-                    print(f"ERROR: '{site}: {uname}' combination already exists")
-                    input("\nPress <Enter> to continue: ")
-                    return
+            # Check for duplicate accounts
+            if PassManUI.__repository.find_account(site, uname) is not None:
+                print(f"ERROR: '{site}: {uname}' combination already exists")
+                input("\nPress <Enter> to continue: ")
+                return
 
             # Create TFA Account
             account = TFA(site, url, uname, pwd, tlc, typ, info)
@@ -165,12 +208,11 @@ class PassManUI:
             TFA.upload(account)
 
         else:
-            # Check for duplicate lists
-            for account in PassManUI.__accounts:
-                if site == account.get_account_name() and uname == account.get_account_uname():
-                    print(f"ERROR: '{site}: {uname} combination already exists")
-                    input("\nPress <Enter> to continue: ")
-                    return
+            # Check for duplicate accounts
+            if PassManUI.__repository.find_account(site, uname) is not None:
+                print(f"ERROR: '{site}: {uname}' combination already exists")
+                input("\nPress <Enter> to continue: ")
+                return
 
             # Create standard account
             account = Account(site, url, uname, pwd, tlc)
@@ -189,15 +231,14 @@ class PassManUI:
         sec = validate.input_number(prompt="Set security level (1-10): ", ge=1, le=10)
 
         # Check for duplicate lists
-        for account_list in PassManUI.__account_lists:
-            if name == account_list.get_list_name():
-                print(f"ERROR: List '{name}' already exists")
-                input("\nPress <Enter> to continue: ")
-                return
+        if PassManUI.__repository.get_list(name) is not None:
+            print(f"ERROR: List '{name}' already exists")
+            input("\nPress <Enter> to continue: ")
+            return
 
         # Add new list to list of lists
         new_list = AccountsList(name, sec)
-        PassManUI.__account_lists.append(new_list)
+        PassManUI.__repository.add_list(new_list)
 
         # Update database
         AccountsList.upload(new_list)
@@ -210,18 +251,19 @@ class PassManUI:
         """This method allows a user to delete an account list"""
 
         # Display available lists
-        print(list(item.get_list_name() for item in PassManUI.__account_lists) + ["Back"])
+        print(PassManUI.__repository.get_list_names() + ["Back"])
 
         # Validate user choice
-        name = validate.select_item(choices=[item.get_list_name() for item in PassManUI.__account_lists] + ["Back"],
+        name = validate.select_item(choices=PassManUI.__repository.get_list_names() + ["Back"],
                                     prompt="Choose a list to delete: ").lower().capitalize()
 
         # Delete selected list
         if name != "Back":
-            for acc_list in PassManUI.__account_lists:
-                if acc_list.get_list_name().lower() == name.lower():
-                    PassManUI.__account_lists.remove(acc_list)
-                    AccountsList.remove_list(acc_list)
+            acc_list = PassManUI.__repository.get_list(name)
+
+            if acc_list is not None:
+                PassManUI.__repository.remove_list(acc_list)
+                AccountsList.remove_list(acc_list)
 
             print(f"\nDeleted '{name}' account list")
 
@@ -233,41 +275,50 @@ class PassManUI:
 
         # Display available lists
         print("Lists available for joining:")
-        print(list(item.get_list_name() for item in PassManUI.__account_lists) + ["Back"])
+        print(PassManUI.__repository.get_list_names() + ["Back"])
 
         # Validate  first user choice
-        name1 = validate.select_item(choices=[item.get_list_name() for item in PassManUI.__account_lists] + ["Back"],
+        name1 = validate.select_item(choices=PassManUI.__repository.get_list_names() + ["Back"],
                                      prompt="\nChoose first list: ").lower().capitalize()
 
         if name1 != "Back":
-            for item1 in PassManUI.__account_lists:
-                if item1.get_list_name() == name1:
+            item1 = PassManUI.__repository.get_list(name1)
 
-                    # Validate second user choice
-                    name2 = validate.select_item(choices=[item.get_list_name() for item in PassManUI.__account_lists],
-                                                 prompt="Choose second list: ").lower().capitalize()
+            if item1 is not None:
 
-                    for item2 in PassManUI.__account_lists:
-                        if item2.get_list_name() == name2:
+                # Validate second user choice
+                name2 = validate.select_item(choices=PassManUI.__repository.get_list_names(),
+                                             prompt="Choose second list: ").lower().capitalize()
+                item2 = PassManUI.__repository.get_list(name2)
 
-                            # Join the lists
-                            joined = item1 + item2
+                if item2 is not None:
 
-                            # Add joined list to lists and database
-                            PassManUI.__account_lists.append(joined)
-                            AccountsList.upload(joined)
+                    # Join the lists
+                    joined = item1 + item2
 
-                            print(f"\nJoined {item1} with {item2}, creating {joined} "
-                                  f"with security level {joined.get_sec_factor()}")
-                            input("\nPress <Enter> to continue: ")
+                    # Add joined list to lists and database
+                    if not PassManUI.__repository.add_list(joined):
+                        print(f"ERROR: List '{joined}' already exists")
+                        input("\nPress <Enter> to continue: ")
+                        return
+
+                    AccountsList.upload(joined)
+
+                    print(f"\nJoined {item1} with {item2}, creating {joined} "
+                          f"with security level {joined.get_sec_factor()}")
+                    input("\nPress <Enter> to continue: ")
 
     @staticmethod
     def print_account_list(account_list):
         """This method takes an account list object and prints its contents"""
 
+        # Every password in the list is scored in one batch
+        accounts = list(account_list)
+        strengths = PassManUI.__strength_estimator.score_accounts(accounts)
+
         print(account_list.get_list_name(), ": ")
-        for account in account_list:
-            print(">> ", account)
+        for account in accounts:
+            print(">> ", account, f"(password strength: {strengths[account.get_key()]['label']})")
 
     @staticmethod
     def print_lists():
@@ -275,20 +326,28 @@ class PassManUI:
 
         print("These are the current account lists:")
 
-        for lst in PassManUI.__account_lists:
+        for lst in PassManUI.__repository.get_lists():
             print(lst)
 
         input("\nPress <Enter> to continue: ")
 
     @staticmethod
     def print_accounts():
-        """This method displays all saved accounts"""
+        """This method displays all saved accounts, one page at a time"""
 
-        # Print all saved accounts
-        acc_list = PassManUI.__accounts
+        # Print a page, then carry on from where it ended until the user stops
+        cursor = None
+        while True:
+            page, cursor = Database.find_accounts_page(cursor, fields=["_id"])
 
-        for acc in acc_list:
-            print(f"{acc}")
+            for doc in page:
+                print(doc["_id"])
+
+            if cursor is None:
+                break
+
+            if input("\nPress <Enter> for more, or Q to stop: ").strip().lower() == "q":
+                return
 
         input("\nPress <Enter> to continue: ")
 
@@ -297,52 +356,209 @@ class PassManUI:
         """This method allows a user to display the accounts in an account list"""
 
         # Display available lists
-        print(list(item.get_list_name() for item in PassManUI.__account_lists))
+        print(PassManUI.__repository.get_list_names())
 
         # Validate user choice
-        name = validate.select_item(choices=[item.get_list_name() for item in PassManUI.__account_lists],
+        name = validate.select_item(choices=PassManUI.__repository.get_list_names(),
                                     prompt="Choose a list to display: ").lower().capitalize()
 
         # Display contents of selected list
-        for item in PassManUI.__account_lists:
-            if item.get_list_name().lower() == name.lower():
-                PassManUI.print_account_list(item)
+        item = PassManUI.__repository.get_list(name)
+        if item is not None:
+            PassManUI.print_account_list(item)
+
+        input("\nPress <Enter> to continue: ")
+
+    @staticmethod
+    def stale_report():
+        """This method displays the accounts whose passwords have not been changed in a chosen
+        number of days, grouped by list"""
+
+        days = validate.input_int(prompt="\nShow passwords older than how many days: ", ge=0)
+        groups = PassManUI.__age_index.older_than_by_list(days)
+
+        if not groups:
+            print(f"\nEvery password has been changed in the last {days} days")
+
+        for name, entries in groups.items():
+            print(f"\n{name if name else 'Not in any list'}:")
+            for account_id, changed in entries:
+                print(">> ", account_id, "- last changed", changed if changed.year > 1 else "on an unknown date")
+
+        input("\nPress <Enter> to continue: ")
+
+    @staticmethod
+    def bulk_rotate():
+        """This method gives new random passwords to every account in a list, or to every account
+        whose password is older than a chosen number of days, and reports any that failed"""
+
+        choice = validate.select_item(choices=["List", "Age", "Back"],
+                                      prompt="\nRotate a whole list, or every password past an age (List/Age/Back): ")
+
+        if choice == "List":
+            print(PassManUI.__repository.get_list_names())
+            name = validate.select_item(choices=PassManUI.__repository.get_list_names(),
+                                        prompt="Choose a list to rotate: ").lower().capitalize()
+            account_list = PassManUI.__repository.get_list(name)
+            if account_list is None:
+                return
+
+            account_ids = account_list.get_account_ids()
+            length = PasswordGenerator.length_for(account_list.get_sec_factor())
+        elif choice == "Age":
+            days = validate.input_int(prompt="\nRotate passwords older than how many days: ", ge=0)
+            account_ids = [account_id for account_id, changed in PassManUI.__age_index.older_than(days)]
+            length = PasswordGenerator.DEFAULT_LENGTH
+        else:
+            return
+
+        if not account_ids:
+            print("\nThere are no accounts to rotate")
+            input("\nPress <Enter> to continue: ")
+            return
+
+        if not validate.y_or_n(prompt=f"\nGive {len(account_ids)} account(s) new passwords (Yes/No): "):
+            return
+
+        results = RotationJob.rotate(PassManUI.__repository, account_ids, length)
+        failed = [result for result in results if not result["ok"]]
+
+        print(f"\nRotated {len(results) - len(failed)} of {len(results)} passwords")
+        if len(failed) < len(results):
+            print("Change each password on its site too - the sites still expect the old ones:")
+        for result in results:
+            if result["ok"]:
+                print(f">> {result['id']}: {result['pwd']}")
+        for result in failed:
+            print(f"ERROR: {result['id']}: {result['error']}")
 
         input("\nPress <Enter> to continue: ")
 
+    @staticmethod
+    def breach_report():
+        """This method checks every saved password against the breach corpus and lists the
+        accounts whose passwords were found"""
+
+        checker = BreachChecker.default()
+
+        if checker is None:
+            print("\nNo breach corpus is set up - set PASSMAN_BREACH_CORPUS to the path of one")
+        else:
+            breached = checker.scan_vault()
+
+            if not breached:
+                print("\nNo saved password appears in a known data breach")
+            for account_id in breached:
+                print(">> ", account_id, "- password appears in a known data breach")
+
+        input("\nPress <Enter> to continue: ")
+
+    @staticmethod
+    def reuse_report():
+        """This method lists the groups of accounts that share a password"""
+
+        groups = PassManUI.__reuse_index.reused_groups()
+
+        if not groups:
+            print("\nNo password is used by more than one account")
+
+        for number, group in enumerate(groups, 1):
+            print(f"\nShared password {number} ({len(group)} accounts):")
+            for account_id in group:
+                print(">> ", account_id)
+
+        input("\nPress <Enter> to continue: ")
+
+    @staticmethod
+    def strength_report():
+        """This method scores every saved password and displays them weakest first, one page
+        at a time"""
+
+        results = PassManUI.__strength_estimator.weakest_first()
+
+        if not results:
+            print("\nThere are no saved passwords")
+
+        for start in range(0, len(results), Database.PAGE_SIZE):
+            for account_id, strength in results[start:start + Database.PAGE_SIZE]:
+                warning = f" ({strength['warning']})" if strength["warning"] else ""
+                print(">> ", account_id, f"- {strength['label']}{warning}")
+
+            if start + Database.PAGE_SIZE < len(results) and \
+                    input("\nPress <Enter> for more, or Q to stop: ").strip().lower() == "q":
+                return
+
+        input("\nPress <Enter> to continue: ")
+
+    @staticmethod
+    def check_conflicts(error=None):
+        """This method writes queued changes and reports any that lost to another writer,
+        reloading what was changed elsewhere"""
+
+        if error is None:
+            Database.flush()
+            error = Database.take_conflicts()
+
+        if error is not None:
+            PassManUI.__repository.apply_conflict(error)
+            print(f"\nERROR: {error}")
+            input("\nPress <Enter> to continue: ")
+
     @staticmethod
     def run():
         """Run the UI"""
 
-        PassManUI.__accounts, PassManUI.__account_lists = AccountsList.fetch_data()
+        PassManUI.__repository = AccountRepository.load(lazy=True)
+        PassManUI.__search_index = SearchIndex(PassManUI.__repository, background=True)
+        PassManUI.__age_index = PasswordAgeIndex(PassManUI.__repository, background=True)
+        PassManUI.__reuse_index = ReuseIndex(PassManUI.__repository, background=True)
+        PassManUI.__strength_estimator = StrengthEstimator()
 
         while True:
             PassManUI.print_menu()
 
             # Get and validate menu choice
-            choice = validate.select_item(choices=["1", "2", "3", "4", "5", "6", "7", "8", "9", "0"],
+            choice = validate.select_item(choices=[str(number) for number in range(1, 15)] + ["0"],
                                           prompt=">> ")
-            if choice == "1":
-                PassManUI.print_lists()
-            elif choice == "2":
-                PassManUI.create_list()
-            elif choice == "3":
-                PassManUI.delete_list()
-            elif choice == "4":
-                PassManUI.print_list()
-            elif choice == "5":
-                PassManUI.print_accounts()
-            elif choice == "6":
-                PassManUI.add_new_account()
-            elif choice == "7":
-                PassManUI.remove_account()
-            elif choice == "8":
-                PassManUI.change_passwd()
-            elif choice == "9":
-                PassManUI.join()
-            elif choice == "0":
-                print("Thank you for using Password Manager!")
-                break
+            try:
+                if choice == "1":
+                    PassManUI.print_lists()
+                elif choice == "2":
+                    PassManUI.create_list()
+                elif choice == "3":
+                    PassManUI.delete_list()
+                elif choice == "4":
+                    PassManUI.print_list()
+                elif choice == "5":
+                    PassManUI.print_accounts()
+                elif choice == "6":
+                    PassManUI.add_new_account()
+                elif choice == "7":
+                    PassManUI.remove_account()
+                elif choice == "8":
+                    PassManUI.change_passwd()
+                elif choice == "9":
+                    PassManUI.join()
+                elif choice == "10":
+                    PassManUI.stale_report()
+                elif choice == "11":
+                    PassManUI.bulk_rotate()
+                elif choice == "12":
+                    PassManUI.breach_report()
+                elif choice == "13":
+                    PassManUI.reuse_report()
+                elif choice == "14":
+                    PassManUI.strength_report()
+                elif choice == "0":
+                    # Write any queued changes before leaving
+                    PassManUI.check_conflicts()
+                    print("Thank you for using Password Manager!")
+                    break
+
+                PassManUI.check_conflicts()
+            except ConflictError as error:
+                # Raised straight away when writes are not queued
+                PassManUI.check_conflicts(error)
 
 
 if __name__ == '__main__':
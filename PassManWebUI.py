@@ -7,18 +7,30 @@
 # Notes:            Need functionality for adding account and showing password
 # *****************************************************************************
 
-from flask import Flask, render_template, request, redirect, url_for
-from AccountsList import AccountsList
-from Account import Account
+import functools
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from flask import Flask, render_template, stream_template, request, redirect, url_for, make_response, jsonify
+from PassManAPI import API
+from WebPages import Page, WebPages
+from Database import ConflictError
 
 
 class WebUI:
     """Class definition for web UI -
-    View the output on localhost:8000/"""
+    View the output on localhost:8000/. The pages themselves are built by
+    WebPages, shared with the async UI - this class is the Flask glue"""
 
     __app = Flask(__name__)
-    __accounts = None
-    __account_lists = None
+    __pages = None
+
+    # Rendered read-only pages, least recently used first
+    PAGE_CACHE_SIZE = int(os.environ.get("PASSMAN_PAGE_CACHE_SIZE", 256))
+    __page_cache = OrderedDict()
+    __page_cache_lock = threading.Lock()
+    __etag_prefix = ""
 
     def __init__(self):
         self.__app.secret_key = self.generate_key()
@@ -32,25 +44,83 @@ class WebUI:
         return os.urandom(6)
 
     @staticmethod
-    def find_account_list(account_list_name):
-        """This method takes a list name and returns a list object"""
+    def __render(page):
+        """This method renders a shared page - a streamed one is sent as it is rendered"""
+
+        if page.stream is not None:
+            return stream_template(page.template, **page.context)
 
-        for account_list in WebUI.__account_lists:
-            if account_list.get_key() == account_list_name.lower():
-                return account_list
+        return render_template(page.template, **page.context), page.status
 
-        return None
+    @staticmethod
+    def __cached_page(route):
+        """This method wraps a read-only GET route so its pages carry an ETag made from the
+        model revision - a request whose If-None-Match matches gets 304 Not Modified, and
+        rendered pages are kept in an LRU cache keyed by path, arguments and revision"""
+
+        @functools.wraps(route)
+        def cached_route(*args, **kwargs):
+            revision = WebUI.__pages.get_revision()
+            etag = f"{WebUI.__etag_prefix}-{revision}"
+
+            if etag in request.if_none_match:
+                response = make_response("", 304)
+                response.set_etag(etag)
+                return response
+
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), revision)
+            with WebUI.__page_cache_lock:
+                page = WebUI.__page_cache.get(key)
+                if page is not None:
+                    WebUI.__page_cache.move_to_end(key)
+
+            if page is None:
+                page = route(*args, **kwargs)
+
+                # A streamed page is a generator that is used up as it is sent, so it is never kept
+                if isinstance(page, Iterator):
+                    response = make_response(page)
+                    response.set_etag(etag)
+                    return response
+
+                with WebUI.__page_cache_lock:
+                    WebUI.__page_cache[key] = page
+                    while len(WebUI.__page_cache) > WebUI.PAGE_CACHE_SIZE:
+                        WebUI.__page_cache.popitem(last=False)
+
+            response = make_response(page)
+            response.set_etag(etag)
+            return response
+
+        return cached_route
 
     @staticmethod
-    def find_account(account_name, account_list):
-        """This method takes an account name and list name
-        and returns an account object"""
+    @__app.before_request
+    def catch_up():
+        """This method brings the model up to date before a request if another worker
+        has published a newer revision"""
+
+        WebUI.__pages.catch_up()
+
+    @staticmethod
+    @__app.after_request
+    def publish_changes(response):
+        """This method writes this request's changes, reports any that lost to another
+        writer, and publishes their revision to the other workers"""
+
+        error = WebUI.__pages.publish_changes()
+        if error is not None:
+            return WebUI.__app.make_response(WebUI.show_conflict(error))
 
-        for account in account_list:
-            if account_name.lower() == account.get_key().lower():
-                return account
+        return response
 
-        return None
+    @staticmethod
+    @__app.errorhandler(ConflictError)
+    def show_conflict(error):
+        """This method reloads whatever was changed elsewhere and tells the user their
+        change was not saved"""
+
+        return WebUI.__render(WebUI.__pages.conflict(error))
 
     @staticmethod
     @__app.route("/")
@@ -66,302 +136,226 @@ class WebUI:
 
     @staticmethod
     @__app.route("/menu")
+    @__cached_page
     def homepage():
         """This method defines the homepage and its menu options"""
 
-        # Build choice map
-        choices = {
-            "/print-lists": "Display All Account Lists",
-            "/get-info-for-create-list": "Create New Account List",
-            "/select-list-to-delete": "Delete Account List",
-            "/select-list-to-print": "Print an Account List",
-            "/print-all-accounts": "Display All Accounts",
-            "/select-list-for-account-removal": "Remove Account From a List",
-            "/get-data-for-update": "Change Password for an Account",
-            "/select-lists-to-join": "Join Two Account Lists"
-        }
-
-        # Display menu
-        return render_template("menu.html", choices=choices)
+        return WebUI.__render(WebPages.menu())
 
     @staticmethod
     @__app.route("/print-lists")
+    @__cached_page
     def print_lists():
         """This method displays a list of all account lists"""
 
-        return render_template(
-            "print_lists.html",
-            account_lists=WebUI.__account_lists
-        )
+        return WebUI.__render(WebUI.__pages.lists_page("print_lists.html"))
 
     @staticmethod
     @__app.route("/select-list-to-print")
+    @__cached_page
     def select_list_to_print():
         """This method directs the user to a data acquisition form"""
 
-        return render_template(
-            "print_list_form.html",
-            account_lists=WebUI.__account_lists
-        )
+        return WebUI.__render(WebUI.__pages.lists_page("print_list_form.html"))
 
     @staticmethod
     @__app.route("/print-account-list")
+    @__cached_page
     def print_account_list():
         """This method displays all accounts saved in a particular account list"""
 
-        # Get list name from form
-        account_list_name = request.args["account_list_name"]
-
-        # If found, display the accounts in the list
-        for acc_list in WebUI.__account_lists:
-            if acc_list.get_key() == account_list_name.lower():
-
-                return render_template(
-                    "print_account_list.html",
-                    account_list=acc_list
-                )
-
-        # If not found, display error page
-        return render_template(
-            "error.html",
-            error_message=f"There is no list named '{account_list_name}' :("
-        )
+        return WebUI.__render(WebUI.__pages.print_account_list(request.args))
 
     @staticmethod
     @__app.route("/print-all-accounts")
+    @__cached_page
     def print_all_accounts():
         """This method displays all saved accounts"""
 
-        return render_template(
-            "print_all_accounts.html",
-            all_accounts=WebUI.__accounts
-        )
+        return WebUI.__render(WebUI.__pages.print_all_accounts(request.args))
 
     @staticmethod
     @__app.route("/get-info-for-create-list")
+    @__cached_page
     def get_info_for_create_list():
         """This method directs the user to a data acquisition form"""
 
-        return render_template("create_list_form.html")
+        return WebUI.__render(Page("create_list_form.html"))
 
     @staticmethod
     @__app.route("/create-list")
     def create_list():
         """This method allows the user to create a new account list"""
 
-        # Get name and info from form
-        name = request.args["list_name"]
-        sec = int(request.args["sec_factor"])
-
-        # Check for duplicate lists
-        for acc_list in WebUI.__account_lists:
-            if name.lower() == acc_list.get_key():
-
-                return render_template(
-                    "error.html",
-                    error_message=f"List '{name}' already exists :("
-                )
-
-        # Update data
-        new_list = AccountsList(name, sec)
-        WebUI.__account_lists.append(new_list)
-        AccountsList.upload(new_list)
-
-        # Display success page
-        return render_template(
-            "create_list_success.html",
-            list_name=name, sec_factor=sec
-        )
+        return WebUI.__render(WebUI.__pages.create_list(request.args))
 
     @staticmethod
     @__app.route("/select-list-to-delete")
+    @__cached_page
     def select_list_to_delete():
         """This method directs the user to a data acquisition form"""
 
-        return render_template(
-            "delete_list_form.html",
-            account_lists=WebUI.__account_lists
-        )
+        return WebUI.__render(WebUI.__pages.lists_page("delete_list_form.html"))
 
     @staticmethod
     @__app.route("/delete-list")
     def delete_list():
         """This method allows a user to delete an account list"""
 
-        # Get list name from form
-        name = request.args["list_name"]
-
-        # If found, remove account
-        for acc_list in WebUI.__account_lists:
-            if acc_list.get_list_name().lower() == name.lower():
-
-                WebUI.__account_lists.remove(acc_list)
-                AccountsList.remove_list(acc_list)
-
-        # Display success page
-        return render_template("delete_success.html", list_name=name)
+        return WebUI.__render(WebUI.__pages.delete_list(request.args))
 
     @staticmethod
     @__app.route("/select-list-for-account-removal")
+    @__cached_page
     def select_list_for_account_removal():
         """This method directs the user to a data acquisition form"""
 
-        return render_template(
-            "select_list_form.html",
-            account_lists=WebUI.__account_lists
-        )
+        return WebUI.__render(WebUI.__pages.lists_page("select_list_form.html"))
 
     @staticmethod
     @__app.route("/select-account-to-remove")
+    @__cached_page
     def select_account_to_remove():
         """This method directs the user to a data acquisition form"""
 
-        # Get name and find account list object
-        list_name = request.args["list_name"]
-        account_list = WebUI.find_account_list(list_name)
-
-        # If list not found, display error
-        if account_list is None:
-            return render_template(
-                "error.html",
-                error_message=f"There is no list named '{list_name}' :("
-            )
-
-        # Send account list to a form to select account
-        return render_template(
-            "remove_account_form.html",
-            account_list=account_list
-        )
+        return WebUI.__render(WebUI.__pages.select_account_to_remove(request.args))
 
     @staticmethod
     @__app.route("/select-lists-to-join")
+    @__cached_page
     def select_lists_to_join():
         """This method directs the user to a data acquisition form"""
 
-        return render_template(
-            "join_lists_form.html",
-            account_lists=WebUI.__account_lists
-        )
+        return WebUI.__render(WebUI.__pages.lists_page("join_lists_form.html"))
 
     @staticmethod
     @__app.route("/join-lists")
     def join_lists():
         """This method joins two selected lists"""
 
-        # Get names and list objects
-        list1_name = request.args["list1_name"]
-        list2_name = request.args["list2_name"]
-        list1 = WebUI.find_account_list(list1_name)
-        list2 = WebUI.find_account_list(list2_name)
-
-        # If list not found, display error page
-        if list1 is None:
-            return render_template(
-                "error.html",
-                error_message=f"There is no list named '{list1_name}' :("
-            )
-
-        if list2 is None:
-            return render_template(
-                "error.html",
-                error_message=f"There is no list named '{list2_name}' :("
-            )
-
-        # Join the lists
-        joined = list1 + list2
-
-        # Add joined list to lists and database
-        WebUI.__account_lists.append(joined)
-        AccountsList.upload(joined)
-
-        # Display success page
-        return render_template(
-            "join_success.html",
-            l1=list1_name,
-            l2=list2_name,
-            name=joined.get_list_name()
-        )
+        return WebUI.__render(WebUI.__pages.join_lists(request.args))
 
     @staticmethod
     @__app.route("/remove-account")
     def remove_account():
         """This method removes a selected account from a selected list"""
 
-        # Get names and objects
-        list_name = request.args["list_name"]
-        account_name = request.args["account_name"]
-        account_list = WebUI.find_account_list(list_name)
-        account = WebUI.find_account(account_name, account_list)
-
-        # If not found, display error
-        if account_list is None:
-            return render_template(
-                "error.html",
-                error_message=f"There is no list named '{list_name}' :("
-            )
-
-        if account is None:
-            return render_template(
-                "error.html",
-                error_message=f"There is no account named '{account_name}' :("
-            )
-
-        # Remove account
-        account_list.remove(account)
-        AccountsList.upload(account_list)
-
-        # Display success page
-        return render_template(
-            "remove_success.html",
-            account=account,
-            account_list_name=list_name
-        )
+        return WebUI.__render(WebUI.__pages.remove_account(request.args))
 
     @staticmethod
     @__app.route("/get-data-for-update")
+    @__cached_page
     def get_data_for_update():
         """This method directs the user to a data acquisition form"""
 
-        return render_template(
-            "update_password_form.html",
-            accounts=WebUI.__accounts
-        )
+        # Accounts are found through /search as the user types
+        return WebUI.__render(Page("update_password_form.html"))
+
+    @staticmethod
+    @__app.route("/search")
+    def search():
+        """This method returns the ids of the accounts matching ?q= as JSON, for type-ahead"""
+
+        return jsonify(WebUI.__pages.search(request.args))
+
+    @staticmethod
+    @__app.route("/autofill")
+    def autofill():
+        """This method returns the ids of the accounts for the page at ?url= as JSON, for a
+        browser helper"""
+
+        return jsonify(WebUI.__pages.autofill(request.args))
+
+    @staticmethod
+    @__app.route("/stale-accounts")
+    def stale_accounts():
+        """This method displays the accounts whose passwords are older than ?days=, by list"""
+
+        return WebUI.__render(WebUI.__pages.stale_accounts(request.args))
+
+    @staticmethod
+    @__app.route("/rotation-due")
+    def rotation_due():
+        """This method displays the accounts whose passwords are due or overdue for a change"""
+
+        return WebUI.__render(WebUI.__pages.rotation_due())
+
+    @staticmethod
+    @__app.route("/select-accounts-to-rotate")
+    @__cached_page
+    def select_accounts_to_rotate():
+        """This method directs the user to a data acquisition form"""
+
+        return WebUI.__render(WebUI.__pages.select_accounts_to_rotate())
+
+    @staticmethod
+    @__app.route("/rotate-passwords", methods=["POST"])
+    def rotate_passwords():
+        """This method gives new random passwords to a list's accounts, or to every account past
+        an age, and reports any that failed"""
+
+        return WebUI.__render(WebUI.__pages.rotate_passwords(request.form))
+
+    @staticmethod
+    @__app.route("/breach-report")
+    def breach_report():
+        """This method lists the accounts whose passwords are in the breach corpus"""
+
+        return WebUI.__render(WebPages.breach_report())
+
+    @staticmethod
+    @__app.route("/reuse-report")
+    def reuse_report():
+        """This method lists the groups of accounts that share a password"""
+
+        return WebUI.__render(WebUI.__pages.reuse_report())
+
+    @staticmethod
+    @__app.route("/strength-report")
+    def strength_report():
+        """This method lists the weakest saved passwords first, up to ?limit="""
+
+        return WebUI.__render(WebUI.__pages.strength_report(request.args))
 
     @staticmethod
     @__app.route("/update-password", methods=["POST"])
     def update_password():
         """This method updates the password for a selected account"""
 
-        # Get info
-        pwd = request.form["pwd"]
-        account_name = request.form["account_name"]
+        return WebUI.__render(WebUI.__pages.update_password(request.form))
+
+    @staticmethod
+    def start():
+        """This method loads the model, starts syncing with the database and returns the Flask
+        app, with the JSON API mounted under /api/v1 - with PASSMAN_SHARED_STATE set to a file
+        path, every worker process using that path sees each other's changes before its next
+        request"""
 
-        # If found, set password and update account
-        for account in WebUI.__accounts:
-            if account_name == account.get_key():
+        WebUI.__pages = WebPages()
 
-                account.set_account_pwd(pwd)
-                Account.upload(account)
+        # Revisions count from 1 in every process, so tag them with this one
+        WebUI.__etag_prefix = f"{os.getpid():x}.{os.urandom(4).hex()}"
 
-                # Display success page
-                return render_template(
-                    "password_success.html",
-                    account=account_name
-                )
+        # Serve the JSON API under /api/v1 over the same model
+        API.attach(WebUI.__app, WebUI.__pages.get_repository())
 
-        # If not found, display error page
-        return render_template(
-            "error.html",
-            error_message=f"There is no account named {account_name} :("
-        )
+        return WebUI.__app
 
     @staticmethod
     def run():
         """This method runs the UI and populates the class variables"""
 
-        # Get data and run app
-        WebUI.__accounts, WebUI.__account_lists = AccountsList.fetch_data()
-        WebUI.__app.run(port=8000)
+        # Run app, then stop syncing and write any queued changes once the server stops
+        WebUI.start().run(port=8000)
+        WebUI.__pages.stop()
+
+
+def create_app():
+    """Entry point for WSGI servers running several worker processes, for example
+    PASSMAN_SHARED_STATE=/tmp/passman.state gunicorn -w 4 'PassManWebUI:create_app()'
+    (without --preload, so each worker opens its own database connection)"""
+
+    return WebUI().start()
 
 
 if __name__ == "__main__":
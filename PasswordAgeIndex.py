@@ -0,0 +1,171 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the password age index
+# Input:            Dates or ages in days
+# Output:           Account ids with the date their password last changed
+# Notes:            Each account's tlc is parsed once, when it is indexed,
+#                   and kept in one list sorted by date. "Changed before X"
+#                   is then a binary search for X and a slice of the front
+#                   of the list - a query only touches the accounts it
+#                   returns, never the whole vault. List membership is kept
+#                   too, as a map from each account to the lists holding it,
+#                   so grouping stale passwords by list only looks up the
+#                   stale accounts rather than reading every list
+# *****************************************************************************
+
+import bisect
+import datetime
+import os
+from Database import Database
+from RepositoryIndex import RepositoryIndex
+
+
+class PasswordAgeIndex(RepositoryIndex):
+    """Class definition for the sorted password age index -
+    Built from the database and kept current by listening to a repository"""
+
+    STALE_DAYS = int(os.environ.get("PASSMAN_STALE_DAYS", 90))
+
+    def __init__(self, repository=None, background=False):
+        self.__entries = []     # Sorted (date changed, account id) pairs
+        self.__dates = {}       # Account id -> date changed
+        self.__members = {}     # List key -> its member ids
+        self.__lists_of = {}    # Account id -> keys of the lists holding it
+        self.__repository = repository
+
+        super().__init__(repository, background)
+
+    @staticmethod
+    def parse(tlc):
+        """This method returns the date in a tlc string - one that can not be read counts as
+        the oldest date, so it is always reported"""
+
+        try:
+            return datetime.date.fromisoformat(str(tlc).strip()[:10])
+        except ValueError:
+            return datetime.date.min
+
+    def _read(self):
+        """This method indexes every account in the database, reading only the dates and the
+        list member ids"""
+
+        dates = {doc["_id"]: self.parse(doc.get("tlc")) for doc in Database.find_accounts(fields=["tlc"])}
+        entries = sorted((date, account_id) for account_id, date in dates.items())
+
+        account_lists = self.__repository.get_lists() if self.__repository is not None else ()
+
+        return entries, dates, self._read_members(account_lists)
+
+    def _install(self, state):
+        self.__entries, self.__dates, self.__members = state
+
+        self.__lists_of = {}
+        for key, members in self.__members.items():
+            for account_id in members:
+                self.__lists_of.setdefault(account_id, set()).add(key)
+
+    def _prepare(self, kind, obj):
+        return self._list_change(obj) if kind == "list" else obj
+
+    def _apply(self, kind, change):
+        if kind == "account":
+            self.update(change)
+        elif kind == "list":
+            self.__list_changed(*change)
+        elif kind == "list_removed":
+            self.__set_members(change.get_key(), frozenset())
+            del self.__members[change.get_key()]
+
+    def __list_changed(self, account_list, added, removed, members):
+        old = self.__members.get(account_list.get_key(), frozenset())
+        if members is None:
+            members = (old | frozenset(added)) - frozenset(removed)
+
+        self.__set_members(account_list.get_key(), members)
+
+    def __set_members(self, key, members):
+        old = self.__members.get(key, frozenset())
+        self.__members[key] = members
+
+        for account_id in old - members:
+            keys = self.__lists_of.get(account_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__lists_of[account_id]
+
+        for account_id in members - old:
+            self.__lists_of.setdefault(account_id, set()).add(key)
+
+    def update(self, account):
+        """This method indexes a new or changed account"""
+
+        date = self.parse(account.get_account_tlc())
+
+        with self._lock:
+            if self.__dates.get(account.get_key()) == date:
+                return
+
+            self.__remove(account.get_key())
+            bisect.insort(self.__entries, (date, account.get_key()))
+            self.__dates[account.get_key()] = date
+
+    def __remove(self, account_id):
+        date = self.__dates.pop(account_id, None)
+        if date is not None:
+            position = bisect.bisect_left(self.__entries, (date, account_id))
+            if position < len(self.__entries) and self.__entries[position] == (date, account_id):
+                del self.__entries[position]
+
+    def changed_before(self, date, limit=None):
+        """This method returns (account id, date changed) pairs for the passwords last changed
+        before a date, oldest first"""
+
+        index = self._built()
+
+        with self._lock:
+            end = bisect.bisect_left(index.__entries, (date,))
+            if limit is not None:
+                end = min(end, limit)
+
+            return [(account_id, changed) for changed, account_id in index.__entries[:end]]
+
+    def older_than(self, days, today=None, limit=None):
+        """This method returns (account id, date changed) pairs for the passwords not changed
+        in the last given number of days, oldest first"""
+
+        today = today or datetime.date.today()
+
+        return self.changed_before(today - datetime.timedelta(days=days), limit)
+
+    def older_than_by_list(self, days, today=None):
+        """This method returns the stale passwords grouped by list - a dictionary from list name
+        to (account id, date changed) pairs, oldest first, with lists holding none left out and
+        accounts in no list under None"""
+
+        index = self._built()
+        stale = index.older_than(days, today)
+        if not stale or self.__repository is None:
+            return {None: stale} if stale else {}
+
+        # Only the stale accounts are looked up
+        by_key = {}
+        unlisted = []
+        with self._lock:
+            for entry in stale:
+                keys = index.__lists_of.get(entry[0])
+                if not keys:
+                    unlisted.append(entry)
+                for key in keys or ():
+                    by_key.setdefault(key, []).append(entry)
+
+        groups = {account_list.get_list_name(): by_key[account_list.get_key()]
+                  for account_list in self.__repository.get_lists() if account_list.get_key() in by_key}
+        if unlisted:
+            groups[None] = unlisted
+
+        return groups
+
+    def __len__(self):
+        return len(self.__dates)
@@ -0,0 +1,72 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the random password generator
+# Input:            How many passwords, and how long
+# Output:           Random passwords
+# Notes:            Randomness comes from the OS CSPRNG through secrets, one
+#                   call per batch rather than one per character. Bytes are
+#                   mapped onto the alphabet with a translate table, which
+#                   drops the bytes above the largest multiple of the
+#                   alphabet size so every character is equally likely
+# *****************************************************************************
+
+import secrets
+import string
+
+
+class PasswordGenerator:
+    """Class definition for the password generator -
+    Every password has at least one lower case letter, upper case letter, digit and symbol"""
+
+    SYMBOLS = "!#$%&*+-=?@^_"
+    CLASSES = (string.ascii_lowercase, string.ascii_uppercase, string.digits, SYMBOLS)
+    ALPHABET = "".join(CLASSES)
+    DEFAULT_LENGTH = 20
+
+    # Byte -> character, with the bytes that would bias the draw deleted
+    __limit = 256 - 256 % len(ALPHABET)
+    __table = bytes.maketrans(bytes(range(__limit)), (ALPHABET * (__limit // len(ALPHABET))).encode("ascii"))
+    __rejected = bytes(range(__limit, 256))
+
+    @staticmethod
+    def length_for(sec_factor):
+        """This method returns the password length for a list's security level - 14 at level 1
+        up to 32 at level 10"""
+
+        return 12 + 2 * min(max(int(sec_factor), 1), 10)
+
+    @staticmethod
+    def is_compliant(pwd):
+        """This method checks that a password has a character from every class"""
+
+        return all(any(char in chars for char in pwd) for chars in PasswordGenerator.CLASSES)
+
+    @staticmethod
+    def generate_batch(count, length=DEFAULT_LENGTH):
+        """This method returns count new passwords of the given length"""
+
+        if length < len(PasswordGenerator.CLASSES):
+            raise ValueError(f"Passwords must be at least {len(PasswordGenerator.CLASSES)} characters long")
+
+        passwords = []
+        while len(passwords) < count:
+            # Draw the whole remainder at once, with room for rejected bytes and passwords
+            needed = (count - len(passwords)) * length
+            pool = secrets.token_bytes(needed + needed // 4 + length)
+            chars = pool.translate(PasswordGenerator.__table, PasswordGenerator.__rejected).decode("ascii")
+
+            for start in range(0, len(chars) - length + 1, length):
+                pwd = chars[start:start + length]
+                if PasswordGenerator.is_compliant(pwd):
+                    passwords.append(pwd)
+                    if len(passwords) == count:
+                        break
+
+        return passwords
+
+    @staticmethod
+    def generate(length=DEFAULT_LENGTH):
+        """This method returns one new password"""
+
+        return PasswordGenerator.generate_batch(1, length)[0]
@@ -0,0 +1,178 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Base class definition for the in-memory indexes kept
+#                   current by listening to an AccountRepository
+# Input:            Repository change events
+# Output:           None
+# Notes:            Building an index reads the whole vault, so it can be
+#                   done on a background thread - the app starts serving
+#                   straight away. A query made before the index is ready
+#                   waits a little for it, and past that is answered from a
+#                   stand-in copy built by one plain scan - made once, shared
+#                   by every query and kept current until the index is
+#                   ready. Changes that arrive while the database is being
+#                   read are applied again once the new state is in place,
+#                   so a build never loses them
+# *****************************************************************************
+
+import copy
+import os
+import threading
+from Database import Database
+
+
+class RepositoryIndex:
+    """Base class definition for repository indexes -
+    Subclasses implement _read() to read their state from the database,
+    _install(state) to put it in place and _apply(kind, change) to take in one
+    change, as made by _prepare(kind, obj). _lock guards the state"""
+
+    READY_WAIT = float(os.environ.get("PASSMAN_INDEX_WAIT", 5.0))     # Seconds a query waits for a build
+
+    def __init__(self, repository=None, background=False):
+        self._lock = threading.RLock()
+        self.__build_lock = threading.Lock()
+        self.__ready = threading.Event()
+        self.__missed = None    # Changes seen while a build reads the database
+
+        self.__stand_in_lock = threading.Lock()
+        self.__stand_in = None          # Copy answering queries until the index is ready
+        self.__stand_in_missed = None   # Changes seen while the stand-in reads the database
+
+        # Listen first, so no change made while building is missed
+        if repository is not None:
+            repository.add_listener(self.__changed)
+
+            if background:
+                threading.Thread(target=self.__build, name=type(self).__name__, daemon=True).start()
+            else:
+                self.rebuild()
+        else:
+            # Without a repository the index starts empty and is filled through its own methods
+            self.__ready.set()
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _install(self, state):
+        raise NotImplementedError
+
+    def _apply(self, kind, change):
+        raise NotImplementedError
+
+    def _prepare(self, kind, obj):
+        """This method turns a change into what _apply takes - it runs outside the lock, so
+        anything slow belongs here. By default the changed object itself"""
+
+        return obj
+
+    @staticmethod
+    def _list_change(account_list):
+        """This method returns a list's membership change as (list, added ids, removed ids,
+        member ids) - the members are None when the change is known from the list itself, and
+        are read from the database when the list was reloaded from it, without loading them"""
+
+        added, removed = account_list.get_changes()
+        if added or removed or account_list.is_loaded():
+            return account_list, added, removed, None
+
+        return account_list, [], [], frozenset(Database.find_list_member_ids(account_list.get_list_id()))
+
+    @staticmethod
+    def _read_members(account_lists):
+        """This method takes a snapshot of the lists and returns a dictionary from each list's key
+        to its member ids, read from the database without loading any list"""
+
+        return {account_list.get_key(): frozenset(Database.find_list_member_ids(account_list.get_list_id()))
+                for account_list in account_lists}
+
+    def rebuild(self):
+        """This method rebuilds the index from the database"""
+
+        with self.__build_lock:
+            with self._lock:
+                self.__missed = []
+
+            try:
+                state = self._read()
+            except BaseException:
+                with self._lock:
+                    self.__missed = None
+                raise
+
+            with self._lock:
+                self._install(state)
+
+                missed, self.__missed = self.__missed, None
+                for kind, change in missed:
+                    self._apply(kind, change)
+
+                self.__ready.set()
+                self.__stand_in = None
+
+    def __build(self):
+        try:
+            self.rebuild()
+        except Exception as error:
+            # Queries keep scanning until a reload builds it
+            print(f"Building {type(self).__name__} failed: {error}")
+
+    def __changed(self, kind, obj):
+        if kind == "reload":
+            self.rebuild()
+            return
+
+        change = self._prepare(kind, obj)
+
+        with self._lock:
+            if self.__missed is not None:
+                self.__missed.append((kind, change))
+            if self.__stand_in_missed is not None:
+                self.__stand_in_missed.append((kind, change))
+
+            self._apply(kind, change)
+            if self.__stand_in is not None:
+                self.__stand_in._apply(kind, change)
+
+    def _built(self):
+        """This method returns this index once it is built, waiting up to READY_WAIT seconds for
+        the background build - past that, the stand-in copy, which the first query to need it
+        builds with one plain scan while any others wait for it"""
+
+        if self.__ready.wait(RepositoryIndex.READY_WAIT):
+            return self
+
+        with self.__stand_in_lock:
+            with self._lock:
+                if self.__ready.is_set():
+                    return self
+                if self.__stand_in is not None:
+                    return self.__stand_in
+
+                self.__stand_in_missed = []
+
+            try:
+                state = self._read()
+            except BaseException:
+                with self._lock:
+                    self.__stand_in_missed = None
+                raise
+
+            with self._lock:
+                missed, self.__stand_in_missed = self.__stand_in_missed, None
+
+                # The build may have finished meanwhile
+                if self.__ready.is_set():
+                    return self
+
+                stand_in = copy.copy(self)
+                stand_in._install(state)
+                for kind, change in missed:
+                    stand_in._apply(kind, change)
+
+                stand_in.__ready = threading.Event()
+                stand_in.__ready.set()
+                self.__stand_in = stand_in
+
+                return stand_in
@@ -0,0 +1,98 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the password reuse index
+# Input:            Passwords
+# Output:           The ids of the accounts sharing a password
+# Notes:            Passwords are never kept here - each one is reduced to an
+#                   HMAC-SHA256 under a random key made when the index is, so
+#                   the index is useless outside this process. Accounts with
+#                   the same password land under the same hash, so "who else
+#                   uses this?" is one dictionary lookup rather than a
+#                   comparison against every other account
+# *****************************************************************************
+
+import hashlib
+import hmac
+import os
+from Database import Database
+from RepositoryIndex import RepositoryIndex
+
+
+class ReuseIndex(RepositoryIndex):
+    """Class definition for the keyed-hash reuse index -
+    Built from the database and kept current by listening to a repository"""
+
+    def __init__(self, repository=None, background=False):
+        self.__key = os.urandom(32)
+        self.__by_hash = {}     # Password hash -> ids of the accounts using it
+        self.__hash_of = {}     # Account id -> its password hash
+
+        super().__init__(repository, background)
+
+    def __hash(self, pwd):
+        return hmac.new(self.__key, pwd.encode("utf-8"), hashlib.sha256).digest()
+
+    def _read(self):
+        """This method indexes every account in the database in one pass, reading only the passwords"""
+
+        by_hash = {}
+        hash_of = {}
+        for doc in Database.find_accounts(fields=["pwd"], with_pwd=True):
+            digest = self.__hash(doc.get("pwd") or "")
+            hash_of[doc["_id"]] = digest
+            by_hash.setdefault(digest, set()).add(doc["_id"])
+
+        return by_hash, hash_of
+
+    def _install(self, state):
+        self.__by_hash, self.__hash_of = state
+
+    def _apply(self, kind, obj):
+        if kind == "account":
+            self.update(obj)
+
+    def update(self, account):
+        """This method indexes a new account or a changed password"""
+
+        digest = self.__hash(account.get_pass() or "")
+
+        with self._lock:
+            if self.__hash_of.get(account.get_key()) == digest:
+                return
+
+            self.__remove(account.get_key())
+            self.__hash_of[account.get_key()] = digest
+            self.__by_hash.setdefault(digest, set()).add(account.get_key())
+
+    def __remove(self, account_id):
+        digest = self.__hash_of.pop(account_id, None)
+        if digest is not None:
+            users = self.__by_hash[digest]
+            users.discard(account_id)
+            if not users:
+                del self.__by_hash[digest]
+
+    def users_of(self, pwd, exclude=None):
+        """This method returns the sorted ids of the accounts using a password, leaving out exclude"""
+
+        index = self._built()
+
+        with self._lock:
+            users = index.__by_hash.get(self.__hash(pwd), ())
+
+            return sorted(account_id for account_id in users if account_id != exclude)
+
+    def reused_groups(self):
+        """This method returns the groups of accounts that share a password, largest first -
+        each group is a sorted list of account ids"""
+
+        index = self._built()
+
+        with self._lock:
+            groups = [sorted(users) for users in index.__by_hash.values() if len(users) > 1]
+
+        return sorted(groups, key=lambda group: (-len(group), group))
+
+    def __len__(self):
+        return len(self.__hash_of)
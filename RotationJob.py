@@ -0,0 +1,78 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for bulk password rotation
+# Input:            Account ids and a password length
+# Output:           A result for each account
+# Notes:            New passwords are generated in one batch and every
+#                   account is uploaded inside one Database.write_batch(),
+#                   so rotating any number of accounts costs one bulk
+#                   database write. An account that is missing or was
+#                   changed elsewhere fails on its own, without stopping
+#                   the rest. Each new password is returned with its result,
+#                   as the real site still has the old one until the user
+#                   changes it there
+# *****************************************************************************
+
+from Account import Account
+from Database import Database
+from PasswordGenerator import PasswordGenerator
+
+
+class RotationJob:
+    """Class definition for the bulk rotation job -
+    Gives accounts new random passwords and reports how each one went"""
+
+    @staticmethod
+    def rotate(repository, account_ids, length=PasswordGenerator.DEFAULT_LENGTH):
+        """This method gives every account in account_ids a new password and returns a result
+        dictionary for each - {"id", "ok"}, plus "pwd", the new password, for the ones that were
+        rotated and "error" for the ones that failed"""
+
+        account_ids = list(dict.fromkeys(account_ids))
+
+        # Load whatever the repository has not seen yet in batches, not one at a time
+        Database.load_accounts(account_ids)
+
+        passwords = iter(PasswordGenerator.generate_batch(len(account_ids), length))
+        results = []
+
+        with Database.write_batch() as batch:
+            for account_id in account_ids:
+                account = repository.get_account(account_id)
+                if account is None:
+                    results.append({"id": account_id, "ok": False, "error": "There is no such account"})
+                    continue
+
+                pwd = next(passwords)
+                account.set_account_pwd(pwd)
+                Account.upload(account)
+                results.append({"id": account_id, "ok": True, "pwd": pwd})
+
+        # Changes that lost to another writer are reloaded and reported against their accounts
+        error = batch.conflicts
+        if error is not None:
+            repository.apply_conflict(error)
+
+            conflicted = set(error.account_ids)
+            for result in results:
+                if result["ok"] and result["id"] in conflicted:
+                    result["ok"] = False
+                    result["error"] = "Changed elsewhere since it was loaded, not rotated"
+                    del result["pwd"]
+
+        return results
+
+    @staticmethod
+    def rotate_list(repository, account_list):
+        """This method rotates every account in a list, with a length set by its security level"""
+
+        return RotationJob.rotate(repository, account_list.get_account_ids(),
+                                  PasswordGenerator.length_for(account_list.get_sec_factor()))
+
+    @staticmethod
+    def rotate_older_than(repository, age_index, days, length=PasswordGenerator.DEFAULT_LENGTH):
+        """This method rotates every account whose password is older than the given number of days"""
+
+        return RotationJob.rotate(repository, [account_id for account_id, changed in age_index.older_than(days)],
+                                  length)
@@ -0,0 +1,241 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the password rotation scheduler
+# Input:            Lists, their security levels and account tlc dates
+# Output:           The accounts whose passwords are due to be changed
+# Notes:            Each list's sec_factor sets a maximum password age, and
+#                   an account in several lists follows the strictest one.
+#                   Accounts wait in a heap ordered by the date they fall
+#                   due, so a tick only pops the ones that have come due
+#                   since the last, and a change to one account or list only
+#                   reschedules the accounts it touches - a list change
+#                   carries the ids added and removed, so a list's members
+#                   are never loaded to reschedule them. A background thread
+#                   ticks on a schedule and logs the accounts that have come
+#                   due, so they are reported as days go by. Rescheduled
+#                   accounts leave their old heap entry behind, and it is
+#                   skipped when it reaches the top
+# *****************************************************************************
+
+import datetime
+import heapq
+import threading
+from Database import Database
+from PasswordAgeIndex import PasswordAgeIndex
+from RepositoryIndex import RepositoryIndex
+
+
+class RotationScheduler(RepositoryIndex):
+    """Class definition for the rotation scheduler -
+    Built from a repository's lists and kept current by listening to it"""
+
+    # Maximum password age in days for security levels 1 to 10
+    MAX_AGE_DAYS = (None, 365, 270, 180, 150, 120, 90, 60, 45, 30, 14)
+
+    LOG_LIMIT = 10      # Account ids named in one tick's log line
+
+    def __init__(self, repository, interval=60.0, background=False):
+        self.__repository = repository
+        self.__interval = interval
+        self.__stop = threading.Event()
+        self.__thread = None
+
+        self.__lists = {}       # List key -> (sec_factor, member ids)
+        self.__lists_of = {}    # Account id -> keys of the lists holding it
+        self.__dates = {}       # Account id -> date its password last changed
+        self.__schedule = {}    # Account id -> date it falls due
+        self.__heap = []        # (due date, account id), including outdated entries
+        self.__due = {}         # Account id -> due date, for accounts already due
+
+        super().__init__(repository, background)
+
+    @staticmethod
+    def max_age(sec_factor):
+        """This method returns the maximum password age, as a timedelta, for a security level"""
+
+        return datetime.timedelta(days=RotationScheduler.MAX_AGE_DAYS[min(max(int(sec_factor), 1), 10)])
+
+    def _read(self):
+        """This method schedules every account in a list, reading only the member ids and dates -
+        every account's date is kept, so an account added to a list later is already known"""
+
+        # One snapshot of the lists, so a list added meanwhile is left to its own event
+        account_lists = self.__repository.get_lists()
+        members = self._read_members(account_lists)
+        lists = {account_list.get_key(): (account_list.get_sec_factor(), members[account_list.get_key()])
+                 for account_list in account_lists}
+        dates = {doc["_id"]: PasswordAgeIndex.parse(doc.get("tlc")) for doc in Database.find_accounts(fields=["tlc"])}
+
+        return lists, dates
+
+    def _install(self, state):
+        self.__lists, self.__dates = state
+        self.__lists_of, self.__schedule, self.__heap, self.__due = {}, {}, [], {}
+
+        for key, (sec_factor, members) in self.__lists.items():
+            for account_id in members:
+                self.__lists_of.setdefault(account_id, set()).add(key)
+
+        for account_id in self.__lists_of:
+            self.__reschedule(account_id)
+
+        self.__drain()
+
+    def __due_date(self, account_id):
+        """This method returns when an account falls due under its strictest list, or None"""
+
+        keys = self.__lists_of.get(account_id)
+        if not keys or account_id not in self.__dates:
+            return None
+
+        date = self.__dates[account_id]
+        if date == datetime.date.min:
+            return date
+
+        return date + min(self.max_age(self.__lists[key][0]) for key in keys)
+
+    def __reschedule(self, account_id):
+        due = self.__due_date(account_id)
+        if due == self.__schedule.get(account_id):
+            return
+
+        self.__due.pop(account_id, None)
+
+        if due is None:
+            self.__schedule.pop(account_id, None)
+            return
+
+        self.__schedule[account_id] = due
+        heapq.heappush(self.__heap, (due, account_id))
+
+        # Outdated entries are skipped lazily - rebuild the heap once they outnumber the live ones
+        if len(self.__heap) > 2 * len(self.__schedule) + 64:
+            self.__heap = [(date, key) for key, date in self.__schedule.items() if key not in self.__due]
+            heapq.heapify(self.__heap)
+
+    def __drain(self, today=None):
+        """This method moves every account that has come due off the heap, returning them"""
+
+        today = today or datetime.date.today()
+        newly_due = []
+
+        while self.__heap and self.__heap[0][0] <= today:
+            due, account_id = heapq.heappop(self.__heap)
+
+            if self.__schedule.get(account_id) == due and account_id not in self.__due:
+                self.__due[account_id] = due
+                newly_due.append((account_id, due))
+
+        return newly_due
+
+    def _prepare(self, kind, obj):
+        return self._list_change(obj) if kind == "list" else obj
+
+    def _apply(self, kind, change):
+        if kind == "account":
+            self.__account_changed(change)
+        elif kind == "list":
+            self.__list_changed(*change)
+        elif kind == "list_removed":
+            self.__list_removed(change)
+
+    def __account_changed(self, account):
+        date = PasswordAgeIndex.parse(account.get_account_tlc())
+
+        with self._lock:
+            if self.__dates.get(account.get_key()) == date:
+                return
+
+            self.__dates[account.get_key()] = date
+            self.__reschedule(account.get_key())
+            self.__drain()
+
+    def __list_changed(self, account_list, added, removed, members):
+        key = account_list.get_key()
+
+        with self._lock:
+            sec_factor, old = self.__lists.get(key, (None, frozenset()))
+            if members is None:
+                members = (old | frozenset(added)) - frozenset(removed)
+
+            self.__lists[key] = (account_list.get_sec_factor(), members)
+
+            for account_id in old - members:
+                self.__unlink(account_id, key)
+            for account_id in members - old:
+                self.__lists_of.setdefault(account_id, set()).add(key)
+
+            # Only the accounts that joined or left need a new due date, unless the level changed
+            changed = old ^ members if sec_factor == account_list.get_sec_factor() else old | members
+            for account_id in changed:
+                self.__reschedule(account_id)
+
+            self.__drain()
+
+    def __list_removed(self, account_list):
+        key = account_list.get_key()
+
+        with self._lock:
+            sec_factor, old = self.__lists.pop(key, (None, frozenset()))
+
+            for account_id in old:
+                self.__unlink(account_id, key)
+                self.__reschedule(account_id)
+
+    def __unlink(self, account_id, key):
+        keys = self.__lists_of.get(account_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.__lists_of[account_id]
+
+    def tick(self, today=None):
+        """This method surfaces the accounts that have come due since the last tick and returns
+        them as (account id, due date) pairs"""
+
+        with self._lock:
+            return self.__drain(today)
+
+    def get_due(self, today=None):
+        """This method returns (account id, due date) pairs for every account whose password is
+        due or overdue, most overdue first"""
+
+        index = self._built()
+
+        with self._lock:
+            index.__drain(today)
+
+            return sorted(index.__due.items(), key=lambda item: (item[1], item[0]))
+
+    def __run(self):
+        while not self.__stop.wait(self.__interval):
+            try:
+                newly_due = self.tick()
+            except Exception as error:
+                # Keep ticking
+                print(f"Rotation scheduler tick failed: {error}")
+                continue
+
+            if newly_due:
+                names = ", ".join(account_id for account_id, due in newly_due[:RotationScheduler.LOG_LIMIT])
+                more = len(newly_due) - RotationScheduler.LOG_LIMIT
+                print(f"Passwords now due for rotation: {names}" + (f" and {more} more" if more > 0 else ""))
+
+    def start(self):
+        """This method starts ticking in a background thread"""
+
+        if self.__thread is None:
+            self.__stop.clear()
+            self.__thread = threading.Thread(target=self.__run, name="RotationScheduler", daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __len__(self):
+        return len(self.__schedule)
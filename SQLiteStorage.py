@@ -0,0 +1,350 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Embedded SQLite implementation of the storage interface
+# Input:            Account and list documents (dictionaries)
+# Output:           Account and list documents (dictionaries)
+# Notes:            Runs in WAL mode so readers never wait on the writer, and
+#                   a local file means no network round trip per operation.
+#                   Version checks are part of each UPDATE's WHERE clause, so
+#                   a write made by another process in between is detected
+#                   by its row count
+# *****************************************************************************
+
+import sqlite3
+import threading
+from StorageBackend import StorageBackend
+
+
+class SQLiteStorage(StorageBackend):
+    """Class definition for embedded SQLite storage"""
+
+    ACCOUNT_FIELDS = ("_id", "type", "site", "url", "uname", "pwd", "tlc", "typ", "info", "ver")
+    TFA_FIELDS = ("typ", "info")
+
+    def __init__(self, path="passman.db"):
+        # One shared connection, guarded by a lock, so Flask's threads can use it
+        self.__lock = threading.RLock()
+        self.__conn = sqlite3.connect(path, check_same_thread=False)
+        self.__conn.row_factory = sqlite3.Row
+
+        with self.__lock, self.__conn:
+            self.__conn.execute("PRAGMA journal_mode=WAL")
+            self.__conn.execute("PRAGMA synchronous=NORMAL")
+            self.__create_tables()
+
+    def __create_tables(self):
+        """This method creates the tables if they do not exist yet"""
+
+        self.__conn.execute("""
+            CREATE TABLE IF NOT EXISTS accounts (
+                _id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                site TEXT,
+                url TEXT,
+                uname TEXT,
+                pwd TEXT,
+                tlc TEXT,
+                typ TEXT,
+                info TEXT,
+                ver INTEGER NOT NULL DEFAULT 0
+            )""")
+        self.__conn.execute("""
+            CREATE TABLE IF NOT EXISTS account_lists (
+                _id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                sec_factor INTEGER NOT NULL,
+                ver INTEGER NOT NULL DEFAULT 0
+            )""")
+        self.__conn.execute("""
+            CREATE TABLE IF NOT EXISTS list_members (
+                list_id TEXT NOT NULL,
+                account_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (list_id, account_id)
+            )""")
+        self.__conn.execute(
+            "CREATE INDEX IF NOT EXISTS list_members_position ON list_members (list_id, position)")
+
+        # Tables made by older versions have no document versions yet
+        for table in ("accounts", "account_lists"):
+            columns = [row["name"] for row in self.__conn.execute(f"PRAGMA table_info({table})")]
+            if "ver" not in columns:
+                self.__conn.execute(f"ALTER TABLE {table} ADD COLUMN ver INTEGER NOT NULL DEFAULT 0")
+
+        for field in ("site", "uname", "type", "tlc"):
+            self.__conn.execute(f"CREATE INDEX IF NOT EXISTS accounts_{field} ON accounts ({field})")
+
+        # Change log - rev is the primary key, so polling for newer entries is an index range scan
+        self.__conn.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                rev INTEGER PRIMARY KEY AUTOINCREMENT,
+                coll TEXT NOT NULL,
+                doc_id TEXT,
+                op TEXT NOT NULL,
+                origin TEXT
+            )""")
+
+    @staticmethod
+    def __account_row(account):
+        """This method converts an account document to a row tuple"""
+
+        return tuple(account.get(field, 0 if field == "ver" else None) for field in SQLiteStorage.ACCOUNT_FIELDS)
+
+    @staticmethod
+    def __account_doc(row):
+        """This method converts a row to an account document, dropping unused TFA fields"""
+
+        doc = dict(row)
+        if doc.get("type") != "TFA":
+            for field in SQLiteStorage.TFA_FIELDS:
+                doc.pop(field, None)
+
+        return doc
+
+    def __write_account(self, account):
+        self.__conn.execute(
+            f"INSERT OR REPLACE INTO accounts ({', '.join(self.ACCOUNT_FIELDS)}) "
+            f"VALUES ({', '.join('?' * len(self.ACCOUNT_FIELDS))})",
+            self.__account_row(account)
+        )
+
+    def __write_list(self, account_list):
+        self.__conn.execute(
+            "INSERT INTO account_lists (_id, name, sec_factor, ver) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (_id) DO UPDATE SET name = excluded.name, sec_factor = excluded.sec_factor, "
+            "ver = excluded.ver",
+            (account_list["_id"], account_list["name"], account_list["sec_factor"], account_list.get("ver", 0))
+        )
+        self.__conn.execute("DELETE FROM list_members WHERE list_id = ?", (account_list["_id"],))
+        self.__add_members(account_list["_id"], account_list["accounts"])
+
+    def __add_members(self, list_id, account_ids):
+        """This method appends members to the end of a list, skipping existing ones"""
+
+        start = self.__conn.execute(
+            "SELECT COALESCE(MAX(position), -1) + 1 FROM list_members WHERE list_id = ?", (list_id,)
+        ).fetchone()[0]
+        self.__conn.executemany(
+            "INSERT OR IGNORE INTO list_members (list_id, account_id, position) VALUES (?, ?, ?)",
+            [(list_id, account_id, start + offset) for offset, account_id in enumerate(account_ids)]
+        )
+
+    def __update_account(self, update):
+        """This method applies an account update if the stored version still matches,
+        returning whether it was applied"""
+
+        fields = [field for field in update["set"] if field in self.ACCOUNT_FIELDS and field not in ("_id", "ver")]
+        values = [update["set"][field] for field in fields]
+
+        if update["upsert"]:
+            cursor = self.__conn.execute(
+                f"INSERT INTO accounts (_id, {', '.join(fields + ['ver'])}) VALUES (?{', ?' * (len(fields) + 1)}) "
+                f"ON CONFLICT (_id) DO UPDATE SET "
+                f"{', '.join(f'{field} = excluded.{field}' for field in fields + ['ver'])} WHERE accounts.ver = ?",
+                [update["_id"]] + values + [update["ver"] + 1, update["ver"]]
+            )
+        else:
+            cursor = self.__conn.execute(
+                f"UPDATE accounts SET {', '.join(f'{field} = ?' for field in fields + ['ver'])} "
+                f"WHERE _id = ? AND ver = ?",
+                values + [update["ver"] + 1, update["_id"], update["ver"]]
+            )
+
+        return cursor.rowcount == 1
+
+    def __update_list(self, update):
+        """This method applies a list update if the stored version still matches,
+        returning whether it was applied"""
+
+        if update["replace"]:
+            row = self.__conn.execute("SELECT ver FROM account_lists WHERE _id = ?", (update["_id"],)).fetchone()
+            if row is not None and row["ver"] != update["ver"]:
+                return False
+
+            self.__write_list(dict(update["set"], _id=update["_id"], accounts=update["add"], ver=update["ver"] + 1))
+            return True
+
+        fields = [field for field in update["set"] if field in ("name", "sec_factor")]
+        cursor = self.__conn.execute(
+            f"UPDATE account_lists SET {', '.join(f'{field} = ?' for field in fields + ['ver'])} "
+            f"WHERE _id = ? AND ver = ?",
+            [update["set"][field] for field in fields] + [update["ver"] + 1, update["_id"], update["ver"]]
+        )
+        if cursor.rowcount != 1:
+            return False
+
+        self.__add_members(update["_id"], update["add"])
+        self.__conn.executemany(
+            "DELETE FROM list_members WHERE list_id = ? AND account_id = ?",
+            [(update["_id"], account_id) for account_id in update["pull"]]
+        )
+
+        return True
+
+    def reset(self, accounts, account_lists):
+        with self.__lock, self.__conn:
+            # Clear data for clean tables
+            self.__conn.execute("DELETE FROM accounts")
+            self.__conn.execute("DELETE FROM account_lists")
+            self.__conn.execute("DELETE FROM list_members")
+
+            # Populate tables
+            for account in accounts:
+                self.__write_account(account)
+            for account_list in account_lists:
+                self.__write_list(account_list)
+
+            # Followers must reload everything
+            self.__conn.execute("DELETE FROM changes")
+            self.__log_changes([("all", None, "reset")], None)
+
+    @staticmethod
+    def __where(query):
+        """This method converts a MongoDB-style query to a WHERE clause and its parameters"""
+
+        operators = {"$lt": "<", "$lte": "<=", "$gt": ">", "$gte": ">="}
+        clauses = []
+        params = []
+
+        for field, condition in (query or {}).items():
+            if field not in SQLiteStorage.ACCOUNT_FIELDS:
+                raise ValueError(f"Can not query on unknown field '{field}'")
+
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+
+            for operator, value in condition.items():
+                if operator == "$in":
+                    values = list(value)
+                    clauses.append(f"{field} IN ({', '.join('?' * len(values))})" if values else "0")
+                    params.extend(values)
+                elif operator == "$eq":
+                    clauses.append(f"{field} = ?")
+                    params.append(value)
+                elif operator in operators:
+                    clauses.append(f"{field} {operators[operator]} ?")
+                    params.append(value)
+                else:
+                    raise ValueError(f"Unsupported query operator '{operator}'")
+
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def __select(self, sql, params, batch_size):
+        """This method yields rows from a query, fetching them batch_size at a time"""
+
+        with self.__lock:
+            cursor = self.__conn.execute(sql, params)
+
+        while True:
+            with self.__lock:
+                rows = cursor.fetchmany(batch_size)
+
+            if not rows:
+                return
+
+            yield from rows
+
+    def find_accounts(self, query=None, projection=None, batch_size=500):
+        fields = [field for field in self.ACCOUNT_FIELDS
+                  if projection is None or field in projection or field == "_id"]
+        where, params = self.__where(query)
+
+        for row in self.__select(f"SELECT {', '.join(fields)} FROM accounts{where}", params, batch_size):
+            yield self.__account_doc(row)
+
+    def find_account_page(self, after=None, limit=100, query=None, projection=None):
+        fields = [field for field in self.ACCOUNT_FIELDS
+                  if projection is None or field in projection or field == "_id"]
+        query = dict(query or {})
+        if after is not None:
+            # Merge with any condition already on _id
+            condition = query.get("_id", {})
+            query["_id"] = dict(condition if isinstance(condition, dict) else {"$eq": condition}, **{"$gt": after})
+
+        where, params = self.__where(query)
+
+        with self.__lock:
+            rows = self.__conn.execute(f"SELECT {', '.join(fields)} FROM accounts{where} ORDER BY _id LIMIT ?",
+                                       params + [limit]).fetchall()
+
+        return [self.__account_doc(row) for row in rows]
+
+    def find_lists(self, projection=None, list_ids=None):
+        with self.__lock:
+            if list_ids is None:
+                lists = self.__conn.execute("SELECT * FROM account_lists").fetchall()
+            else:
+                list_ids = list(list_ids)
+                lists = self.__conn.execute(
+                    f"SELECT * FROM account_lists WHERE _id IN ({', '.join('?' * len(list_ids)) or 'NULL'})",
+                    list_ids
+                ).fetchall()
+
+        docs = [dict(row) for row in lists]
+        if projection is None or "accounts" in projection:
+            for doc in docs:
+                doc["accounts"] = list(self.find_list_members(doc["_id"]))
+
+        return docs
+
+    def find_list_members(self, list_id, batch_size=500):
+        for row in self.__select("SELECT account_id FROM list_members WHERE list_id = ? ORDER BY position",
+                                 (list_id,), batch_size):
+            yield row["account_id"]
+
+    def find_list_member_page(self, list_id, after=None, limit=100):
+        with self.__lock:
+            rows = self.__conn.execute(
+                "SELECT position, account_id FROM list_members WHERE list_id = ? AND position > ? "
+                "ORDER BY position LIMIT ?",
+                (list_id, -1 if after is None else after, limit)
+            ).fetchall()
+
+        return [(row["position"], row["account_id"]) for row in rows]
+
+    def __delete_list(self, list_id):
+        self.__conn.execute("DELETE FROM account_lists WHERE _id = ?", (list_id,))
+        self.__conn.execute("DELETE FROM list_members WHERE list_id = ?", (list_id,))
+
+    def __log_changes(self, changes, origin):
+        self.__conn.executemany(
+            "INSERT INTO changes (coll, doc_id, op, origin) VALUES (?, ?, ?, ?)",
+            [(coll, doc_id, op, origin) for coll, doc_id, op in changes]
+        )
+
+    def bulk_write(self, account_updates, list_updates, deleted_list_ids, origin=None):
+        # A single transaction means a single commit (and fsync) for the whole batch
+        with self.__lock, self.__conn:
+            written = []
+            conflicts = []
+
+            for update in account_updates:
+                if self.__update_account(update):
+                    written.append(("accounts", update["_id"], "update"))
+                else:
+                    conflicts.append(("accounts", update["_id"]))
+
+            # Deleted lists go first, so a list removed and then created again is written fresh
+            for list_id in deleted_list_ids:
+                self.__delete_list(list_id)
+                written.append(("lists", list_id, "delete"))
+
+            for update in list_updates:
+                if self.__update_list(update):
+                    written.append(("lists", update["_id"], "update"))
+                else:
+                    conflicts.append(("lists", update["_id"]))
+
+            self.__log_changes(written, origin)
+
+            return self.get_revision(), conflicts
+
+    def get_revision(self):
+        with self.__lock:
+            return self.__conn.execute("SELECT COALESCE(MAX(rev), 0) FROM changes").fetchone()[0]
+
+    def find_changes(self, since, batch_size=500):
+        for row in self.__select("SELECT rev, coll, doc_id, op, origin FROM changes WHERE rev > ? ORDER BY rev",
+                                 (since,), batch_size):
+            yield dict(row)
@@ -0,0 +1,115 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the type-ahead account search index
+# Input:            Search text
+# Output:           Account ids
+# Notes:            Every account contributes one (term, id) entry for its
+#                   site, username and URL to one sorted list. The accounts
+#                   whose terms start with a prefix are a contiguous run of
+#                   that list, found with a binary search, so a lookup costs
+#                   O(log n + k) however large the vault is
+# *****************************************************************************
+
+import bisect
+from Database import Database
+from RepositoryIndex import RepositoryIndex
+
+
+class SearchIndex(RepositoryIndex):
+    """Class definition for the sorted-prefix search index -
+    Built from the database and kept current by listening to a repository"""
+
+    URL_PREFIXES = ("https://", "http://", "www.")
+
+    def __init__(self, repository=None, background=False):
+        self.__entries = []     # Sorted (term, account id) pairs
+        self.__terms = {}       # Account id -> its terms
+
+        super().__init__(repository, background)
+
+    @staticmethod
+    def __terms_of(site, uname, url):
+        """This method returns the search terms of an account - matching ignores case, and a
+        URL can also be matched without its scheme and 'www.'"""
+
+        terms = {site.casefold(), uname.casefold()}
+
+        url = (url or "").casefold()
+        if url:
+            terms.add(url)
+            for prefix in SearchIndex.URL_PREFIXES:
+                url = url.removeprefix(prefix)
+                terms.add(url)
+
+        return tuple(term for term in terms if term)
+
+    def _read(self):
+        """This method indexes every account in the database, reading only the searched fields"""
+
+        terms = {doc["_id"]: self.__terms_of(doc["site"], doc["uname"], doc.get("url"))
+                 for doc in Database.find_accounts(fields=["site", "uname", "url"])}
+        entries = sorted((term, account_id) for account_id, account_terms in terms.items()
+                         for term in account_terms)
+
+        return entries, terms
+
+    def _install(self, state):
+        self.__entries, self.__terms = state
+
+    def _apply(self, kind, obj):
+        if kind == "account":
+            self.update(obj)
+
+    def update(self, account):
+        """This method indexes a new or changed account"""
+
+        terms = self.__terms_of(account.get_account_name(), account.get_account_uname(),
+                                account.get_account_url())
+
+        with self._lock:
+            self.__remove(account.get_key())
+
+            for term in terms:
+                bisect.insort(self.__entries, (term, account.get_key()))
+            self.__terms[account.get_key()] = terms
+
+    def __remove(self, account_id):
+        for term in self.__terms.pop(account_id, ()):
+            position = bisect.bisect_left(self.__entries, (term, account_id))
+            if position < len(self.__entries) and self.__entries[position] == (term, account_id):
+                del self.__entries[position]
+
+    def search(self, query, limit=10, accept=None):
+        """This method returns the ids of up to limit accounts matching a query, in term order -
+        every word of the query must start the site, username or URL of a match. accept, if
+        given, is called with each candidate id and can turn it down"""
+
+        words = query.casefold().replace(":", " ").split()
+        if not words:
+            return []
+
+        # Walk the run of the longest word, the fewest candidates, and check the rest per account
+        key = max(words, key=len)
+        matches = {}
+        index = self._built()
+
+        with self._lock:
+            position = bisect.bisect_left(index.__entries, (key,))
+
+            while position < len(index.__entries) and len(matches) < limit:
+                term, account_id = index.__entries[position]
+                if not term.startswith(key):
+                    break
+
+                if account_id not in matches and \
+                        all(any(own.startswith(word) for own in index.__terms[account_id]) for word in words) and \
+                        (accept is None or accept(account_id)):
+                    matches[account_id] = None
+
+                position += 1
+
+        return list(matches)
+
+    def __len__(self):
+        return len(self.__terms)
@@ -0,0 +1,59 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for state shared between WebUI worker
+#                   processes
+# Input:            Database revisions
+# Output:           Database revisions
+# Notes:            Workers share one memory-mapped 8-byte file holding the
+#                   newest revision any of them has written. A worker whose
+#                   model is older than that catches up through its change
+#                   feed before serving the next request. POSIX only (fcntl)
+# *****************************************************************************
+
+import fcntl
+import mmap
+import os
+import struct
+
+
+class SharedState:
+    """Class definition for the shared version stamp"""
+
+    SIZE = struct.calcsize("<Q")
+
+    def __init__(self, path):
+        self.__fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        # New files start at revision 0
+        fcntl.flock(self.__fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.__fd).st_size < self.SIZE:
+                os.ftruncate(self.__fd, self.SIZE)
+        finally:
+            fcntl.flock(self.__fd, fcntl.LOCK_UN)
+
+        self.__map = mmap.mmap(self.__fd, self.SIZE)
+
+    def get_version(self):
+        """This method returns the newest revision published by any worker"""
+
+        fcntl.flock(self.__fd, fcntl.LOCK_SH)
+        try:
+            return struct.unpack_from("<Q", self.__map)[0]
+        finally:
+            fcntl.flock(self.__fd, fcntl.LOCK_UN)
+
+    def publish(self, version):
+        """This method records a revision this worker has written - the stamp never goes backwards"""
+
+        fcntl.flock(self.__fd, fcntl.LOCK_EX)
+        try:
+            if version > struct.unpack_from("<Q", self.__map)[0]:
+                struct.pack_into("<Q", self.__map, 0, version)
+        finally:
+            fcntl.flock(self.__fd, fcntl.LOCK_UN)
+
+    def close(self):
+        self.__map.close()
+        os.close(self.__fd)
@@ -0,0 +1,82 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Base class definition for storage backends used by Database
+# Input:            Account and list documents (dictionaries)
+# Output:           Account and list documents (dictionaries)
+# Notes:            Backends only deal in plain dictionaries shaped like the
+#                   documents produced by Account.to_dict and
+#                   AccountsList.to_dict, and in the update dictionaries
+#                   described in bulk_write - building objects is up to
+#                   Database
+# *****************************************************************************
+
+class StorageBackend:
+    """Class definition for the storage interface -
+    Every backend must implement each of these methods"""
+
+    def reset(self, accounts, account_lists):
+        """This method drops all stored data and repopulates it with the given documents"""
+
+        raise NotImplementedError
+
+    def find_accounts(self, query=None, projection=None, batch_size=500):
+        """This method returns an iterable of account documents matching a MongoDB-style query -
+        only equality, '$in', '$lt', '$lte', '$gt' and '$gte' conditions are required. Documents
+        are fetched batch_size at a time, and projection (a list of field names) limits the
+        fields returned ('_id' is always returned)"""
+
+        raise NotImplementedError
+
+    def find_account_page(self, after=None, limit=100, query=None, projection=None):
+        """This method returns a list of up to limit account documents matching a query, in _id
+        order, starting after the _id after (from the start if None) - a keyset page, so each
+        page costs the same however deep it is"""
+
+        raise NotImplementedError
+
+    def find_lists(self, projection=None, list_ids=None):
+        """This method returns an iterable of list documents (all of them, or only those in
+        list_ids) - member ids are included under 'accounts' unless a projection leaves them out"""
+
+        raise NotImplementedError
+
+    def find_list_members(self, list_id, batch_size=500):
+        """This method returns an iterable of the member account ids of a single list, in
+        order, fetched batch_size at a time"""
+
+        raise NotImplementedError
+
+    def find_list_member_page(self, list_id, after=None, limit=100):
+        """This method returns a list of up to limit (position, account id) pairs of a list's
+        members, in order, starting after the position after (from the start if None)"""
+
+        raise NotImplementedError
+
+    def bulk_write(self, account_updates, list_updates, deleted_list_ids, origin=None):
+        """This method applies many account and list updates and deletes many lists
+        in as few round trips as the backend allows, and records one change log entry
+        per document written, tagged with origin. Each update is a compare-and-swap -
+        it is only applied if the stored document's version ('ver', 0 if missing) is
+        still the one the update was based on, and it sets the version to one more.
+        It returns (latest revision, conflicts), where conflicts lists the
+        ('accounts' or 'lists', _id) pairs of updates that were not applied -
+        account update: {"_id", "ver": expected version, "set": changed fields,
+                         "upsert": insert if missing}
+        list update:    {"_id", "ver": expected version, "set": changed fields,
+                         "add": member ids to add, "pull": member ids to remove,
+                         "replace": the members are exactly 'add' (the list is new)}"""
+
+        raise NotImplementedError
+
+    def get_revision(self):
+        """This method returns the revision of the latest change log entry (0 if there is none)"""
+
+        raise NotImplementedError
+
+    def find_changes(self, since, batch_size=500):
+        """This method returns an iterable of the change log entries after revision since, in
+        order - each one is {"rev", "coll": 'accounts', 'lists' or 'all', "doc_id",
+        "op": 'update', 'delete' or 'reset', "origin"}"""
+
+        raise NotImplementedError
@@ -0,0 +1,370 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definition for the password strength estimator
+# Input:            Passwords
+# Output:           Strength results - a 0 to 4 score, a label, the log10 of
+#                   the estimated guesses and a warning
+# Notes:            In the style of zxcvbn: a password is split into the
+#                   patterns an attacker would try first - common passwords
+#                   and words (also reversed or in l33t), keyboard walks,
+#                   dates, repeats and sequences - and the cheapest way to
+#                   cover it with those patterns and brute force is its
+#                   guess count. Results are cached under a keyed hash of
+#                   the password, so a password is only ever scored once,
+#                   and big batches are spread over a process pool. The pool
+#                   is started on first use and kept - its workers come from
+#                   a fork server (or are spawned where there is none), as
+#                   forking a threaded web server can copy a held lock into
+#                   a worker
+# *****************************************************************************
+
+import atexit
+import hashlib
+import math
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from Database import Database
+
+
+class StrengthEstimator:
+    """Class definition for the strength estimator -
+    estimate() scores one password, the batch methods score many through the cache"""
+
+    LABELS = ("very weak", "weak", "fair", "strong", "very strong")
+    THRESHOLDS = (3, 6, 8, 10)      # log10 of the guesses needed to reach each next score
+
+    CACHE_SIZE = int(os.environ.get("PASSMAN_STRENGTH_CACHE_SIZE", 200000))
+    POOL_THRESHOLD = 5000           # Uncached passwords needed before a batch uses processes
+    SCAN_BATCH_SIZE = 10000
+
+    # Most common first - a word's guesses are its rank
+    COMMON_WORDS = (
+        "password", "123456", "qwerty", "letmein", "dragon", "monkey", "football", "baseball", "welcome",
+        "admin", "login", "princess", "sunshine", "master", "shadow", "iloveyou", "abc123", "trustno1",
+        "superman", "batman", "michael", "jennifer", "jordan", "hunter", "ranger", "buster", "soccer",
+        "hockey", "killer", "george", "charlie", "andrew", "michelle", "love", "secret", "summer", "winter",
+        "spring", "autumn", "flower", "freedom", "whatever", "cheese", "computer", "internet", "starwars",
+        "pokemon", "pepper", "ginger", "orange", "banana", "purple", "yellow", "silver", "golden", "diamond",
+        "thunder", "tigger", "matrix", "access", "mustang", "harley", "maggie", "daniel", "thomas", "robert",
+        "joshua", "jessica", "ashley", "amanda", "nicole", "hannah", "samantha", "taylor", "anthony", "william",
+        "matthew", "chelsea", "arsenal", "liverpool", "yankees", "cowboys", "eagles", "lakers", "pass", "passwd",
+        "passwerd", "test", "guest", "root", "user", "default", "changeme", "hello", "angel", "baby", "family",
+        "friend", "money", "lucky", "happy", "smile", "music", "dance", "magic", "fire", "water", "earth",
+        "star", "moon", "blue", "black", "white", "green", "red", "cookie", "coffee", "chocolate", "kitty",
+        "puppy", "tiger", "lion", "bear", "wolf", "eagle", "falcon", "phoenix", "knight", "ninja", "pirate",
+        "wizard", "zombie", "monster", "rock", "metal", "guitar", "piano", "school", "college", "office",
+        "house", "home", "world", "life", "time", "year", "work", "game", "gamer", "player", "google", "apple",
+        "windows", "linux", "facebook", "twitter", "reddit", "amazon", "netflix", "bank", "email", "mail",
+        "letme", "welcome1", "admin1", "qazwsx", "zaq1", "asdf", "zxcv",
+    )
+    __ranks = {word: rank for rank, word in enumerate(COMMON_WORDS, 1)}
+    __reversed_ranks = {word[::-1]: rank for rank, word in enumerate(COMMON_WORDS, 1)}
+
+    # Every prefix of a word, so a scan can stop as soon as no word can match
+    __prefixes = {word[:length] for word in COMMON_WORDS for length in range(1, len(word) + 1)}
+    __reversed_prefixes = {word[::-1][:length] for word in COMMON_WORDS for length in range(1, len(word) + 1)}
+
+    # Characters commonly swapped in for letters
+    L33T = str.maketrans("4@83!1|05$7+2", "aabeiiiossttz")
+
+    KEYBOARD_ROWS = ("`1234567890-=", "qwertyuiop[]\\", "asdfghjkl;'", "zxcvbnm,./")
+    KEYBOARD_SHIFTED = ("~!@#$%^&*()_+", "QWERTYUIOP{}|", "ASDFGHJKL:\"", "ZXCVBNM<>?")
+
+    # A year, optionally followed by month and day, or day and month optionally followed by a year
+    DATE_PATTERN = re.compile(r"(?:19|20)\d\d(?:[-/._ ]?\d\d){0,2}"
+                              r"|\d\d(?:[-/._ ]?\d\d){1,2}(?:[-/._ ]?(?:19|20)?\d\d)?")
+    REPEAT_PATTERN = re.compile(r"(.+?)\1+")
+
+    # Position of every key, shifted or not, for keyboard walks
+    __keys = {key: (row % 4, column)
+              for row, keys in enumerate(KEYBOARD_ROWS + KEYBOARD_SHIFTED) for column, key in enumerate(keys)}
+
+    # One process pool for every estimator, started on first use
+    __pool = None
+    __pool_lock = threading.Lock()
+
+    def __init__(self):
+        self.__key = os.urandom(16)
+        self.__lock = threading.Lock()
+        self.__cache = {}       # Keyed password hash -> result, oldest first
+
+    # Scoring one password
+
+    @staticmethod
+    def __cardinality(pwd):
+        """This method returns the size of the character pool a brute force attack on pwd needs"""
+
+        pool = 0
+        pool += 26 if any(char.islower() for char in pwd) else 0
+        pool += 26 if any(char.isupper() for char in pwd) else 0
+        pool += 10 if any(char.isdigit() for char in pwd) else 0
+        pool += 33 if any(not char.isalnum() and char.isascii() for char in pwd) else 0
+        pool += 100 if any(not char.isascii() for char in pwd) else 0
+
+        return max(pool, 10)
+
+    @staticmethod
+    def __dictionary_matches(pwd):
+        """This method yields (start, end, log10 guesses, kind) for the common words in pwd, as
+        written, reversed or with l33t substitutions undone"""
+
+        lower = pwd.lower()
+        unleeted = lower.translate(StrengthEstimator.L33T)
+
+        searches = [(lower, StrengthEstimator.__ranks, StrengthEstimator.__prefixes, 0.0),
+                    (lower, StrengthEstimator.__reversed_ranks, StrengthEstimator.__reversed_prefixes, math.log10(2))]
+        if unleeted != lower:
+            searches.append((unleeted, StrengthEstimator.__ranks, StrengthEstimator.__prefixes, math.log10(2)))
+
+        for text, ranks, prefixes, extra in searches:
+            for start in range(len(text) - 2):
+                for end in range(start + 1, len(text) + 1):
+                    part = text[start:end]
+                    if part not in prefixes:
+                        break
+
+                    rank = ranks.get(part)
+                    if rank is None or end - start < 3:
+                        continue
+
+                    # Upper case letters multiply the guesses by the ways they could be placed
+                    original = pwd[start:end]
+                    uppers = sum(char.isupper() for char in original)
+                    if uppers and original != original.capitalize() and not original.isupper():
+                        case = math.log10(sum(math.comb(len(original), count) for count in range(1, uppers + 1)))
+                    else:
+                        case = math.log10(2) if uppers else 0.0
+
+                    yield start, end, math.log10(rank) + extra + case, "word"
+
+    @staticmethod
+    def __keyboard_matches(pwd):
+        """This method yields matches for runs of three or more neighbouring keys"""
+
+        keys = StrengthEstimator.__keys
+        start = 0
+        turns = 0
+        direction = None
+
+        for end in range(1, len(pwd) + 1):
+            step = None
+            if end < len(pwd) and pwd[end - 1] in keys and pwd[end] in keys:
+                (row1, column1), (row2, column2) = keys[pwd[end - 1]], keys[pwd[end]]
+                if abs(row1 - row2) <= 1 and abs(column1 - column2) <= 1 and (row1, column1) != (row2, column2):
+                    step = (row2 - row1, column2 - column1)
+
+            if step is not None:
+                if step != direction:
+                    turns += 1
+                    direction = step
+                continue
+
+            if end - start >= 3:
+                yield start, end, math.log10(47 * (end - start) * 6 ** turns), "keyboard"
+
+            start, turns, direction = end, 0, None
+
+    @staticmethod
+    def __sequence_matches(pwd):
+        """This method yields matches for runs like abc, 123 or zyx"""
+
+        start = 0
+        for index in range(1, len(pwd) + 1):
+            step = ord(pwd[index]) - ord(pwd[index - 1]) if index < len(pwd) else 0
+            run_step = ord(pwd[start + 1]) - ord(pwd[start]) if index - start > 1 else step
+
+            if abs(step) == 1 and step == run_step:
+                continue
+
+            if index - start >= 3:
+                base = 10 if pwd[start].isdigit() else 26
+                yield start, index, math.log10(base * (index - start) * (2 if run_step < 0 else 1)), "sequence"
+
+            # A new step direction starts a run at the last character
+            start = index - 1 if abs(step) == 1 else index
+
+    @staticmethod
+    def __date_matches(pwd):
+        """This method yields matches for digit runs that read as dates or years"""
+
+        for found in StrengthEstimator.DATE_PATTERN.finditer(pwd):
+            digits = re.sub(r"\D", "", found.group())
+            if len(digits) == 4 and digits[:2] not in ("19", "20"):
+                continue
+
+            # A year alone is one of about 200, a full date one of about 365 per year
+            guesses = 200 if len(digits) == 4 else 365 * 200
+            yield found.start(), found.end(), math.log10(guesses), "date"
+
+    @staticmethod
+    def __repeat_matches(pwd):
+        """This method yields matches for a character or block repeated back to back"""
+
+        for found in StrengthEstimator.REPEAT_PATTERN.finditer(pwd):
+            base = found.group(1)
+            count = len(found.group()) // len(base)
+            yield found.start(), found.end(), \
+                StrengthEstimator.estimate(base)["guesses_log10"] + math.log10(count), "repeat"
+
+    @staticmethod
+    def estimate(pwd):
+        """This method returns the strength result of one password - a dictionary of "score" (0 to 4),
+        "label", "guesses_log10" and "warning" (empty when nothing weak was found)"""
+
+        if not pwd:
+            return {"score": 0, "label": StrengthEstimator.LABELS[0], "guesses_log10": 0.0,
+                    "warning": "Empty password"}
+
+        matches = {}
+        for matcher in (StrengthEstimator.__dictionary_matches, StrengthEstimator.__keyboard_matches,
+                        StrengthEstimator.__sequence_matches, StrengthEstimator.__date_matches,
+                        StrengthEstimator.__repeat_matches):
+            for start, end, guesses, kind in matcher(pwd):
+                matches.setdefault(end, []).append((start, guesses, kind))
+
+        # Cheapest cover of the first k characters, in log10 guesses, one character or pattern at a time
+        per_char = math.log10(StrengthEstimator.__cardinality(pwd))
+        best = [(0.0, None)] + [(math.inf, None)] * len(pwd)
+        for end in range(1, len(pwd) + 1):
+            best[end] = (best[end - 1][0] + per_char, (end - 1, None))
+            for start, guesses, kind in matches.get(end, ()):
+                # Each extra pattern also costs the guesses to pick which patterns to combine
+                cost = best[start][0] + max(guesses, 0.0) + (math.log10(2) if start else 0.0)
+                if cost < best[end][0]:
+                    best[end] = (cost, (start, kind))
+
+        # The longest pattern on the cheapest path is the one to warn about
+        kinds = {}
+        end = len(pwd)
+        while end:
+            start, kind = best[end][1]
+            if kind is not None:
+                kinds[kind] = kinds.get(kind, 0) + end - start
+            end = start
+
+        guesses_log10 = best[-1][0]
+        score = sum(guesses_log10 >= threshold for threshold in StrengthEstimator.THRESHOLDS)
+
+        warnings = {"word": "Contains a common password or word", "keyboard": "Contains a keyboard pattern",
+                    "sequence": "Contains a sequence like abc or 123", "date": "Contains a date or year",
+                    "repeat": "Contains repeated characters"}
+        warning = warnings[max(kinds, key=kinds.get)] if kinds and score < 4 else ""
+        if not warning and score < 3 and len(pwd) < 10:
+            warning = "Too short"
+
+        return {"score": score, "label": StrengthEstimator.LABELS[score], "guesses_log10": round(guesses_log10, 2),
+                "warning": warning}
+
+    # Scoring many passwords, through the cache
+
+    def __hash(self, pwd):
+        return hashlib.blake2b(pwd.encode("utf-8"), key=self.__key, digest_size=16).digest()
+
+    @staticmethod
+    def __get_pool():
+        """This method returns the shared process pool, starting it on first use"""
+
+        with StrengthEstimator.__pool_lock:
+            if StrengthEstimator.__pool is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                StrengthEstimator.__pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context(method))
+                atexit.register(StrengthEstimator.__pool.shutdown)
+
+            return StrengthEstimator.__pool
+
+    @staticmethod
+    def __estimate_all(values):
+        """This method scores a list of passwords, spreading a large one across the process pool"""
+
+        if len(values) >= StrengthEstimator.POOL_THRESHOLD and (os.cpu_count() or 1) > 1:
+            pool = StrengthEstimator.__get_pool()
+
+            try:
+                return list(pool.map(StrengthEstimator.estimate, values,
+                                     chunksize=max(len(values) // (4 * os.cpu_count()), 1)))
+            except BrokenProcessPool as error:
+                # Start a new pool next time, and score this batch here
+                print(f"Strength scoring pool failed, scoring in this process: {error}")
+
+                with StrengthEstimator.__pool_lock:
+                    if StrengthEstimator.__pool is pool:
+                        StrengthEstimator.__pool = None
+
+        return [StrengthEstimator.estimate(value) for value in values]
+
+    def score(self, pwd):
+        """This method returns the strength result of one password, from the cache if it was seen before"""
+
+        return self.score_batch({None: pwd})[None]
+
+    def score_batch(self, passwords):
+        """This method takes a dictionary of key -> password and returns key -> strength result - only
+        passwords not already in the cache are scored, and a large batch is split across processes"""
+
+        hashes = {key: self.__hash(pwd or "") for key, pwd in passwords.items()}
+
+        with self.__lock:
+            known = {digest: self.__cache[digest] for digest in hashes.values() if digest in self.__cache}
+
+        missing = {digest: passwords[key] or "" for key, digest in hashes.items() if digest not in known}
+        if missing:
+            scored = dict(zip(missing, self.__estimate_all(list(missing.values()))))
+            known.update(scored)
+
+            with self.__lock:
+                self.__cache.update(scored)
+
+                # Forget the oldest results once the cache is full
+                while len(self.__cache) > StrengthEstimator.CACHE_SIZE:
+                    del self.__cache[next(iter(self.__cache))]
+
+        return {key: known[digest] for key, digest in hashes.items()}
+
+    def score_accounts(self, accounts):
+        """This method returns account id -> strength result for account objects"""
+
+        return self.score_batch({account.get_key(): account.get_pass() for account in accounts})
+
+    def with_strength(self, docs, batch_size=500):
+        """This method yields account documents with their "pwd" swapped for a "strength" label,
+        scoring them a batch at a time"""
+
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+
+            if len(batch) == batch_size:
+                yield from self.__label(batch)
+                batch = []
+
+        yield from self.__label(batch)
+
+    def __label(self, docs):
+        strengths = self.score_batch({index: doc.pop("pwd", "") for index, doc in enumerate(docs)})
+
+        for index, doc in enumerate(docs):
+            doc["strength"] = strengths[index]["label"]
+            yield doc
+
+    def weakest_first(self, limit=None):
+        """This method scores every saved password and returns (account id, strength result) pairs,
+        weakest first, reading the passwords one batch at a time"""
+
+        results = []
+        batch = {}
+        for doc in Database.find_accounts(fields=["pwd"], with_pwd=True):
+            batch[doc["_id"]] = doc.get("pwd") or ""
+
+            if len(batch) == StrengthEstimator.SCAN_BATCH_SIZE:
+                results += self.score_batch(batch).items()
+                batch = {}
+
+        results += self.score_batch(batch).items()
+        results.sort(key=lambda item: (item[1]["guesses_log10"], item[0]))
+
+        return results if limit is None else results[:limit]
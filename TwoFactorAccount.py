@@ -10,17 +10,18 @@ from Account import Account
 
 
 class TFA(Account):
-    """Class definition for two-factor accounts"""
+    """Class definition for two-factor accounts -
+    Shared fields are stored once, by Account"""
+
+    __slots__ = ("__type", "__info")
+
+    TYPE = "TFA"
+    FIELDS = Account.FIELDS + ("typ", "info")
 
     def __init__(self, site, url, uname, pwd, tlc, typ, info):
         super().__init__(site, url, uname, pwd, tlc)
-        self.__site = site
-        self.__url = url
-        self.__uname = uname
-        self.__tlc = tlc
-        self.__pwd = pwd
-        self.__type = typ
-        self.__info = info
+        self.__type = Account.intern(typ)
+        self.__info = Account.intern(info)
 
     def get_tfa_typ(self):
         return self.__type
@@ -28,17 +29,16 @@ class TFA(Account):
     def get_tfa_info(self):
         return self.__info
 
+    def refresh(self, account_dictionary):
+        super().refresh(account_dictionary)
+        self.__type = Account.intern(account_dictionary.get("typ", self.__type))
+        self.__info = Account.intern(account_dictionary.get("info", self.__info))
+
     def to_dict(self):
         """This method converts TFA objects to dictionaries for uploading to database"""
 
-        return {
-            "_id": self.get_account_id(),
-            "type": "Account",
-            "site": self.get_account_name(),
-            "url": self.get_account_url(),
-            "uname": self.get_account_uname(),
-            "pwd": self.__pwd,
-            "tlc": self.__tlc,
-            "typ": self.get_tfa_typ(),
-            "info": self.get_tfa_info()
-        }
+        account_dictionary = super().to_dict()
+        account_dictionary["typ"] = self.get_tfa_typ()
+        account_dictionary["info"] = self.get_tfa_info()
+
+        return account_dictionary
@@ -0,0 +1,484 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Class definitions for the pages shared by both web UIs
+# Input:            Request arguments and form fields
+# Output:           Pages to render - a template, its context and a status
+# Notes:            PassManWebUI (Flask) and PassManAsyncWebUI (Quart) serve
+#                   the same routes over the same model, so everything but
+#                   the framework glue lives here - loading and syncing the
+#                   model, reading and checking arguments, and the work
+#                   behind each page. These methods may wait on the
+#                   database, so the async UI calls them on a worker thread
+# *****************************************************************************
+
+import datetime
+import os
+import urllib.parse
+from AccountsList import AccountsList
+from AccountRepository import AccountRepository
+from ChangeFeed import ChangeFeed
+from SearchIndex import SearchIndex
+from HostnameIndex import HostnameIndex
+from PasswordAgeIndex import PasswordAgeIndex
+from RotationScheduler import RotationScheduler
+from RotationJob import RotationJob
+from BreachChecker import BreachChecker
+from ReuseIndex import ReuseIndex
+from StrengthEstimator import StrengthEstimator
+from Account import Account
+from Database import Database
+
+
+class Page:
+    """Class definition for a page to render -
+    stream names the context entry (an iterator) to send as it is read, if any"""
+
+    def __init__(self, template, status=200, stream=None, **context):
+        self.template = template
+        self.status = status
+        self.stream = stream
+        self.context = context
+
+
+class WebPages:
+    """Class definition for the shared web pages -
+    Holds the model and indexes a web UI serves, and builds each of its pages"""
+
+    MENU = {
+        "/print-lists": "Display All Account Lists",
+        "/get-info-for-create-list": "Create New Account List",
+        "/select-list-to-delete": "Delete Account List",
+        "/select-list-to-print": "Print an Account List",
+        "/print-all-accounts": "Display All Accounts",
+        "/select-list-for-account-removal": "Remove Account From a List",
+        "/get-data-for-update": "Change Password for an Account",
+        "/select-lists-to-join": "Join Two Account Lists",
+        "/stale-accounts": "Stale Password Report",
+        "/rotation-due": "Passwords Due for Rotation",
+        "/select-accounts-to-rotate": "Rotate Passwords in Bulk",
+        "/breach-report": "Breached Password Report",
+        "/reuse-report": "Password Reuse Report",
+        "/strength-report": "Password Strength Report"
+    }
+
+    def __init__(self):
+        """This method loads the model and starts syncing with the database - with
+        PASSMAN_SHARED_STATE set to a file path, every worker process using that path sees
+        each other's changes before its next request"""
+
+        # Get data (accounts are loaded on first use), noting the revision it was read at
+        revision = Database.get_revision()
+        self.__repository = AccountRepository.load(lazy=True)
+
+        # Pick up changes made by other processes from that revision on
+        self.__change_feed = ChangeFeed(self.__repository, revision,
+                                        float(os.environ.get("PASSMAN_SYNC_INTERVAL", 2.0)))
+        self.__change_feed.start()
+
+        # The indexes below read the whole vault, so they are built in the background and
+        # answer from a plain scan until they are ready
+
+        # Type-ahead search, kept current as the model changes
+        self.__search_index = SearchIndex(self.__repository, background=True)
+
+        # Page URL to account lookups for browser autofill
+        self.__hostname_index = HostnameIndex(self.__repository, background=True)
+
+        # Password ages, for the stale password report
+        self.__age_index = PasswordAgeIndex(self.__repository, background=True)
+
+        # Rotation due dates, checked in the background as days go by
+        self.__rotation_scheduler = RotationScheduler(self.__repository,
+                                                      float(os.environ.get("PASSMAN_ROTATION_INTERVAL", 60.0)),
+                                                      background=True)
+        self.__rotation_scheduler.start()
+
+        # Keyed password hashes, for reuse warnings
+        self.__reuse_index = ReuseIndex(self.__repository, background=True)
+
+        # Strength scores, cached by password
+        self.__strength_estimator = StrengthEstimator()
+
+        self.__shared_state = None
+        if os.environ.get("PASSMAN_SHARED_STATE"):
+            from SharedState import SharedState
+
+            self.__shared_state = SharedState(os.environ["PASSMAN_SHARED_STATE"])
+
+    def stop(self):
+        """This method stops syncing and writes any queued changes"""
+
+        self.__change_feed.stop()
+        self.__rotation_scheduler.stop()
+        Database.flush()
+
+    def get_repository(self):
+        return self.__repository
+
+    def get_revision(self):
+        return self.__repository.get_revision()
+
+    # Request handling
+
+    def needs_catch_up(self):
+        """This method checks whether another worker has published a newer revision"""
+
+        return self.__shared_state is not None and \
+            self.__shared_state.get_version() > self.__change_feed.get_revision()
+
+    def catch_up(self):
+        """This method brings the model up to date if another worker has published a newer revision"""
+
+        if self.needs_catch_up():
+            self.__change_feed.poll()
+
+    def publish_changes(self):
+        """This method writes a request's changes, publishes their revision to the other workers and
+        returns a ConflictError for any that lost to another writer, or None"""
+
+        Database.flush()
+
+        if self.__shared_state is not None:
+            self.__shared_state.publish(Database.get_written_revision())
+
+        return Database.take_conflicts()
+
+    def conflict(self, error):
+        """This method reloads whatever was changed elsewhere and tells the user their
+        change was not saved"""
+
+        self.__repository.apply_conflict(error)
+
+        return Page("error.html", 409, error_message=f"{error} - please try again :(")
+
+    @staticmethod
+    def error(message):
+        return Page("error.html", error_message=message)
+
+    @staticmethod
+    def int_arg(args, name, default, low=None, high=None):
+        """This method reads a whole number argument, kept from low to high - default if it is
+        missing or not a number"""
+
+        try:
+            value = int(args.get(name, default))
+        except ValueError:
+            return default
+
+        if low is not None:
+            value = max(value, low)
+        if high is not None:
+            value = min(value, high)
+
+        return value
+
+    @staticmethod
+    def page_limit(args):
+        """This method returns the page size asked for with ?limit=, kept from 1 to 1000"""
+
+        return WebPages.int_arg(args, "limit", Database.PAGE_SIZE, 1, 1000)
+
+    @staticmethod
+    def is_paged(args):
+        """This method checks whether a listing was asked for one page at a time"""
+
+        return "after" in args or "limit" in args
+
+    def find_account_list(self, account_list_name):
+        """This method takes a list name and returns a list object"""
+
+        return self.__repository.get_list(account_list_name)
+
+    def find_account(self, account_name, account_list):
+        """This method takes an account name and list name
+        and returns an account object"""
+
+        account = self.__repository.get_account(account_name)
+
+        if account is None or account_list is None or account not in account_list:
+            return None
+
+        return account
+
+    # Pages
+
+    @staticmethod
+    def menu():
+        """This method builds the homepage and its menu options"""
+
+        return Page("menu.html", choices=WebPages.MENU)
+
+    def lists_page(self, template):
+        """This method builds a page or form showing every account list"""
+
+        return Page(template, account_lists=self.__repository.get_lists())
+
+    def print_account_list(self, args):
+        """This method builds the page of the accounts saved in a particular account list"""
+
+        # Get list name from form
+        account_list_name = args["account_list_name"]
+
+        # If not found, display error page
+        acc_list = self.find_account_list(account_list_name)
+        if acc_list is None:
+            return self.error(f"There is no list named '{account_list_name}' :(")
+
+        # Only the shown fields are read, and the passwords are swapped for their strength before
+        # they reach the page - one page at a time if asked for, otherwise the whole list, sent as
+        # it is read
+        if self.is_paged(args):
+            try:
+                after = int(args["after"]) if args.get("after") else None
+            except ValueError:
+                return self.error("That is not a valid page :(")
+
+            limit = self.page_limit(args)
+            accounts, next_cursor = Database.find_list_page(acc_list.get_list_id(), after, limit,
+                                                            fields=["site", "uname", "pwd"], with_pwd=True)
+
+            return Page(
+                "print_account_list.html",
+                account_list=acc_list,
+                accounts=list(self.__strength_estimator.with_strength(accounts)),
+                next_page=self.__next_page(account_list_name=account_list_name, after=next_cursor, limit=limit)
+                if next_cursor is not None else None
+            )
+
+        return Page(
+            "print_account_list.html",
+            stream="accounts",
+            account_list=acc_list,
+            accounts=self.__strength_estimator.with_strength(
+                Database.find_accounts_by_list(acc_list.get_list_id(), fields=["site", "uname", "pwd"],
+                                               with_pwd=True))
+        )
+
+    def print_all_accounts(self, args):
+        """This method builds the page of all saved accounts"""
+
+        # Only the shown fields are read, and never the passwords - one page at a time if
+        # asked for, otherwise the whole vault, sent as it is read
+        if self.is_paged(args):
+            limit = self.page_limit(args)
+            accounts, next_cursor = Database.find_accounts_page(args.get("after") or None, limit,
+                                                                fields=["site", "uname"])
+
+            return Page(
+                "print_all_accounts.html",
+                all_accounts=accounts,
+                next_page=self.__next_page(after=next_cursor, limit=limit) if next_cursor is not None else None
+            )
+
+        return Page(
+            "print_all_accounts.html",
+            stream="all_accounts",
+            all_accounts=Database.find_accounts(fields=["site", "uname"])
+        )
+
+    @staticmethod
+    def __next_page(**args):
+        """This method returns the link to the next page of the same listing"""
+
+        return "?" + urllib.parse.urlencode(args)
+
+    def create_list(self, args):
+        """This method creates a new account list"""
+
+        # Get name and info from form - names are capitalized, as in the console UI and the API
+        name = args["list_name"].lower().capitalize()
+        sec = int(args["sec_factor"])
+
+        # Update data - the repository refuses duplicate lists
+        new_list = AccountsList(name, sec)
+        if not self.__repository.add_list(new_list):
+            return self.error(f"List '{name}' already exists :(")
+
+        AccountsList.upload(new_list)
+
+        # Display success page
+        return Page("create_list_success.html", list_name=name, sec_factor=sec)
+
+    def delete_list(self, args):
+        """This method deletes an account list"""
+
+        # Get list name from form
+        name = args["list_name"]
+
+        # If found, remove list
+        acc_list = self.find_account_list(name)
+        if acc_list is not None:
+            self.__repository.remove_list(acc_list)
+            AccountsList.remove_list(acc_list)
+
+        # Display success page
+        return Page("delete_success.html", list_name=name)
+
+    def select_account_to_remove(self, args):
+        """This method builds the form for picking an account to remove from a list"""
+
+        # Get name and find account list object
+        list_name = args["list_name"]
+        account_list = self.find_account_list(list_name)
+
+        # If list not found, display error
+        if account_list is None:
+            return self.error(f"There is no list named '{list_name}' :(")
+
+        # Load the members first, so rendering does not wait on the database
+        account_list.get_account_ids()
+
+        # Send account list to a form to select account
+        return Page("remove_account_form.html", account_list=account_list)
+
+    def join_lists(self, args):
+        """This method joins two selected lists"""
+
+        # Get names and list objects
+        list1_name = args["list1_name"]
+        list2_name = args["list2_name"]
+        list1 = self.find_account_list(list1_name)
+        list2 = self.find_account_list(list2_name)
+
+        # If list not found, display error page
+        if list1 is None:
+            return self.error(f"There is no list named '{list1_name}' :(")
+
+        if list2 is None:
+            return self.error(f"There is no list named '{list2_name}' :(")
+
+        # Join the lists
+        joined = list1 + list2
+
+        # Add joined list to lists and database
+        if not self.__repository.add_list(joined):
+            return self.error(f"List '{joined.get_list_name()}' already exists :(")
+
+        AccountsList.upload(joined)
+
+        # Display success page
+        return Page("join_success.html", l1=list1_name, l2=list2_name, name=joined.get_list_name())
+
+    def remove_account(self, args):
+        """This method removes a selected account from a selected list"""
+
+        # Get names and objects
+        list_name = args["list_name"]
+        account_name = args["account_name"]
+        account_list = self.find_account_list(list_name)
+        account = self.find_account(account_name, account_list)
+
+        # If not found, display error
+        if account_list is None:
+            return self.error(f"There is no list named '{list_name}' :(")
+
+        if account is None:
+            return self.error(f"There is no account named '{account_name}' :(")
+
+        # Remove account
+        account_list.remove(account)
+        AccountsList.upload(account_list)
+
+        # Display success page
+        return Page("remove_success.html", account=account, account_list_name=list_name)
+
+    def search(self, args):
+        """This method returns the ids of the accounts matching ?q=, for type-ahead - lookups are
+        in memory and take microseconds"""
+
+        return {"accounts": self.__search_index.search(args.get("q", ""), self.int_arg(args, "limit", 10, 1, 100))}
+
+    def autofill(self, args):
+        """This method returns the ids of the accounts for the page at ?url=, for a browser
+        helper - answered from memory, without reading the database"""
+
+        url = args.get("url", "")
+
+        return {"host": HostnameIndex.normalize(url), "accounts": self.__hostname_index.lookup(url)}
+
+    def stale_accounts(self, args):
+        """This method builds the report of the accounts whose passwords are older than ?days=, by list"""
+
+        days = self.int_arg(args, "days", PasswordAgeIndex.STALE_DAYS, 0)
+
+        return Page("stale_accounts.html", days=days, groups=self.__age_index.older_than_by_list(days))
+
+    def rotation_due(self):
+        """This method builds the report of the accounts whose passwords are due or overdue for a
+        change under their lists' security levels, most overdue first"""
+
+        return Page("rotation_due.html", due_accounts=self.__rotation_scheduler.get_due(),
+                    today=datetime.date.today())
+
+    def select_accounts_to_rotate(self):
+        """This method builds the bulk rotation form"""
+
+        return Page("rotate_form.html", account_lists=self.__repository.get_lists(),
+                    days=PasswordAgeIndex.STALE_DAYS)
+
+    def rotate_passwords(self, form):
+        """This method gives new random passwords to a list's accounts, or to every account past
+        an age, and reports any that failed"""
+
+        if form.get("mode") == "list":
+            account_list = self.find_account_list(form.get("list_name", ""))
+            if account_list is None:
+                return self.error(f"There is no list named {form.get('list_name')} :(")
+
+            results = RotationJob.rotate_list(self.__repository, account_list)
+        else:
+            try:
+                days = max(int(form.get("days", "")), 0)
+            except ValueError:
+                return self.error("The age must be a whole number of days :(")
+
+            results = RotationJob.rotate_older_than(self.__repository, self.__age_index, days)
+
+        return Page("rotate_results.html", results=results)
+
+    @staticmethod
+    def breach_report():
+        """This method checks every saved password against the breach corpus and builds the list
+        of the accounts whose passwords were found"""
+
+        checker = BreachChecker.default()
+
+        return Page("breach_report.html", breached=None if checker is None else checker.scan_vault())
+
+    def reuse_report(self):
+        """This method builds the list of the groups of accounts that share a password"""
+
+        return Page("reuse_report.html", groups=self.__reuse_index.reused_groups())
+
+    def strength_report(self, args):
+        """This method scores every saved password and lists the weakest first, up to ?limit="""
+
+        return Page("strength_report.html",
+                    results=self.__strength_estimator.weakest_first(self.int_arg(args, "limit", 100, 1, 1000)))
+
+    def update_password(self, form):
+        """This method updates the password for a selected account"""
+
+        # Get info
+        pwd = form["pwd"]
+        account_name = form["account_name"]
+
+        # Refuse passwords that are known from data breaches
+        checker = BreachChecker.default()
+        if checker is not None and checker.is_breached(pwd):
+            return self.error("That password appears in a known data breach - please choose another :(")
+
+        # If not found, display error page
+        account = self.__repository.get_account(account_name)
+        if account is None:
+            return self.error(f"There is no account named {account_name} :(")
+
+        # Note any other accounts already using it, before this one joins them
+        reused_by = self.__reuse_index.users_of(pwd, exclude=account.get_key())
+
+        account.set_account_pwd(pwd)
+        Account.upload(account)
+
+        # Display success page
+        return Page("password_success.html", account=account_name, reused_by=reused_by)
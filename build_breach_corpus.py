@@ -0,0 +1,80 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Running this file builds a breach corpus for BreachChecker
+# Input:            A text file of SHA-1 hashes, one per line in hex and
+#                   optionally followed by ':count' (the format of the Have I
+#                   Been Pwned ordered-by-hash dump) - or, with --plain, a
+#                   text file of plain passwords, one per line
+# Output:           A file of sorted, raw 20-byte SHA-1 digests
+# Notes:            Usage: python build_breach_corpus.py INPUT OUTPUT [--plain]
+#                   A hash list that is already sorted is converted as it is
+#                   read, so a multi-gigabyte dump needs no memory to speak
+#                   of. Anything else is sorted in memory first. Point
+#                   PASSMAN_BREACH_CORPUS at the output file to use it
+# *****************************************************************************
+
+import sys
+from BreachChecker import BreachChecker
+
+
+def read_digests(path, plain):
+    """This function yields the digest on each line of the input file"""
+
+    with open(path, "r", encoding="utf-8", errors="replace") as source:
+        for number, line in enumerate(source, 1):
+            line = line.rstrip("\r\n")
+
+            if plain:
+                if line:
+                    yield BreachChecker.digest(line)
+                continue
+
+            try:
+                digest = bytes.fromhex(line.split(":", 1)[0].strip())
+            except ValueError:
+                digest = b""
+
+            if len(digest) != BreachChecker.RECORD_SIZE:
+                if line.strip():
+                    print(f"Skipping line {number}: not a SHA-1 hash")
+                continue
+
+            yield digest
+
+
+def build(source, target, plain=False):
+    """This function writes the sorted corpus and returns how many digests it holds"""
+
+    # Stream a sorted list straight through, and fall back to sorting if it turns out not to be
+    if not plain:
+        count = 0
+        previous = b""
+        with open(target, "wb") as corpus:
+            for digest in read_digests(source, plain):
+                if digest < previous:
+                    break
+                if digest != previous:
+                    corpus.write(digest)
+                    count += 1
+                previous = digest
+            else:
+                return count
+
+        print("Input is not sorted, sorting it in memory")
+
+    digests = sorted(set(read_digests(source, plain)))
+    with open(target, "wb") as corpus:
+        corpus.writelines(digests)
+
+    return len(digests)
+
+
+if __name__ == '__main__':
+    arguments = [argument for argument in sys.argv[1:] if argument != "--plain"]
+
+    if len(arguments) != 2:
+        print("Usage: python build_breach_corpus.py INPUT OUTPUT [--plain]")
+        sys.exit(1)
+
+    print(f"Wrote {build(arguments[0], arguments[1], '--plain' in sys.argv)} digests to {arguments[1]}")
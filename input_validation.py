@@ -71,15 +71,23 @@ def y_or_n(prompt="Yes or No: ", error="You must enter a variant of a yes or no
         print(error)
 
 
-def password(prompt="\nEnter new password: ", error="\nPasswords must match and/or not be empty"):
-    """This function validates a password input"""
+def password(prompt="\nEnter new password: ", error="\nPasswords must match and/or not be empty",
+             breached_error="\nThat password appears in a known data breach - choose another"):
+    """This function validates a password input, rejecting passwords found in the breach corpus"""
+
+    from BreachChecker import BreachChecker
 
     while True:
         passwd = str(input(prompt))
         verify = str(input("Re-enter new password: "))
 
         if passwd and passwd == verify:
-            return passwd
+            checker = BreachChecker.default()
+            if checker is None or not checker.is_breached(passwd):
+                return passwd
+
+            print(breached_error)
+            continue
 
         print(error)
 
@@ -0,0 +1,51 @@
+# *****************************************************************************
+# Author:           Mike Winebarger
+# Date:             October 18, 2026,
+# Description:      Tests for the Flask web UI
+# Input:            None
+# Output:           Test results
+# Notes:            Run with: python -m unittest test_PassManWebUI
+#                   Uses a throwaway SQLite database, so no MongoDB is needed
+# *****************************************************************************
+
+import os
+import tempfile
+import unittest
+
+# Point the database at a scratch file before anything opens it
+SCRATCH_DIR = tempfile.mkdtemp()
+os.environ["PASSMAN_STORAGE"] = "sqlite"
+os.environ["PASSMAN_SQLITE_PATH"] = os.path.join(SCRATCH_DIR, "passman.db")
+
+from PassManWebUI import WebUI
+
+
+class StreamedPageTest(unittest.TestCase):
+    """Class definition for the streamed page tests -
+    Streamed pages are used up as they are sent, so each request must render its own"""
+
+    STREAMED_PAGES = ("/print-all-accounts", "/print-account-list?account_list_name=All")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = WebUI.start().test_client()
+
+    def test_streamed_pages_render_twice(self):
+        """This method requests each streamed page twice and checks both bodies match"""
+
+        for url in StreamedPageTest.STREAMED_PAGES:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                first_body = first.get_data(as_text=True)
+
+                second = self.client.get(url)
+                second_body = second.get_data(as_text=True)
+
+                self.assertEqual(first.status_code, 200)
+                self.assertEqual(second.status_code, 200)
+                self.assertIn("</html>", first_body)
+                self.assertEqual(first_body, second_body)
+
+
+if __name__ == '__main__':
+    unittest.main()